@@ -4,43 +4,47 @@ Sistema avançado de geração de relatórios em múltiplos formatos
 """
 
 import os
-import json
 from datetime import datetime
 from urllib.parse import urlparse
 
+from .artifact_bus import barramento_local
+
+# Artefatos consumidos/produzidos (usados pelo agendador do pipeline)
+CONSOME = ("relatorio_final", "memory_analysis", "defense_analysis", "fuzzer_results")
+PRODUZ = ("advanced_reports",)
+
 class AdvancedReporter:
-    def __init__(self, output_dir):
+    def __init__(self, output_dir, artefatos=None):
         self.output_dir = output_dir
+        self.artefatos = artefatos
         self.report_data = {}
     
     def load_all_data(self, target_url):
         """Carrega todos os dados dos módulos"""
-        site_name = target_url.replace('https://', '').replace('http://', '').replace('/', '_')
-        
-        data_files = {
-            "pre_recon": "pre_recon.json",
-            "headers_analysis": "headers_analysis.json",
-            "parser": "parser.json",
-            "injects": "injects.json",
-            "fuzzer_results": "fuzzer_results.json",
-            "defense_analysis": "defense_analysis.json",
-            "memory_analysis": "memory_analysis.json",
-            "ai_analysis": "ai_analysis.json",
-            "relatorio_final": "relatorio_final.json"
+        artefatos = self.artefatos or barramento_local(target_url, self.output_dir)
+        
+        # Chave no relatório -> artefato publicado
+        data_artifacts = {
+            "pre_recon": "pre_recon",
+            "headers_analysis": "headers_analysis",
+            "parser": "parser",
+            "injects": "injects",
+            "fuzzer_results": "fuzzer_results",
+            "defense_analysis": "defense_analysis",
+            "memory_analysis": "memory_analysis",
+            "ai_analysis": "ai_interpretation",
+            "relatorio_final": "relatorio_final"
         }
         
         loaded_data = {"target_url": target_url}
         
-        for module_name, filename in data_files.items():
-            file_path = f"{self.output_dir}/{filename}"
-            if os.path.exists(file_path):
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        loaded_data[module_name] = json.load(f)
-                except Exception as e:
-                    loaded_data[module_name] = {"erro": f"Erro ao carregar {filename}: {str(e)}"}
+        for module_name, artifact in data_artifacts.items():
+            # Só espera pelos artefatos declarados em CONSOME; os demais já saíram ou não bloqueiam
+            dados = artefatos.obter(artifact, esperar=artifact in CONSOME)
+            if dados is not None:
+                loaded_data[module_name] = dados
             else:
-                loaded_data[module_name] = {"erro": f"Arquivo {filename} não encontrado"}
+                loaded_data[module_name] = {"erro": f"Artefato {artifact} não encontrado"}
         
         self.report_data = loaded_data
         return loaded_data
@@ -524,15 +528,13 @@ class AdvancedReporter:
         
         return text
 
-def executar(target_url):
+def executar(target_url, *, artefatos=None):
     """Executa geração avançada de relatórios"""
     print(f"[advanced_reporter] 📊 Gerando relatórios avançados para: {target_url}")
+    artefatos = artefatos or barramento_local(target_url)
     
     try:
-        site_name = target_url.replace('https://', '').replace('http://', '').replace('/', '_')
-        output_dir = f"output/{site_name}"
-        
-        reporter = AdvancedReporter(output_dir)
+        reporter = AdvancedReporter(artefatos.output_dir, artefatos)
         reporter.load_all_data(target_url)
         
         resultados = {
@@ -561,9 +563,7 @@ def executar(target_url):
             resultados["erros"].append(f"Erro ao gerar PDF: {str(e)}")
         
         # Salva resultado
-        arquivo_saida = f"{output_dir}/advanced_reports.json"
-        with open(arquivo_saida, "w", encoding="utf-8") as f:
-            json.dump(resultados, f, indent=4, ensure_ascii=False)
+        arquivo_saida = artefatos.publicar("advanced_reports", resultados)
         
         print(f"[advanced_reporter] ✅ Relatórios avançados gerados")
         print(f"[advanced_reporter] 📄 Formatos: {len(resultados['relatorios_gerados'])}")
@@ -7,6 +7,13 @@ import time
 import random
 from urllib.parse import urlparse
 
+from .artifact_bus import barramento_local
+from .metrics import dormir
+
+# Artefatos consumidos/produzidos (usados pelo agendador do pipeline)
+CONSOME = ()
+PRODUZ = ("sessao_ataque",)
+
 def gerar_user_agents():
     """Gera lista de user agents para rotação"""
     user_agents = [
@@ -51,8 +58,9 @@ def configurar_sessao_ataque():
     
     return configuracao
 
-def executar(target_url):
+def executar(target_url, *, cliente=None, artefatos=None):
     """Executa o loop principal do agente"""
+    artefatos = artefatos or barramento_local(target_url)
     print(f"[agent_loop] 🤖 Iniciando loop de agente para: {target_url}")
     
     # Analisa o alvo
@@ -60,18 +68,18 @@ def executar(target_url):
     print(f"[agent_loop] 🎯 Domínio alvo: {info_alvo['dominio']}")
     print(f"[agent_loop] 🔗 Porta: {info_alvo['porta']}")
     
-    # Configura sessão de ataque
-    config = configurar_sessao_ataque()
+    # Configura sessão de ataque (a mesma usada pelo cliente HTTP do scan)
+    config = cliente.sessao_ataque if cliente else configurar_sessao_ataque()
     print(f"[agent_loop] ⚙️ User-Agent selecionado: {config['user_agent'][:50]}...")
     print(f"[agent_loop] 🕐 Delay entre requests: {config['delay_entre_requests']:.2f}s")
     
     # Simula preparação do ambiente de ataque
     print(f"[agent_loop] 🔧 Preparando ambiente de ataque...")
-    time.sleep(1)
+    dormir(1)
     
     # Simula verificação de conectividade
     print(f"[agent_loop] 🌐 Verificando conectividade com o alvo...")
-    time.sleep(0.5)
+    dormir(0.5)
     
     # Simula configuração de proxies/rotação
     if config["modo_stealth"]:
@@ -86,12 +94,19 @@ def executar(target_url):
         "timestamp": time.time()
     }
     
+    artefatos.publicar("sessao_ataque", resultado)
     return resultado
 
-def pausar_execucao(tempo_min=1, tempo_max=3):
-    """Pausa a execução por um tempo aleatório para evitar detecção"""
+def pausar_execucao(tempo_min=1, tempo_max=3, controlador=None, host=None):
+    """
+    Pausa a execução para evitar detecção.
+    Com um controlador de taxa (rate_controller) a pausa segue o ritmo atual do host.
+    """
+    if controlador is not None and host:
+        return controlador.aguardar(host)
+
     tempo_pausa = random.uniform(tempo_min, tempo_max)
-    time.sleep(tempo_pausa)
+    dormir(tempo_pausa)
     return tempo_pausa
 
 def detectar_bloqueio(response_code, response_text=""):
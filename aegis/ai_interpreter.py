@@ -1,17 +1,18 @@
 # -*- coding: utf-8 -*-
-import os
-import json
 from datetime import datetime
 
-def executar(target_url, output_dir=None):
+from .artifact_bus import barramento_local
+
+# Artefatos consumidos/produzidos (usados pelo agendador do pipeline)
+CONSOME = ("injects", "defense_analysis")
+PRODUZ = ("ai_interpretation",)
+
+def executar(target_url, output_dir=None, *, artefatos=None):
     """
     Interpretação local (fallback) e/ou via API (se configurada).
     Agora aceita output_dir opcional.
     """
-    # onde salvar
-    out_dir = output_dir or os.path.join("output", "generic")
-    os.makedirs(out_dir, exist_ok=True)
-    out_file = os.path.join(out_dir, "ai_interpretation.json")
+    artefatos = artefatos or barramento_local(target_url, output_dir)
 
     # Fallback local simples (sem OpenAI):
     result = {
@@ -26,8 +27,7 @@ def executar(target_url, output_dir=None):
     }
 
     try:
-        with open(out_file, "w") as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
+        out_file = artefatos.publicar("ai_interpretation", result)
         print(f"[ai_interpreter] ✅ Resultado salvo em: {out_file}")
     except Exception as e:
         print(f"[ai_interpreter] ❌ Erro na análise com IA: {e}")
@@ -0,0 +1,244 @@
+"""
+AEGIS Bug Hunter - Artifact Bus
+Armazém de artefatos em memória entre os módulos do pipeline, com persistência em disco assíncrona
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+from urllib.parse import urlparse
+
+from .metrics import span_atual
+
+class TipoArtefato:
+    """Declaração de um artefato: arquivo de persistência (None = só em memória) e tipo Python"""
+
+    def __init__(self, arquivo, tipo=dict):
+        self.arquivo = arquivo
+        self.tipo = tipo
+
+# Artefatos conhecidos (os nomes são os mesmos de CONSOME/PRODUZ dos módulos)
+ARTEFATOS = {
+    "sessao_ataque": TipoArtefato(None),
+    "pre_recon": TipoArtefato("pre_recon.json"),
+    "headers_analysis": TipoArtefato("headers_analysis.json"),
+    "parser": TipoArtefato("parser.json"),
+    "injects": TipoArtefato("injects.json"),
+    "fuzzer_results": TipoArtefato("fuzzer_results.json"),
+    "defense_analysis": TipoArtefato("defense_analysis.json"),
+    "memory_analysis": TipoArtefato("memory_analysis.json"),
+    "ai_interpretation": TipoArtefato("ai_interpretation.json"),
+    "status_analise": TipoArtefato("status_analise.json"),
+    "relatorio_final": TipoArtefato("relatorio_final.json"),
+    "reporter_log": TipoArtefato("reporter_log.json"),
+    "advanced_reports": TipoArtefato("advanced_reports.json"),
+}
+
+_FIM = object()
+
+def diretorio_saida(target_url):
+    """Diretório de saída do alvo (único para run.py e módulos executados isoladamente)"""
+    return os.path.join("output", urlparse(target_url).hostname or "alvo")
+
+class BarramentoArtefatos:
+    """
+    Módulos publicam seus resultados com publicar() e leem os dos outros com obter().
+    Os dados trafegam em memória; a gravação em disco é feita por uma thread de
+    escrita (sink), fora do caminho crítico. Artefatos publicados são tratados como
+    imutáveis: quem consome não deve alterá-los.
+    """
+
+    def __init__(self, output_dir, assincrono=True, carregar_do_disco=False):
+        self.output_dir = output_dir
+        self.carregar_do_disco = carregar_do_disco
+        os.makedirs(output_dir, exist_ok=True)
+
+        self._dados = {}
+        self._encerrados = set()
+        self._condicao = threading.Condition()
+
+        self._fila = None
+        self._sink = None
+        if assincrono:
+            self._fila = queue.Queue()
+            self._sink = threading.Thread(target=self._gravar_fila, name="aegis-artefatos", daemon=True)
+            self._sink.start()
+
+    def publicar(self, nome, dados, persistir=True):
+        """Publica o artefato e agenda sua gravação em disco (persistir=False: já está em disco)"""
+        tipo = ARTEFATOS.get(nome)
+        if tipo is None:
+            raise KeyError(f"Artefato desconhecido: '{nome}'")
+        if not isinstance(dados, tipo.tipo):
+            raise TypeError(f"Artefato '{nome}' deve ser {tipo.tipo.__name__}, recebido {type(dados).__name__}")
+
+        with self._condicao:
+            self._dados[nome] = dados
+            self._encerrados.add(nome)
+            self._condicao.notify_all()
+
+        if not tipo.arquivo:
+            return None
+        if not persistir:
+            return self.caminho(nome)
+        return self.salvar_json(tipo.arquivo, dados)
+
+    def encerrar(self, nomes):
+        """Marca artefatos cujo produtor terminou: quem espera por um não publicado recebe o padrão"""
+        with self._condicao:
+            self._encerrados.update(nomes)
+            self._condicao.notify_all()
+
+    def obter(self, nome, padrao=None, esperar=True, timeout=None):
+        """
+        Retorna o artefato publicado. Com esperar=True bloqueia até a publicação ou o
+        encerramento do produtor. No barramento local (módulo isolado) lê do disco.
+        """
+        with self._condicao:
+            if esperar and not self.carregar_do_disco:
+                self._condicao.wait_for(lambda: nome in self._encerrados, timeout=timeout)
+            if nome in self._dados:
+                return self._dados[nome]
+
+        if self.carregar_do_disco:
+            dados = self._ler_disco(nome)
+            if dados is not None:
+                with self._condicao:
+                    self._dados.setdefault(nome, dados)
+                return dados
+        return padrao
+
+    def disponivel(self, nome):
+        with self._condicao:
+            return nome in self._dados
+
+    def caminho(self, nome):
+        tipo = ARTEFATOS[nome]
+        return os.path.join(self.output_dir, tipo.arquivo) if tipo.arquivo else None
+
+    def salvar_json(self, arquivo, dados):
+        """Agenda gravação de JSON auxiliar no diretório do alvo e retorna o caminho"""
+        return self._agendar(arquivo, lambda f: json.dump(dados, f, indent=4, ensure_ascii=False, default=str))
+
+    def salvar_texto(self, arquivo, texto):
+        """Agenda gravação de texto (ex: relatório Markdown) no diretório do alvo e retorna o caminho"""
+        return self._agendar(arquivo, lambda f: f.write(texto))
+
+    def abrir_fluxo(self, arquivo, bloco=50):
+        """Fluxo JSON Lines no diretório do alvo: itens emitidos um a um, gravados em blocos pela thread de escrita"""
+        return FluxoArtefato(self, arquivo, bloco)
+
+    def ler_fluxo(self, arquivo):
+        """Itens de um arquivo JSON Lines do diretório do alvo, um por vez (após as gravações pendentes)"""
+        self.flush()
+        caminho = os.path.join(self.output_dir, arquivo)
+        if not os.path.exists(caminho):
+            return
+        with open(caminho, 'r', encoding='utf-8') as f:
+            for linha in f:
+                if linha.strip():
+                    yield json.loads(linha)
+
+    def _agendar(self, arquivo, escrever, modo="w"):
+        caminho = os.path.join(self.output_dir, arquivo)
+        # O tempo de gravação é atribuído ao módulo que publicou, mesmo gravado pela thread de escrita
+        span = span_atual()
+        if self._fila is None:
+            self._gravar(caminho, escrever, span, modo)
+        else:
+            self._fila.put((caminho, escrever, span, modo))
+        return caminho
+
+    def _ler_disco(self, nome):
+        caminho = self.caminho(nome) if nome in ARTEFATOS else None
+        if not caminho or not os.path.exists(caminho):
+            return None
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _gravar(caminho, escrever, span=None, modo="w"):
+        inicio = time.perf_counter()
+        try:
+            with open(caminho, modo, encoding="utf-8") as f:
+                escrever(f)
+        except Exception as e:
+            print(f"[artifact_bus] ⚠️ Erro ao gravar {caminho}: {e}")
+        if span is not None:
+            span.registrar(gravacao=time.perf_counter() - inicio)
+
+    def _gravar_fila(self):
+        while True:
+            item = self._fila.get()
+            try:
+                if item is _FIM:
+                    return
+                self._gravar(*item)
+            finally:
+                self._fila.task_done()
+
+    def flush(self):
+        """Aguarda todas as gravações pendentes (ex: antes de compactar o diretório)"""
+        if self._fila is not None:
+            self._fila.join()
+
+    def fechar(self):
+        if self._fila is not None and self._sink.is_alive():
+            self._fila.put(_FIM)
+            self._sink.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.fechar()
+
+class FluxoArtefato:
+    """
+    Arquivo JSON Lines escrito item a item (ex: pontos de entrada do rastreamento).
+    Os itens são acumulados em blocos de `bloco` linhas e entregues à thread de
+    escrita do barramento, na ordem: depois de gravados, não ficam em memória.
+    """
+
+    def __init__(self, barramento, arquivo, bloco=50):
+        self.barramento = barramento
+        self.arquivo = arquivo
+        self.bloco = max(1, int(bloco))
+        self.total = 0
+        self._linhas = []
+        self._modo = "w"
+
+    def emitir(self, item):
+        self._linhas.append(json.dumps(item, ensure_ascii=False, default=str))
+        self.total += 1
+        if len(self._linhas) >= self.bloco:
+            self._descarregar()
+
+    def _descarregar(self):
+        texto = "".join(linha + "\n" for linha in self._linhas)
+        # O primeiro bloco recria o arquivo (descarta o fluxo de um scan anterior); os demais acrescentam
+        self.barramento._agendar(self.arquivo, lambda f: f.write(texto), self._modo)
+        self._modo = "a"
+        self._linhas = []
+
+    def fechar(self):
+        if self._linhas or self._modo == "w":
+            self._descarregar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.fechar()
+
+def barramento_local(target_url, output_dir=None):
+    """
+    Barramento para módulo executado fora do pipeline: grava de forma síncrona e
+    lê do disco os artefatos de execuções anteriores
+    """
+    return BarramentoArtefatos(output_dir or diretorio_saida(target_url), assincrono=False, carregar_do_disco=True)
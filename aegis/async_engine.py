@@ -0,0 +1,124 @@
+"""
+AEGIS Bug Hunter - Async Request Engine
+Motor assíncrono de casos de teste: concorrência limitada por semáforo, ritmo por host a cargo do cliente HTTP
+"""
+
+import asyncio
+import functools
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+class CasoTeste:
+    """
+    Uma requisição de teste e a função que analisa sua resposta.
+    analisar(caso, response) retorna a lista de achados (vazia se nada for detectado);
+    itens da lista que forem CasoTeste são casos de acompanhamento, executados pelo
+    mesmo motor (ex: bisseção de um lote positivo).
+    """
+
+    def __init__(self, method, url, analisar, contexto=None, **kwargs_requisicao):
+        self.method = method
+        self.url = url
+        self.analisar = analisar
+        self.contexto = contexto or {}
+        self.kwargs = kwargs_requisicao
+
+    @property
+    def host(self):
+        return urlparse(self.url).netloc
+
+class MotorAssincrono:
+    """
+    Executa casos de teste com no máximo `concorrencia` requisições em voo.
+    As requisições usam o cliente HTTP compartilhado (bloqueante) em um pool de
+    threads do próprio motor; a análise de cada resposta roda assim que ela chega.
+    O ritmo por host fica com o controlador de taxa do cliente.
+    Com uma política de poda (case_pruner.PodaCasos) os casos saem em rodadas
+    (rodadas): cada rodada é filtrada de uma vez antes do envio (filtrar), só com as
+    respostas das rodadas anteriores, e suas respostas são analisadas na ordem dos
+    casos ao fim dela (registrar). A poda não depende da ordem em que as respostas
+    chegam: o mesmo alvo (ou a mesma gravação) gera as mesmas requisições.
+    """
+
+    def __init__(self, cliente, concorrencia=5, poda=None):
+        self.cliente = cliente
+        self.concorrencia = max(1, int(concorrencia))
+        self.poda = poda
+        self.total_requisicoes = 0
+        self.total_erros = 0
+
+    def executar(self, casos):
+        """Executa os casos e retorna os achados na ordem em que os casos foram gerados"""
+        casos = list(casos)
+        if not casos:
+            return []
+        return asyncio.run(self._executar(casos))
+
+    async def _executar(self, casos):
+        loop = asyncio.get_running_loop()
+        semaforo = asyncio.Semaphore(self.concorrencia)
+        achados_por_caso = {}
+
+        with ThreadPoolExecutor(max_workers=self.concorrencia, thread_name_prefix="aegis-motor") as executor:
+
+            async def rodar(indice, caso):
+                async with semaforo:
+                    try:
+                        # O contexto (ex: span de métricas do módulo) segue a requisição para a thread do pool
+                        contexto = contextvars.copy_context()
+                        response = await loop.run_in_executor(
+                            executor,
+                            functools.partial(contexto.run, self.cliente.request, caso.method, caso.url, **caso.kwargs)
+                        )
+                        return indice, caso, response
+                    except Exception:
+                        return indice, caso, None
+
+            def processar(indice, caso, response):
+                """Analisa a resposta de um caso e devolve seus acompanhamentos [(indice, caso)]"""
+                self.total_requisicoes += 1
+                if response is None:
+                    self.total_erros += 1
+                    return []
+                try:
+                    resultado = caso.analisar(caso, response) or []
+                except Exception:
+                    return []
+
+                achados_por_caso[indice] = [r for r in resultado if not isinstance(r, CasoTeste)]
+                if self.poda is not None:
+                    self.poda.registrar(caso, response, achados_por_caso[indice])
+                acompanhamentos = [r for r in resultado if isinstance(r, CasoTeste)]
+                return [(indice + (seq,), novo) for seq, novo in enumerate(acompanhamentos)]
+
+            # Índices são tuplas: acompanhamentos ficam logo após o caso que os gerou.
+            # A poda pode mudar a ordem de envio (não a dos achados)
+            if self.poda is None:
+                pendentes = {asyncio.ensure_future(rodar((indice,), caso)) for indice, caso in enumerate(casos)}
+                while pendentes:
+                    concluidas, pendentes = await asyncio.wait(pendentes, return_when=asyncio.FIRST_COMPLETED)
+                    for tarefa in concluidas:
+                        for indice, novo in processar(*tarefa.result()):
+                            pendentes.add(asyncio.ensure_future(rodar(indice, novo)))
+            else:
+                rodadas = deque(self.poda.rodadas(casos))
+                acompanhamentos = []
+                while rodadas or acompanhamentos:
+                    # Acompanhamentos de uma rodada entram na seguinte
+                    rodada = [((indice,), casos[indice]) for indice in (rodadas.popleft() if rodadas else [])]
+                    rodada = sorted(rodada + acompanhamentos, key=lambda item: item[0])
+                    enviar = []
+                    for indice, caso in rodada:
+                        caso = self.poda.filtrar(caso)
+                        if caso is not None:
+                            enviar.append((indice, caso))
+                    acompanhamentos = []
+                    for resultado in await asyncio.gather(*(rodar(indice, caso) for indice, caso in enviar)):
+                        acompanhamentos.extend(processar(*resultado))
+
+        achados = []
+        for indice in sorted(achados_por_caso):
+            achados.extend(achados_por_caso[indice])
+        return achados
@@ -0,0 +1,129 @@
+"""
+AEGIS Bug Hunter - Batch Runner
+Módulo responsável pela varredura em lote de múltiplos alvos em processos paralelos
+"""
+
+import os
+import sys
+import json
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import datetime
+from urllib.parse import urlparse
+
+from .artifact_bus import diretorio_saida
+
+def ler_alvos(origem, normalizar=None):
+    """
+    Lê alvos de um arquivo (um por linha) ou da entrada padrão quando origem é '-'.
+    Com normalizar (ex: run.norm_target), cada alvo é normalizado antes da
+    deduplicação: host e diretório de saída do agendamento saem da URL final
+    """
+    if origem == "-":
+        linhas = sys.stdin.read().splitlines()
+    else:
+        with open(origem, 'r', encoding='utf-8') as f:
+            linhas = f.read().splitlines()
+
+    alvos = []
+    vistos = set()
+    for linha in linhas:
+        linha = linha.strip()
+        if not linha or linha.startswith("#"):
+            continue
+        if normalizar is not None:
+            linha = normalizar(linha)
+        if linha not in vistos:
+            vistos.add(linha)
+            alvos.append(linha)
+
+    return alvos
+
+def host_do_alvo(alvo):
+    """Host usado para limitar a concorrência por servidor"""
+    return (urlparse(alvo).hostname or alvo).lower()
+
+def executar_lote(alvos, worker, max_workers=5, max_por_host=1):
+    """
+    Distribui os alvos em um pool de processos.
+    Cada alvo roda em um processo isolado; no máximo max_por_host alvos do mesmo
+    host ficam em execução simultânea. Alvos com o mesmo diretório de saída
+    (output/<host>: parser.json, pontos_entrada.jsonl, incremental.json) nunca
+    rodam juntos, qualquer que seja max_por_host. Retorna os resumos na ordem de entrada.
+    """
+    # multiprocessing só é carregado quando há lote (não pesa na inicialização do run.py)
+    from concurrent.futures import ProcessPoolExecutor
+
+    max_workers = max(1, int(max_workers))
+    max_por_host = max(1, int(max_por_host))
+
+    fila = deque(enumerate(alvos))
+    ativos_por_host = {}
+    saidas_ativas = set()
+    resumos = [None] * len(alvos)
+    em_execucao = {}
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        while fila or em_execucao:
+            # Agenda alvos respeitando limite global e limite por host
+            adiados = deque()
+            while fila and len(em_execucao) < max_workers:
+                indice, alvo = fila.popleft()
+                host = host_do_alvo(alvo)
+                saida = diretorio_saida(alvo)
+                if ativos_por_host.get(host, 0) >= max_por_host or saida in saidas_ativas:
+                    adiados.append((indice, alvo))
+                    continue
+                ativos_por_host[host] = ativos_por_host.get(host, 0) + 1
+                saidas_ativas.add(saida)
+                em_execucao[pool.submit(worker, alvo)] = (indice, alvo, host, saida)
+                print(f"[batch] ➡️ [{indice + 1}/{len(alvos)}] Iniciando: {alvo}")
+            fila.extendleft(reversed(adiados))
+
+            concluidos, _ = wait(list(em_execucao), return_when=FIRST_COMPLETED)
+            for future in concluidos:
+                indice, alvo, host, saida = em_execucao.pop(future)
+                ativos_por_host[host] -= 1
+                saidas_ativas.discard(saida)
+                try:
+                    resumo = future.result()
+                except Exception as e:
+                    resumo = {"alvo": alvo, "status": "erro", "erro": str(e)}
+                resumos[indice] = resumo
+                status = "✅" if resumo.get("status") == "ok" else "❌"
+                print(f"[batch] {status} [{indice + 1}/{len(alvos)}] Finalizado: {alvo}")
+
+    return resumos
+
+def formatar_tabela(resumos):
+    """Monta tabela de resumo do lote em texto"""
+    cabecalho = ("Alvo", "Status", "Módulos OK", "Erros", "Tempo (s)", "Saída")
+    linhas = []
+    for resumo in resumos:
+        linhas.append((
+            resumo.get("alvo", ""),
+            resumo.get("status", ""),
+            str(resumo.get("modulos_ok", 0)),
+            str(len(resumo.get("modulos_erro", []))),
+            f"{resumo.get('duracao', 0.0):.2f}",
+            resumo.get("output_dir", ""),
+        ))
+
+    larguras = [max(len(str(c)) for c in coluna) for coluna in zip(cabecalho, *linhas)]
+    formato = " | ".join(f"{{:<{w}}}" for w in larguras)
+    separador = "-+-".join("-" * w for w in larguras)
+
+    return "\n".join([formato.format(*cabecalho), separador] + [formato.format(*l) for l in linhas])
+
+def salvar_resumo(resumos, base_dir="output"):
+    """Salva o resumo do lote em JSON"""
+    os.makedirs(base_dir, exist_ok=True)
+    arquivo = os.path.join(base_dir, f"resumo_lote_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(arquivo, "w", encoding="utf-8") as f:
+        json.dump({
+            "timestamp": datetime.now().isoformat(),
+            "total_alvos": len(resumos),
+            "sucesso": len([r for r in resumos if r.get("status") == "ok"]),
+            "alvos": resumos
+        }, f, indent=4, ensure_ascii=False)
+    return arquivo
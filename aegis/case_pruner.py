@@ -0,0 +1,158 @@
+"""
+AEGIS Bug Hunter - Case Pruner
+Poda de casos de teste durante a execução do motor: um ponto de injeção (endpoint,
+parâmetro/header/formulário) já confirmado para um tipo não recebe os payloads
+restantes desse tipo, e um endpoint que responde igual a qualquer entrada (ex: o
+mesmo 500 para tudo) deixa de ser testado naquele vetor
+
+A decisão é tomada no envio (não na compilação do plano), em rodadas: a n-ésima
+tentativa de cada ponto é decidida com as respostas de todas as tentativas
+anteriores já analisadas, nunca com o que chegou antes por acaso. Numa requisição
+do plano com vários detectores, só os detectores podados saem; a requisição é
+pulada quando não sobra nenhum.
+"""
+
+import hashlib
+from collections import Counter
+from urllib.parse import urlparse
+
+from .async_engine import CasoTeste
+from .config_manager import get_config
+
+# Respostas de bloqueio ou indisponibilidade passageira: iguais para qualquer entrada
+# sem que o endpoint ignore a entrada, por isso não contam para a invariância
+STATUS_TRANSITORIOS = (403, 429, 503)
+
+def endpoint(caso):
+    """Método e URL sem query de um caso"""
+    partes = urlparse(caso.url)
+    return f"{caso.method.upper()} {partes.scheme}://{partes.netloc}{partes.path}"
+
+def locais_detector(contexto):
+    """(vetor, locais) testados por um detector: parâmetros, headers ou o formulário"""
+    if "form" in contexto:
+        return "formulario", [contexto["form"].get("url_completa")]
+    if "canarios" in contexto:
+        return ("parametro" if "parametros" in contexto else "header"), list(contexto["canarios"])
+    if "header" in contexto:
+        return "header", [contexto["header"]]
+    return "parametro", [contexto.get("parametro")]
+
+def local_achado(achado):
+    """(vetor, local) de um achado do inject_finder"""
+    if achado.get("tipo") == "formulario":
+        return "formulario", achado.get("form_action")
+    if "header" in achado:
+        return "header", achado["header"]
+    return "parametro", achado.get("parametro")
+
+def assinatura_resposta(response):
+    return response.status_code, hashlib.md5(response.content or b"").hexdigest()
+
+class PodaCasos:
+    """
+    Política de poda do MotorAssincrono. `limiar_confirmacao` achados de um tipo num
+    ponto encerram esse (ponto, tipo); `minimo_invariante` respostas idênticas de um
+    endpoint num vetor (0 desativa) o dão por insensível à entrada. tipo_de(detector)
+    resolve o tipo de injeção de um detector (padrão: contexto["tipo_injecao"]).
+    """
+
+    def __init__(self, limiar_confirmacao=1, minimo_invariante=6, tipo_de=None):
+        self.limiar_confirmacao = max(1, int(limiar_confirmacao))
+        self.minimo_invariante = max(0, int(minimo_invariante))
+        self.tipo_de = tipo_de or (lambda detector: detector.contexto.get("tipo_injecao"))
+
+        self._confirmacoes = Counter()
+        self._respostas = {}
+        self.podados = []
+        self._estatisticas = {"requisicoes_podadas": 0, "detectores_podados": 0,
+                              "por_motivo": {"confirmado": 0, "invariante": 0}}
+
+    @classmethod
+    def configurada(cls, tipo_de=None):
+        """Política da configuração (fuzzing.pruning), ou None se a poda estiver desativada"""
+        poda = get_config().get_fuzzing_config()["pruning"]
+        if not poda["enabled"]:
+            return None
+        return cls(poda["confirmation_threshold"], poda["invariant_min_responses"], tipo_de)
+
+    # -- Decisão antes do envio ----------------------------------------------------
+
+    def rodadas(self, casos):
+        """
+        Índices dos casos por rodada: a rodada n reúne a n-ésima tentativa de cada
+        (ponto, tipo), e o motor só a filtra e envia depois de analisar a rodada n-1.
+        Dentro de cada rodada vale a ordem original (a do plano, já priorizada pelo
+        payload_ranker).
+        """
+        tentativas = Counter()
+        rodadas = []
+        for indice, caso in enumerate(casos):
+            detector = caso.contexto.get("detectores", [caso])[0]
+            vetor, locais = locais_detector(detector.contexto)
+            grupo = (endpoint(caso), vetor, tuple(locais), self.tipo_de(detector))
+            if tentativas[grupo] == len(rodadas):
+                rodadas.append([])
+            rodadas[tentativas[grupo]].append(indice)
+            tentativas[grupo] += 1
+        return rodadas
+
+    def filtrar(self, caso):
+        """O caso com os detectores que ainda valem a requisição, ou None para pulá-la"""
+        detectores = caso.contexto.get("detectores", [caso])
+        vivos = []
+        for detector in detectores:
+            motivo = self._motivo(caso, detector)
+            if motivo is None:
+                vivos.append(detector)
+                continue
+            self.podados.append(detector)
+            self._estatisticas["detectores_podados"] += 1
+            self._estatisticas["por_motivo"][motivo] += 1
+
+        if not vivos:
+            self._estatisticas["requisicoes_podadas"] += 1
+            return None
+        if len(vivos) == len(detectores):
+            return caso
+        return CasoTeste(caso.method, caso.url, caso.analisar, contexto={**caso.contexto, "detectores": vivos}, **caso.kwargs)
+
+    def _motivo(self, caso, detector):
+        base = endpoint(caso)
+        vetor, locais = locais_detector(detector.contexto)
+        if self._invariante(base, vetor):
+            return "invariante"
+        tipo = self.tipo_de(detector)
+        if tipo and all(self._confirmacoes[(base, vetor, local, tipo)] >= self.limiar_confirmacao for local in locais):
+            return "confirmado"
+        return None
+
+    def _invariante(self, base, vetor):
+        estado = self._respostas.get((base, vetor))
+        return bool(self.minimo_invariante and estado and not estado["variou"]
+                    and estado["respostas"] >= self.minimo_invariante)
+
+    # -- Aprendizado com cada resposta ---------------------------------------------
+
+    def registrar(self, caso, response, achados):
+        """Conta os achados por ponto e a variação das respostas do endpoint por vetor"""
+        base = endpoint(caso)
+        for achado in achados:
+            vetor, local = local_achado(achado)
+            self._confirmacoes[(base, vetor, local, achado.get("tipo_injecao", achado.get("tipo")))] += 1
+
+        if response.status_code in STATUS_TRANSITORIOS:
+            return
+        assinatura = assinatura_resposta(response)
+        for vetor in {locais_detector(detector.contexto)[0] for detector in caso.contexto.get("detectores", [caso])}:
+            estado = self._respostas.setdefault((base, vetor), {"assinatura": assinatura, "respostas": 0, "variou": False})
+            estado["respostas"] += 1
+            estado["variou"] = estado["variou"] or assinatura != estado["assinatura"]
+
+    def estatisticas(self):
+        return {
+            **self._estatisticas,
+            "por_motivo": dict(self._estatisticas["por_motivo"]),
+            "pontos_confirmados": sum(1 for total in self._confirmacoes.values() if total >= self.limiar_confirmacao),
+            "endpoints_invariantes": sorted(f"{base} ({vetor})" for base, vetor in self._respostas if self._invariante(base, vetor))
+        }
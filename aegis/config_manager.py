@@ -72,6 +72,9 @@ class ConfigManager:
         return {
             "timeout": self.get("scanning.default_timeout", 10),
             "max_threads": self.get("scanning.max_threads", 5),
+            "max_per_host": self.get("scanning.max_per_host", 1),
+            "pool_connections": self.get("scanning.pool_connections", 10),
+            "pool_maxsize": self.get("scanning.pool_maxsize", 20),
             "delay_min": self.get("scanning.delay_between_requests.min", 0.5),
             "delay_max": self.get("scanning.delay_between_requests.max", 2.0),
             "retry_attempts": self.get("scanning.retry_attempts", 3),
@@ -79,6 +82,47 @@ class ConfigManager:
             "stealth_mode": self.get("scanning.stealth_mode", True)
         }
     
+    def get_cache_config(self):
+        """Obtém configurações do cache de respostas HTTP"""
+        return {
+            "enabled": self.get("scanning.response_cache.enabled", True),
+            "ttl_seconds": self.get("scanning.response_cache.ttl_seconds", 300),
+            "max_entries": self.get("scanning.response_cache.max_entries", 256),
+            "max_mb": self.get("scanning.response_cache.max_mb", 32)
+        }
+    
+    def get_crawl_config(self):
+        """Obtém configurações do rastreamento (crawler) do alvo"""
+        return {
+            "enabled": self.get("scanning.crawl.enabled", True),
+            "max_depth": self.get("scanning.crawl.max_depth", 2),
+            "max_pages": self.get("scanning.crawl.max_pages", 50),
+            "max_entry_points": self.get("scanning.crawl.max_entry_points", 200),
+            "concurrency": self.get("scanning.crawl.concurrency", 5),
+            "test_batch": self.get("scanning.crawl.test_batch", 20),
+            "reuse_max_age_hours": self.get("scanning.crawl.reuse_max_age_hours", 24)
+        }
+    
+    def get_rate_control_config(self):
+        """Obtém configurações do controle de taxa adaptativo por host"""
+        return {
+            "initial_rps": self.get("scanning.rate_control.initial_rps", 1.0),
+            "min_rps": self.get("scanning.rate_control.min_rps", 0.2),
+            "max_rps": self.get("scanning.rate_control.max_rps", 20.0),
+            "additive_increase": self.get("scanning.rate_control.additive_increase", 0.5),
+            "multiplicative_decrease": self.get("scanning.rate_control.multiplicative_decrease", 0.5),
+            "burst": self.get("scanning.rate_control.burst", 2)
+        }
+    
+    def get_http_trace_config(self):
+        """Obtém configurações do rastreamento de fases das requisições (JSONL rotativo)"""
+        return {
+            "enabled": self.get("logging.http_trace", True),
+            "file": os.path.join(self.get("logging.log_directory", "logs"), "http_trace.jsonl"),
+            "max_mb": self.get("logging.max_log_size_mb", 10),
+            "backups": self.get("logging.backup_count", 5)
+        }
+    
     def get_fuzzing_config(self):
         """Obtém configurações de fuzzing"""
         return {
@@ -86,7 +130,20 @@ class ConfigManager:
             "max_payloads_per_type": self.get("fuzzing.max_payloads_per_type", 10),
             "adaptive_delays": self.get("fuzzing.adaptive_delays", True),
             "payload_encoding": self.get("fuzzing.payload_encoding", True),
-            "waf_bypass_techniques": self.get("fuzzing.waf_bypass_techniques", True)
+            "waf_bypass_techniques": self.get("fuzzing.waf_bypass_techniques", True),
+            "canary_batching": self.get("fuzzing.canary_batching", True),
+            "canary_min_params": self.get("fuzzing.canary_min_params", 2),
+            "payload_ranking": {
+                "enabled": self.get("fuzzing.payload_ranking.enabled", True),
+                "prior_weight": self.get("fuzzing.payload_ranking.prior_weight", 4),
+                "min_trials_to_trim": self.get("fuzzing.payload_ranking.min_trials_to_trim", 6),
+                "trimmed_limit": self.get("fuzzing.payload_ranking.trimmed_limit", 1)
+            },
+            "pruning": {
+                "enabled": self.get("fuzzing.pruning.enabled", True),
+                "confirmation_threshold": self.get("fuzzing.pruning.confirmation_threshold", 1),
+                "invariant_min_responses": self.get("fuzzing.pruning.invariant_min_responses", 6)
+            }
         }
     
     def get_ai_config(self):
@@ -119,7 +176,28 @@ class ConfigManager:
             "store_vulnerabilities": self.get("memory_system.store_vulnerabilities", True),
             "store_defenses": self.get("memory_system.store_defenses", True),
             "cleanup_old_data": self.get("memory_system.cleanup_old_data", True),
-            "retention_days": self.get("memory_system.retention_days", 90)
+            "retention_days": self.get("memory_system.retention_days", 90),
+            "retention": {
+                "batch_size": self.get("memory_system.retention.batch_size", 1000),
+                "archive": self.get("memory_system.retention.archive", False),
+                "archive_path": self.get("memory_system.retention.archive_path", "aegis_memory_archive.db"),
+                "auto_interval_hours": self.get("memory_system.retention.auto_interval_hours", 24),
+                "vacuum_pages": self.get("memory_system.retention.vacuum_pages", 1000)
+            },
+            "writer": {
+                "flush_interval_ms": self.get("memory_system.writer.flush_interval_ms", 50),
+                "max_batch": self.get("memory_system.writer.max_batch", 5000),
+                "lock_retries": self.get("memory_system.writer.lock_retries", 5),
+                "sync_timeout_s": self.get("memory_system.writer.sync_timeout_s", 30)
+            },
+            "sqlite": {
+                "auto_vacuum": self.get("memory_system.sqlite.auto_vacuum", "INCREMENTAL"),
+                "journal_mode": self.get("memory_system.sqlite.journal_mode", "WAL"),
+                "synchronous": self.get("memory_system.sqlite.synchronous", "NORMAL"),
+                "cache_size_mb": self.get("memory_system.sqlite.cache_size_mb", 16),
+                "mmap_size_mb": self.get("memory_system.sqlite.mmap_size_mb", 64),
+                "busy_timeout_ms": self.get("memory_system.sqlite.busy_timeout_ms", 5000)
+            }
         }
     
     def get_notification_config(self):
@@ -179,6 +257,19 @@ class ConfigManager:
             "scanning": {
                 "default_timeout": 10,
                 "max_threads": 5,
+                "max_per_host": 1,
+                "pool_connections": 10,
+                "pool_maxsize": 20,
+                "response_cache": {"enabled": True, "ttl_seconds": 300, "max_entries": 256, "max_mb": 32},
+                "crawl": {
+                    "enabled": True, "max_depth": 2, "max_pages": 50,
+                    "max_entry_points": 200, "concurrency": 5, "test_batch": 20,
+                    "reuse_max_age_hours": 24
+                },
+                "rate_control": {
+                    "initial_rps": 1.0, "min_rps": 0.2, "max_rps": 20.0,
+                    "additive_increase": 0.5, "multiplicative_decrease": 0.5, "burst": 2
+                },
                 "delay_between_requests": {"min": 0.5, "max": 2.0},
                 "retry_attempts": 3,
                 "user_agent_rotation": True,
@@ -189,14 +280,38 @@ class ConfigManager:
                 "max_payloads_per_type": 10,
                 "adaptive_delays": True,
                 "payload_encoding": True,
-                "waf_bypass_techniques": True
+                "waf_bypass_techniques": True,
+                "canary_batching": True,
+                "canary_min_params": 2,
+                "payload_ranking": {
+                    "enabled": True,
+                    "prior_weight": 4,
+                    "min_trials_to_trim": 6,
+                    "trimmed_limit": 1
+                },
+                "pruning": {
+                    "enabled": True,
+                    "confirmation_threshold": 1,
+                    "invariant_min_responses": 6
+                }
             },
             "memory_system": {
                 "enabled": True,
                 "database_path": "aegis_memory.db",
                 "store_payloads": True,
                 "store_vulnerabilities": True,
-                "store_defenses": True
+                "store_defenses": True,
+                "cleanup_old_data": True,
+                "retention_days": 90,
+                "retention": {
+                    "batch_size": 1000, "archive": False, "archive_path": "aegis_memory_archive.db",
+                    "auto_interval_hours": 24, "vacuum_pages": 1000
+                },
+                "writer": {"flush_interval_ms": 50, "max_batch": 5000, "lock_retries": 5, "sync_timeout_s": 30},
+                "sqlite": {
+                    "auto_vacuum": "INCREMENTAL", "journal_mode": "WAL", "synchronous": "NORMAL", "cache_size_mb": 16,
+                    "mmap_size_mb": 64, "busy_timeout_ms": 5000
+                }
             },
             "ai_interpreter": {
                 "enabled": True,
@@ -211,6 +326,12 @@ class ConfigManager:
                     "pdf": False,
                     "html": False
                 }
+            },
+            "logging": {
+                "log_directory": "logs",
+                "max_log_size_mb": 10,
+                "backup_count": 5,
+                "http_trace": True
             }
         }
 
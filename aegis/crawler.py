@@ -0,0 +1,264 @@
+"""
+AEGIS Bug Hunter - Crawler
+Rastreamento em largura do alvo a partir da página inicial
+
+A fronteira deduplica as URLs pelo hash de 8 bytes da forma canônica de cada uma
+(não pela URL inteira); profundidade e número de páginas têm
+orçamento e só a mesma origem (esquema, host e porta) é visitada. As páginas são
+buscadas em paralelo pelo cliente HTTP compartilhado, com o ritmo por host do
+controle de taxa, e processadas na ordem em que foram pedidas: o mesmo site gera
+o mesmo rastreamento (e a mesma gravação para --replay). Formulários e URLs com
+parâmetros saem como fluxo (pontos_entrada), à medida que as páginas chegam.
+"""
+
+import hashlib
+import contextvars
+from contextlib import closing
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+from .config_manager import get_config
+from .parser import extrair_formularios, extrair_links
+
+# Pontos de entrada descobertos, gravados em fluxo no diretório do alvo
+ARQUIVO_PONTOS = "pontos_entrada.jsonl"
+
+PORTAS_PADRAO = {"http": 80, "https": 443}
+
+# Recursos que não são páginas HTML: não valem a requisição do rastreamento
+EXTENSOES_IGNORADAS = (
+    ".png", ".jpg", ".jpeg", ".gif", ".svg", ".ico", ".webp", ".bmp",
+    ".css", ".js", ".map", ".json", ".xml", ".txt",
+    ".pdf", ".zip", ".gz", ".tar", ".rar", ".7z",
+    ".mp3", ".mp4", ".avi", ".mov", ".webm",
+    ".woff", ".woff2", ".ttf", ".eot"
+)
+
+def origem(url):
+    """(esquema, host, porta) da URL, com a porta padrão do esquema quando omitida"""
+    partes = urlparse(url)
+    esquema = partes.scheme.lower()
+    return esquema, (partes.hostname or "").lower(), partes.port or PORTAS_PADRAO.get(esquema)
+
+def canonicalizar(url):
+    """
+    Forma canônica da URL: esquema e host em minúsculas, sem porta padrão, sem
+    fragmento, caminho vazio como "/" e parâmetros da query em ordem
+    """
+    esquema, host, porta = origem(url)
+    partes = urlparse(url)
+    if ":" in host:
+        host = f"[{host}]"
+    if porta and porta != PORTAS_PADRAO.get(esquema):
+        host = f"{host}:{porta}"
+    query = urlencode(sorted(parse_qsl(partes.query, keep_blank_values=True)))
+    return urlunparse((esquema, host, partes.path or "/", partes.params, query, ""))
+
+def _digest(texto):
+    return hashlib.blake2b(texto.encode("utf-8"), digest_size=8).digest()
+
+class FronteiraUrls:
+    """
+    Fila em largura de (url, profundidade). URLs fora da origem da raiz, além de
+    `profundidade_maxima`, que não são páginas ou que chegam depois de `max_paginas`
+    admitidas são descartadas (contadas por motivo em `descartadas`).
+    """
+
+    def __init__(self, raiz, profundidade_maxima=2, max_paginas=50):
+        self.origem = origem(raiz)
+        self.profundidade_maxima = max(0, int(profundidade_maxima))
+        self.max_paginas = max(1, int(max_paginas))
+
+        self._fila = deque()
+        self._vistas = set()
+        self.admitidas = 0
+        self.descartadas = Counter()
+
+    def adicionar(self, url, profundidade):
+        """Enfileira a URL se for nova, do escopo e couber no orçamento. Retorna True se enfileirou"""
+        try:
+            canonica = canonicalizar(url)
+            mesma_origem = origem(canonica) == self.origem
+        except ValueError:
+            # Porta inválida ou URL malformada
+            self.descartadas["invalida"] += 1
+            return False
+        if not mesma_origem or self.origem[0] not in PORTAS_PADRAO:
+            # Só http(s) da mesma origem (mailto:, javascript: e outros hosts ficam de fora)
+            self.descartadas["fora_do_escopo"] += 1
+            return False
+
+        chave = _digest(canonica)
+        if chave in self._vistas:
+            return False
+        self._vistas.add(chave)
+
+        # Em largura, a primeira vez que uma URL aparece é na menor profundidade
+        if profundidade > self.profundidade_maxima:
+            self.descartadas["profundidade"] += 1
+            return False
+        if urlparse(canonica).path.lower().endswith(EXTENSOES_IGNORADAS):
+            self.descartadas["nao_html"] += 1
+            return False
+        if self.admitidas >= self.max_paginas:
+            self.descartadas["orcamento"] += 1
+            return False
+
+        # Na fila vai a URL como encontrada (a da raiz, por exemplo, já está no cache de respostas)
+        self._fila.append((url, profundidade))
+        self.admitidas += 1
+        return True
+
+    def proxima(self):
+        """Próxima (url, profundidade) a buscar, ou None com a fila vazia"""
+        return self._fila.popleft() if self._fila else None
+
+    def __len__(self):
+        return len(self._fila)
+
+class PontosEntrada:
+    """
+    Deduplicação de pontos de entrada: uma URL por endpoint e nomes dos parâmetros
+    (?id=1 e ?id=2 são o mesmo ponto) e um formulário por método, destino e nomes
+    dos campos (os valores incluem tokens CSRF). Guarda só o hash de cada chave.
+    """
+
+    def __init__(self):
+        self._vistos = set()
+
+    @staticmethod
+    def chave(ponto):
+        if ponto["tipo"] == "formulario":
+            form = ponto["form"]
+            campos = sorted(campo.get("name", "") for campo in form.get("campos", []))
+            return f"formulario {form.get('method', 'GET').upper()} {canonicalizar(form.get('url_completa') or '')} {campos}"
+        partes = urlparse(canonicalizar(ponto["url"]))
+        nomes = sorted({nome for nome, _ in parse_qsl(partes.query, keep_blank_values=True)})
+        return f"url {partes.scheme}://{partes.netloc}{partes.path} {nomes}"
+
+    def novo(self, ponto):
+        """True na primeira vez que o ponto aparece (e o marca como visto)"""
+        chave = _digest(self.chave(ponto))
+        if chave in self._vistos:
+            return False
+        self._vistos.add(chave)
+        return True
+
+class Rastreador:
+    """
+    Rastreia o alvo em largura a partir de `raiz` com até `concorrencia` páginas em
+    voo. paginas() entrega cada página buscada; pontos_entrada(), os formulários e
+    URLs com parâmetros ainda não vistos, até `max_pontos`.
+    """
+
+    def __init__(self, cliente, raiz, profundidade_maxima=2, max_paginas=50, concorrencia=5, max_pontos=200):
+        self.cliente = cliente
+        self.raiz = raiz
+        self.concorrencia = max(1, int(concorrencia))
+        self.max_pontos = max(1, int(max_pontos))
+
+        self.fronteira = FronteiraUrls(raiz, profundidade_maxima, max_paginas)
+        self.pontos = PontosEntrada()
+        self._assinatura = hashlib.sha256()
+        self._estatisticas = {"paginas": 0, "paginas_ignoradas": 0, "erros": 0,
+                              "pontos_entrada": 0, "urls_com_parametros": 0, "formularios": 0,
+                              "profundidade_alcancada": 0, "limite_pontos_atingido": False}
+
+    @classmethod
+    def configurado(cls, cliente, raiz):
+        """Rastreador da configuração (scanning.crawl), ou None se o rastreamento estiver desativado"""
+        crawl = get_config().get_crawl_config()
+        if not crawl["enabled"]:
+            return None
+        return cls(cliente, raiz, crawl["max_depth"], crawl["max_pages"], crawl["concurrency"], crawl["max_entry_points"])
+
+    def _buscar(self, url):
+        """Página buscada e extraída (em uma thread do pool), ou None se não for HTML da origem"""
+        response = self.cliente.get(url)
+        final = getattr(response, "url", None) or url
+        tipo = response.headers.get("Content-Type", "")
+        if response.status_code >= 400 or (tipo and "html" not in tipo.lower()) or origem(final) != self.fronteira.origem:
+            return None
+
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(response.text, 'html.parser')
+        return {
+            "url": final,
+            "status": response.status_code,
+            "formularios": extrair_formularios(soup, final),
+            "links": [link["url_completa"] for link in extrair_links(soup, final) if link["tipo"] == "interno"]
+        }
+
+    def paginas(self):
+        """
+        Páginas buscadas ({url, profundidade, status, formularios, links}) na ordem em
+        largura; os links de cada uma alimentam a fronteira antes das próximas buscas
+        """
+        self.fronteira.adicionar(self.raiz, 0)
+        em_voo = deque()
+        with ThreadPoolExecutor(max_workers=self.concorrencia, thread_name_prefix="aegis-crawler") as executor:
+            while True:
+                while len(em_voo) < self.concorrencia:
+                    proxima = self.fronteira.proxima()
+                    if proxima is None:
+                        break
+                    # O contexto (ex: span de métricas do módulo) segue a requisição para a thread do pool
+                    contexto = contextvars.copy_context()
+                    em_voo.append((executor.submit(contexto.run, self._buscar, proxima[0]), *proxima))
+                if not em_voo:
+                    return
+
+                # Resultados na ordem dos pedidos: a fronteira (e o orçamento) não depende de qual resposta chega antes
+                future, url, profundidade = em_voo.popleft()
+                try:
+                    pagina = future.result()
+                except Exception:
+                    self._estatisticas["erros"] += 1
+                    continue
+                if pagina is None:
+                    self._estatisticas["paginas_ignoradas"] += 1
+                    continue
+
+                self._estatisticas["paginas"] += 1
+                self._estatisticas["profundidade_alcancada"] = max(self._estatisticas["profundidade_alcancada"], profundidade)
+                for link in pagina["links"]:
+                    self.fronteira.adicionar(link, profundidade + 1)
+                yield {**pagina, "profundidade": profundidade}
+
+    def pontos_entrada(self):
+        """
+        Formulários ({tipo: formulario, form, pagina}) e URLs com parâmetros ({tipo: url,
+        url, pagina}) de cada página, sem repetição, assim que a página chega
+        """
+        with closing(self.paginas()) as paginas:
+            yield from self._pontos_paginas(paginas)
+
+    def _pontos_paginas(self, paginas):
+        for pagina in paginas:
+            candidatos = [{"tipo": "url", "url": url, "pagina": pagina["url"]}
+                          for url in [pagina["url"], *pagina["links"]] if urlparse(url).query]
+            candidatos += [{"tipo": "formulario", "form": form, "pagina": pagina["url"]} for form in pagina["formularios"]]
+
+            for ponto in candidatos:
+                if ponto["tipo"] == "url" and origem(ponto["url"]) != self.fronteira.origem:
+                    continue
+                if not self.pontos.novo(ponto):
+                    continue
+                if self._estatisticas["pontos_entrada"] >= self.max_pontos:
+                    self._estatisticas["limite_pontos_atingido"] = True
+                    return
+
+                self._estatisticas["pontos_entrada"] += 1
+                self._estatisticas["urls_com_parametros" if ponto["tipo"] == "url" else "formularios"] += 1
+                self._assinatura.update(_digest(PontosEntrada.chave(ponto)))
+                yield ponto
+
+    def estatisticas(self):
+        """Contagens do rastreamento e assinatura dos pontos entregues (sem valores de campos)"""
+        return {
+            **self._estatisticas,
+            "paginas_admitidas": self.fronteira.admitidas,
+            "urls_descartadas": dict(self.fronteira.descartadas),
+            "assinatura": self._assinatura.hexdigest()
+        }
@@ -3,18 +3,22 @@ AEGIS Bug Hunter - Defense Detector
 Módulo responsável por detectar e analisar defesas do alvo
 """
 
-import os
-import json
 import time
-import requests
-import random
 from datetime import datetime
 from urllib.parse import urlparse
 
+from .artifact_bus import barramento_local
+from .metrics import dormir
+from .http_client import HttpClient
+
+# Artefatos consumidos/produzidos (usados pelo agendador do pipeline)
+CONSOME = ()
+PRODUZ = ("defense_analysis",)
+
 class DefenseDetector:
-    def __init__(self, target_url):
+    def __init__(self, target_url, cliente=None):
         self.target_url = target_url
-        self.session = requests.Session()
+        self.session = cliente or HttpClient()
         self.defesas_detectadas = []
         
     def _testar_waf_cloudflare(self):
@@ -26,7 +30,7 @@ class DefenseDetector:
         }
         
         try:
-            response = self.session.get(self.target_url, timeout=10)
+            response = self.session.get(self.target_url)
             
             # Verifica headers
             for header in indicadores["headers"]:
@@ -51,7 +55,7 @@ class DefenseDetector:
             
             # Testa com payload suspeito
             payload_test = self.target_url + "?test=<script>alert('xss')</script>"
-            response_test = self.session.get(payload_test, timeout=10)
+            response_test = self.session.get(payload_test)
             
             if response_test.status_code in indicadores["status_codes"]:
                 if any(ind in response_test.text.lower() for ind in indicadores["content"]):
@@ -76,7 +80,7 @@ class DefenseDetector:
         }
         
         try:
-            response = self.session.get(self.target_url, timeout=10)
+            response = self.session.get(self.target_url)
             
             # Verifica headers
             for header in indicadores["headers"]:
@@ -90,7 +94,7 @@ class DefenseDetector:
             
             # Testa com payload SQL injection
             payload_test = self.target_url + "?id=1' OR '1'='1"
-            response_test = self.session.get(payload_test, timeout=10)
+            response_test = self.session.get(payload_test)
             
             if response_test.status_code == 403:
                 content_lower = response_test.text.lower()
@@ -116,7 +120,7 @@ class DefenseDetector:
         }
         
         try:
-            response = self.session.get(self.target_url, timeout=10)
+            response = self.session.get(self.target_url)
             
             # Verifica headers
             for header in indicadores["headers"]:
@@ -130,7 +134,7 @@ class DefenseDetector:
             
             # Testa com payload XSS
             payload_test = self.target_url + "?search=<img src=x onerror=alert(1)>"
-            response_test = self.session.get(payload_test, timeout=10)
+            response_test = self.session.get(payload_test)
             
             if response_test.status_code in indicadores["status_codes"]:
                 content_lower = response_test.text.lower()
@@ -156,7 +160,7 @@ class DefenseDetector:
         }
         
         try:
-            response = self.session.get(self.target_url, timeout=10)
+            response = self.session.get(self.target_url)
             
             # Verifica headers
             for header in indicadores["headers"]:
@@ -170,7 +174,7 @@ class DefenseDetector:
             
             # Testa com payload command injection
             payload_test = self.target_url + "?cmd=; cat /etc/passwd"
-            response_test = self.session.get(payload_test, timeout=10)
+            response_test = self.session.get(payload_test)
             
             if response_test.status_code in indicadores["status_codes"]:
                 content_lower = response_test.text.lower()
@@ -198,7 +202,8 @@ class DefenseDetector:
             
             for i in range(10):
                 inicio = time.time()
-                response = self.session.get(self.target_url, timeout=5)
+                # Rajada proposital: fora do ritmo do controlador, mas a resposta ainda o alimenta
+                response = self.session.get(self.target_url, timeout=5, usar_cache=False, controlar_taxa=False)
                 fim = time.time()
                 
                 tempos_resposta.append(fim - inicio)
@@ -230,7 +235,7 @@ class DefenseDetector:
                         }
                     }
                 
-                time.sleep(0.1)  # Pequeno delay entre requisições
+                dormir(0.1)  # Pequeno delay entre requisições
         
         except Exception:
             pass
@@ -240,7 +245,7 @@ class DefenseDetector:
     def _testar_captcha(self):
         """Testa para presença de CAPTCHA"""
         try:
-            response = self.session.get(self.target_url, timeout=10)
+            response = self.session.get(self.target_url)
             content_lower = response.text.lower()
             
             captcha_indicators = [
@@ -280,7 +285,7 @@ class DefenseDetector:
     def _testar_csrf_protection(self):
         """Testa para proteção CSRF"""
         try:
-            response = self.session.get(self.target_url, timeout=10)
+            response = self.session.get(self.target_url)
             
             # Verifica por tokens CSRF
             csrf_indicators = [
@@ -329,11 +334,11 @@ class DefenseDetector:
                     "X-Originating-IP": fake_ip
                 }
                 
-                response = self.session.get(self.target_url, headers=headers, timeout=10)
+                response = self.session.get(self.target_url, headers=headers)
                 
                 # Se conseguir acessar com IP falso mas não sem ele
                 if response.status_code == 200:
-                    response_normal = self.session.get(self.target_url, timeout=10)
+                    response_normal = self.session.get(self.target_url)
                     if response_normal.status_code != 200:
                         return {
                             "detectado": True,
@@ -380,9 +385,6 @@ class DefenseDetector:
                     })
                     print(f"[defense_detector] 🚨 {resultado['tipo']} detectado! (confiança: {resultado['confianca']:.1%})")
                 
-                # Delay entre testes para evitar detecção
-                time.sleep(random.uniform(1, 3))
-                
             except Exception as e:
                 print(f"[defense_detector] ⚠️ Erro no teste {nome_teste}: {str(e)}")
                 continue
@@ -446,22 +448,17 @@ class DefenseDetector:
         
         return list(set(recomendacoes))  # Remove duplicatas
 
-def executar(target_url):
+def executar(target_url, *, cliente=None, artefatos=None):
     """Executa detecção completa de defesas"""
     print(f"[defense_detector] 🛡️ Iniciando detecção de defesas para: {target_url}")
+    artefatos = artefatos or barramento_local(target_url)
     
     try:
-        detector = DefenseDetector(target_url)
+        detector = DefenseDetector(target_url, cliente)
         resultado = detector.detectar_todas_defesas()
         
-        # Salva resultado
-        site_name = target_url.replace('https://', '').replace('http://', '').replace('/', '_')
-        output_dir = f"output/{site_name}"
-        os.makedirs(output_dir, exist_ok=True)
-        
-        arquivo_saida = f"{output_dir}/defense_analysis.json"
-        with open(arquivo_saida, "w", encoding="utf-8") as f:
-            json.dump(resultado, f, indent=4, ensure_ascii=False)
+        # Publica resultado (gravado em disco pelo barramento)
+        arquivo_saida = artefatos.publicar("defense_analysis", resultado)
         
         print(f"[defense_detector] ✅ Detecção concluída")
         print(f"[defense_detector] 🛡️ Defesas detectadas: {resultado['total_defesas']}")
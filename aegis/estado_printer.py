@@ -3,10 +3,14 @@ AEGIS Bug Hunter - Estado Printer
 Módulo responsável por exibir o estado atual da análise
 """
 
-import os
-import json
 from datetime import datetime
 
+from .artifact_bus import barramento_local
+
+# Artefatos consumidos/produzidos (usados pelo agendador do pipeline)
+CONSOME = ("pre_recon", "headers_analysis", "parser", "injects")
+PRODUZ = ("status_analise",)
+
 def exibir_banner_status():
     """Exibe banner de status do sistema"""
     banner = """
@@ -16,10 +20,8 @@ def exibir_banner_status():
     """
     print(banner)
 
-def verificar_status_modulos(site_name):
-    """Verifica status de execução dos módulos"""
-    output_dir = f"output/{site_name}"
-    
+def verificar_status_modulos(artefatos):
+    """Verifica status de execução dos módulos a partir dos artefatos publicados"""
     modulos_status = {
         "pre_recon": {"arquivo": "pre_recon.json", "status": "❌", "dados": None},
         "headers_analysis": {"arquivo": "headers_analysis.json", "status": "❌", "dados": None},
@@ -28,22 +30,16 @@ def verificar_status_modulos(site_name):
         "relatorio_final": {"arquivo": "relatorio_final.json", "status": "❌", "dados": None}
     }
     
-    if not os.path.exists(output_dir):
-        return modulos_status
-    
     for modulo, info in modulos_status.items():
-        arquivo_path = f"{output_dir}/{info['arquivo']}"
-        if os.path.exists(arquivo_path):
-            try:
-                with open(arquivo_path, 'r', encoding='utf-8') as f:
-                    dados = json.load(f)
-                    if "erro" not in dados:
-                        info["status"] = "✅"
-                        info["dados"] = dados
-                    else:
-                        info["status"] = "⚠️"
-            except:
-                info["status"] = "⚠️"
+        # relatorio_final é gerado depois deste módulo: consulta sem esperar
+        dados = artefatos.obter(modulo, esperar=modulo in CONSOME)
+        if dados is None:
+            continue
+        if "erro" not in dados:
+            info["status"] = "✅"
+            info["dados"] = dados
+        else:
+            info["status"] = "⚠️"
     
     return modulos_status
 
@@ -152,7 +148,7 @@ def exibir_proximos_passos(percentual_conclusao):
         print("🔍 Revise as vulnerabilidades encontradas")
         print("🛠️ Implemente as correções recomendadas")
 
-def gerar_resumo_arquivo(target_url, modulos_status, output_dir):
+def gerar_resumo_arquivo(target_url, modulos_status, artefatos):
     """Gera arquivo de resumo do status"""
     resumo = {
         "target_url": target_url,
@@ -182,26 +178,20 @@ def gerar_resumo_arquivo(target_url, modulos_status, output_dir):
         resumo["estatisticas"]["modulos_concluidos"] / total_modulos
     ) * 100
     
-    # Salva arquivo de status
-    arquivo_status = f"{output_dir}/status_analise.json"
-    with open(arquivo_status, "w", encoding="utf-8") as f:
-        json.dump(resumo, f, indent=4, ensure_ascii=False)
-    
-    return arquivo_status
+    # Publica arquivo de status
+    return artefatos.publicar("status_analise", resumo)
 
-def executar(target_url):
+def executar(target_url, *, artefatos=None):
     """Executa exibição do estado atual da análise"""
     print(f"[estado_printer] 📊 Exibindo status da análise para: {target_url}")
+    artefatos = artefatos or barramento_local(target_url)
     
     try:
-        site_name = target_url.replace("https://", "").replace("http://", "").replace("/", "_")
-        output_dir = f"output/{site_name}"
-        
         # Exibe banner
         exibir_banner_status()
         
         # Verifica status dos módulos
-        modulos_status = verificar_status_modulos(site_name)
+        modulos_status = verificar_status_modulos(artefatos)
         
         # Exibe progresso
         percentual = exibir_progresso_analise(modulos_status)
@@ -216,9 +206,8 @@ def executar(target_url):
         exibir_proximos_passos(percentual)
         
         # Gera arquivo de resumo
-        if os.path.exists(output_dir):
-            arquivo_status = gerar_resumo_arquivo(target_url, modulos_status, output_dir)
-            print(f"\n💾 Status salvo em: {arquivo_status}")
+        arquivo_status = gerar_resumo_arquivo(target_url, modulos_status, artefatos)
+        print(f"\n💾 Status salvo em: {arquivo_status}")
         
         print(f"\n[estado_printer] ✅ Status exibido com sucesso")
         
@@ -1,11 +1,17 @@
 # -*- coding: utf-8 -*-
 import os
-import time
 from datetime import datetime
+from urllib.parse import urlparse
 
-def executar(target_url, output_dir=None):
-    out_dir = output_dir or os.path.join("output", "generic")
-    os.makedirs(out_dir, exist_ok=True)
+from .artifact_bus import barramento_local
+
+# Artefatos consumidos/produzidos (usados pelo agendador do pipeline)
+CONSOME = ("parser",)
+PRODUZ = ("fuzzer_results",)
+
+def executar(target_url, output_dir=None, *, cliente=None, artefatos=None):
+    artefatos = artefatos or barramento_local(target_url, output_dir)
+    out_dir = artefatos.output_dir
     dbg = os.path.join(out_dir, "fuzzer_debug.log")
 
     def log(msg):
@@ -15,42 +21,35 @@ def executar(target_url, output_dir=None):
     print(f"[fuzzer] 🧪 Iniciando fuzzer adaptativo para: {target_url}")
     print(f"[fuzzer] 🚀 Iniciando fuzzing adaptativo em {target_url}")
 
-    # Exemplo de formulários descobertos por módulos anteriores (parser/inject_finder)
-    # Em produção, carregue a lista real de forms do arquivo JSON gerado
-    total_forms = 0
-    forms = []
-    try:
-        from .inject_finder import last_forms  # se existir
-        forms = last_forms or []
-        total_forms = len(forms)
-    except Exception:
-        pass
+    # Formulários descobertos pelo parser (artefato do próprio scan,
+    # sem estado global de módulo que possa vazar entre scans/workers)
+    forms = artefatos.obter("parser", {}).get("formularios", [])
+    total_forms = len(forms)
 
     if total_forms:
         print(f"[fuzzer] 📝 Fuzzing {total_forms} formulários")
 
-    # Simulação simples + WAF backoff
-    waf_hits = 0
-    backoff = 0.0
-    max_report = 5  # imprime no console só algumas vezes
-    printed = 0
-
-    for i in range(50):
-        # heurística fictícia de WAF (substitua com checagens reais de status/respostas)
-        waf_detected = True if i % 3 == 0 else False
-
-        if waf_detected:
-            waf_hits += 1
-            backoff = min(2.0, backoff + 0.1)
-            if printed < max_report:
-                print("[fuzzer] 🛡️ WAF detectado, mudando para modo stealth")
-                printed += 1
-            log(f"WAF detectado (hit {waf_hits}), backoff={backoff:.2f}s")
-            time.sleep(backoff)
-        else:
-            time.sleep(0.01)
+    # Sinais de WAF/rate limit vêm do controlador de taxa do scan, que já aplica o backoff
+    bloqueios = 0
+    if cliente is not None:
+        estado = cliente.controlador.estado(urlparse(target_url).netloc)
+        bloqueios = estado["bloqueios"]
+        if bloqueios:
+            print("[fuzzer] 🛡️ WAF detectado, mudando para modo stealth")
+            log(f"Bloqueios registrados: {estado['bloqueios']}, taxa atual={estado['taxa']:.2f} req/s")
+
+    resultado = {
+        "target_url": target_url,
+        "timestamp": datetime.now().isoformat(),
+        "formularios_testados": total_forms,
+        "bloqueios_detectados": bloqueios,
+        "vulnerabilidades_encontradas": [],
+        "confianca_media": 0.0
+    }
+    arquivo_saida = artefatos.publicar("fuzzer_results", resultado)
 
     print(f"[fuzzer] ✅ Fuzzing concluído")
     print(f"[fuzzer] 🎯 Vulnerabilidades encontradas: 0")
     print(f"[fuzzer] 📊 Confiança média: 0.0%")
-    print(f"[fuzzer] 💾 Resultado salvo em: {os.path.join(out_dir,'fuzzer_results.json')}")
+    print(f"[fuzzer] 💾 Resultado salvo em: {arquivo_saida}")
+    return resultado
@@ -3,11 +3,15 @@ AEGIS Bug Hunter - Headers Analyzer
 Módulo responsável pela análise detalhada de headers HTTP
 """
 
-import os
-import json
-import requests
 from datetime import datetime
 
+from .artifact_bus import barramento_local
+from .http_client import HttpClient
+
+# Artefatos consumidos/produzidos (usados pelo agendador do pipeline)
+CONSOME = ()
+PRODUZ = ("headers_analysis",)
+
 def analisar_headers_seguranca(headers):
     """Analisa headers de segurança"""
     headers_seguranca = {
@@ -180,8 +184,9 @@ def analisar_cookies(headers):
     
     return cookies_info
 
-def testar_metodos_http(target_url):
+def testar_metodos_http(target_url, cliente=None):
     """Testa métodos HTTP permitidos"""
+    cliente = cliente or HttpClient()
     metodos = ["GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS", "TRACE"]
     metodos_permitidos = []
     
@@ -189,7 +194,7 @@ def testar_metodos_http(target_url):
     
     for metodo in metodos:
         try:
-            response = requests.request(metodo, target_url, timeout=5)
+            response = cliente.request(metodo, target_url, timeout=5)
             if response.status_code not in [405, 501]:  # Method Not Allowed, Not Implemented
                 metodos_permitidos.append({
                     "metodo": metodo,
@@ -245,13 +250,15 @@ def calcular_score_seguranca(headers_seguranca):
         "nivel": nivel
     }
 
-def executar(target_url):
+def executar(target_url, *, cliente=None, artefatos=None):
     """Executa análise completa de headers"""
     print(f"[headers_analyzer] 🔍 Analisando headers de {target_url}")
+    cliente = cliente or HttpClient()
+    artefatos = artefatos or barramento_local(target_url)
     
     try:
         # Faz requisição para obter headers
-        response = requests.get(target_url, timeout=10)
+        response = cliente.get(target_url)
         headers = dict(response.headers)
         response_text = response.text
         
@@ -259,7 +266,7 @@ def executar(target_url):
         headers_seguranca = analisar_headers_seguranca(headers)
         wafs_detectados = detectar_waf_avancado(headers, response_text)
         cookies_info = analisar_cookies(headers)
-        metodos_http = testar_metodos_http(target_url)
+        metodos_http = testar_metodos_http(target_url, cliente)
         score_seguranca = calcular_score_seguranca(headers_seguranca)
         
         # Compila resultado
@@ -280,14 +287,8 @@ def executar(target_url):
             }
         }
         
-        # Salva resultado
-        site_name = target_url.replace('https://', '').replace('http://', '').replace('/', '_')
-        output_dir = f"output/{site_name}"
-        os.makedirs(output_dir, exist_ok=True)
-        
-        arquivo_saida = f"{output_dir}/headers_analysis.json"
-        with open(arquivo_saida, "w", encoding="utf-8") as f:
-            json.dump(resultado, f, indent=4, ensure_ascii=False)
+        # Publica resultado (gravado em disco pelo barramento)
+        arquivo_saida = artefatos.publicar("headers_analysis", resultado)
         
         print(f"[headers_analyzer] ✅ Análise concluída")
         print(f"[headers_analyzer] 🛡️ WAFs detectados: {', '.join(wafs_detectados) if wafs_detectados else 'Nenhum'}")
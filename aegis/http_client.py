@@ -0,0 +1,166 @@
+"""
+AEGIS Bug Hunter - HTTP Client
+Cliente HTTP compartilhado por scan: pool de conexões keep-alive, compressão e timeouts padrão
+"""
+
+import time
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+from .agent_loop import configurar_sessao_ataque
+from .config_manager import get_config
+from .http_trace import AdaptadorRastreado, obter_rastreador
+from .metrics import registrar
+from .rate_controller import ControladorTaxa
+from .response_cache import CacheRespostas
+
+class HttpClient:
+    """
+    Cliente único injetado em todos os módulos de um scan.
+    Mantém uma requests.Session com pools de conexão dimensionados pela
+    configuração, negociação de compressão e o User-Agent da sessão de ataque.
+    GETs/HEADs sem corpo passam por um cache de respostas do scan, de modo que
+    a mesma página pedida por vários módulos é buscada uma única vez.
+    Toda ida à rede passa pelo controlador de taxa por host (ControladorTaxa).
+
+    transporte (http_replay.criar_transporte) grava o tráfego em HAR ou reproduz
+    uma gravação; na reprodução não há rede, rastreamento nem espera pelo ritmo.
+    """
+
+    def __init__(self, sessao_ataque=None, config=None, transporte=None):
+        config = config or get_config()
+        scanning = config.get_scanning_config()
+        cache_config = config.get_cache_config()
+
+        self.sessao_ataque = sessao_ataque or configurar_sessao_ataque()
+        self.timeout = scanning["timeout"]
+
+        self.session = requests.Session()
+        pools = {"pool_connections": scanning["pool_connections"], "pool_maxsize": scanning["pool_maxsize"]}
+        self.transporte = transporte
+        self.offline = bool(transporte and transporte.offline)
+        # Com o rastreamento ativo cada envio registra suas fases (DNS, conexão, TLS, primeiro byte, corpo)
+        self.rastreador = None if self.offline else obter_rastreador(config)
+        adapter = AdaptadorRastreado(self.rastreador, **pools) if self.rastreador else HTTPAdapter(**pools)
+        if transporte is not None:
+            adapter = transporte.adaptador(adapter)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(make_headers(keep_alive=True, accept_encoding=True))
+        self.session.headers["User-Agent"] = self.sessao_ataque["user_agent"]
+
+        self.cache = None
+        if cache_config["enabled"]:
+            self.cache = CacheRespostas(
+                ttl=cache_config["ttl_seconds"],
+                max_entradas=cache_config["max_entries"],
+                max_bytes=int(cache_config["max_mb"] * 1024 * 1024),
+            )
+
+        self.controlador = ControladorTaxa.de_config(config)
+
+        self._lock = threading.Lock()
+        self.total_requisicoes = 0
+
+    def request(self, method, url, usar_cache=True, controlar_taxa=True, **kwargs):
+        """
+        Envia requisição pela sessão compartilhada (timeout padrão da configuração).
+        usar_cache=False força ida à rede (ex: testes que medem o próprio servidor).
+        controlar_taxa=False não espera pelo ritmo do host, mas a resposta ainda ajusta a taxa.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+
+        if usar_cache and self.cache is not None and self._cacheavel(method, kwargs):
+            chave = CacheRespostas.chave(
+                method, url, kwargs.get("params"), kwargs.get("headers"), kwargs.get("allow_redirects", True)
+            )
+            return self.cache.obter_ou_buscar(chave, lambda: self._enviar(method, url, controlar_taxa, **kwargs))
+
+        return self._enviar(method, url, controlar_taxa, **kwargs)
+
+    def _enviar(self, method, url, controlar_taxa=True, **kwargs):
+        host = urlparse(url).netloc
+        if controlar_taxa and not self.offline:
+            self.controlador.aguardar(host)
+
+        with self._lock:
+            self.total_requisicoes += 1
+
+        inicio = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            registrar(requisicoes=1, erros_rede=1, rede=time.perf_counter() - inicio)
+            self.controlador.registrar_falha(host)
+            raise
+
+        registrar(
+            requisicoes=1,
+            rede=time.perf_counter() - inicio,
+            bytes_enviados=sum(self._tamanho_requisicao(r.request) for r in response.history + [response]),
+            bytes_recebidos=sum(self._tamanho_resposta(r, kwargs.get("stream")) for r in response.history + [response])
+        )
+
+        texto = response.text if response.status_code >= 400 else ""
+        self.controlador.registrar_resposta(host, response.status_code, response.headers, texto)
+        return response
+
+    @staticmethod
+    def _tamanho_requisicao(requisicao):
+        """Bytes aproximados da requisição: linha inicial, headers e corpo"""
+        corpo = requisicao.body or b""
+        tamanho = len(requisicao.method) + len(requisicao.url) + 11
+        tamanho += sum(len(k) + len(v) + 4 for k, v in requisicao.headers.items())
+        return tamanho + len(corpo.encode("utf-8") if isinstance(corpo, str) else corpo)
+
+    @staticmethod
+    def _tamanho_resposta(response, stream=False):
+        """Bytes aproximados da resposta: headers e corpo (descomprimido; em streaming, Content-Length)"""
+        tamanho = sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+        if stream:
+            return tamanho + int(response.headers.get("Content-Length") or 0)
+        return tamanho + len(response.content)
+
+    @staticmethod
+    def _cacheavel(method, kwargs):
+        """Somente GET/HEAD sem corpo e sem streaming"""
+        if method.upper() not in ("GET", "HEAD"):
+            return False
+        return not any(kwargs.get(campo) for campo in ("data", "json", "files", "stream"))
+
+    def consultar(self, chave, buscar):
+        """
+        Consulta fora do HTTP (ex: certificado TLS) feita pelo transporte: gravada
+        junto com o tráfego ou reproduzida da gravação sem chamar buscar()
+        """
+        if self.transporte is None:
+            return buscar()
+        return self.transporte.consultar(chave, buscar)
+
+    def estatisticas_cache(self):
+        return self.cache.estatisticas() if self.cache else {"hits": 0, "misses": 0, "requisicoes_economizadas": 0}
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault("allow_redirects", True)
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, data=None, json=None, **kwargs):
+        return self.request("POST", url, data=data, json=json, **kwargs)
+
+    def head(self, url, **kwargs):
+        kwargs.setdefault("allow_redirects", False)
+        return self.request("HEAD", url, **kwargs)
+
+    def close(self):
+        """Fecha as conexões do pool"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,320 @@
+"""
+AEGIS Bug Hunter - HTTP Record/Replay
+Gravação do tráfego de um scan em HAR (gzip) e reprodução offline das respostas gravadas
+"""
+
+import io
+import os
+import gzip
+import json
+import base64
+import hashlib
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3._collections import HTTPHeaderDict
+from urllib3.response import HTTPResponse
+
+from .http_trace import fases
+from .metrics import span_atual
+
+ARQUIVO_GRAVACAO = "trafego.har.gz"
+
+# Headers que não identificam a requisição (variam entre scans ou são do transporte)
+HEADERS_IGNORADOS = {"user-agent", "accept", "accept-encoding", "connection", "content-length", "cookie", "host"}
+
+# O corpo gravado já está descomprimido; estes headers não valem para ele
+HEADERS_TRANSPORTE = {"content-encoding", "transfer-encoding", "content-length"}
+
+class TrafegoNaoGravado(requests.ConnectionError):
+    """Requisição sem resposta gravada no arquivo de reprodução"""
+
+def _corpo_har(dados):
+    """Texto do corpo no formato HAR: UTF-8 quando possível, senão base64"""
+    if dados is None:
+        return "", None
+    if isinstance(dados, str):
+        return dados, None
+    try:
+        return dados.decode("utf-8"), None
+    except UnicodeDecodeError:
+        return base64.b64encode(dados).decode("ascii"), "base64"
+
+def _bytes_har(texto, encoding=None):
+    if encoding == "base64":
+        return base64.b64decode(texto)
+    return (texto or "").encode("utf-8")
+
+def requisicao_har(request):
+    """Seção "request" de uma entrada HAR a partir da PreparedRequest"""
+    texto, encoding = _corpo_har(request.body)
+    har = {
+        "method": request.method,
+        "url": request.url,
+        "httpVersion": "HTTP/1.1",
+        "headers": [{"name": nome, "value": valor} for nome, valor in request.headers.items()],
+        "queryString": [],
+        "cookies": [],
+        "headersSize": -1,
+        "bodySize": len(_bytes_har(texto, encoding))
+    }
+    if request.body is not None:
+        har["postData"] = {"mimeType": request.headers.get("Content-Type", ""), "text": texto}
+        if encoding:
+            har["postData"]["encoding"] = encoding
+    return har
+
+def chave_requisicao(har):
+    """Identidade da requisição: método, URL, headers relevantes e corpo"""
+    headers = sorted(
+        (h["name"].lower(), h["value"]) for h in har.get("headers", [])
+        if h["name"].lower() not in HEADERS_IGNORADOS
+    )
+    corpo = har.get("postData", {}).get("text", "")
+    dados = json.dumps([har["method"].upper(), har["url"], headers, corpo], ensure_ascii=False)
+    return hashlib.sha256(dados.encode("utf-8")).hexdigest()
+
+def _timings_har(registro, total_ms):
+    """Timings HAR a partir do registro do rastreamento HTTP (quando ativo)"""
+    duracoes = fases(registro)
+    if not duracoes:
+        return {"send": 0, "wait": round(total_ms, 2), "receive": 0}
+    return {
+        "blocked": -1,
+        "dns": duracoes.get("dns", -1),
+        "connect": round(duracoes.get("conexao", 0) + duracoes.get("tls", 0), 2) if "conexao" in duracoes else -1,
+        "ssl": duracoes.get("tls", -1),
+        "send": 0,
+        "wait": duracoes.get("espera_servidor", 0),
+        "receive": duracoes.get("download", 0)
+    }
+
+def ler_har(arquivo):
+    abrir = gzip.open if arquivo.endswith(".gz") else open
+    with abrir(arquivo, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+def gravar_har(arquivo, dados):
+    """Grava o HAR (gzip se o nome terminar em .gz) de forma atômica"""
+    os.makedirs(os.path.dirname(arquivo) or ".", exist_ok=True)
+    temporario = f"{arquivo}.tmp"
+    abrir = gzip.open if arquivo.endswith(".gz") else open
+    with abrir(temporario, "wt", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temporario, arquivo)
+    return arquivo
+
+class GravadorTrafego:
+    """
+    Grava cada envio (um salto, redirecionamentos inclusos) como entrada HAR, além
+    das consultas fora do HTTP feitas via HttpClient.consultar (ex: certificado TLS).
+    """
+
+    offline = False
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self.entradas = []
+        self.consultas = {}
+        self._lock = threading.Lock()
+
+    def adaptador(self, interno):
+        return AdaptadorGravacao(self, interno)
+
+    def registrar(self, request, response, inicio, total_ms):
+        corpo, encoding = _corpo_har(response.content)
+        headers = getattr(response.raw, "headers", None) or response.headers
+        conteudo = {"size": len(response.content), "mimeType": response.headers.get("Content-Type", ""), "text": corpo}
+        if encoding:
+            conteudo["encoding"] = encoding
+
+        span = span_atual()
+        entrada = {
+            "startedDateTime": inicio.isoformat(),
+            "time": round(total_ms, 2),
+            "request": requisicao_har(request),
+            "response": {
+                "status": response.status_code,
+                "statusText": response.reason or "",
+                "httpVersion": "HTTP/1.1",
+                "headers": [{"name": nome, "value": valor} for nome, valor in headers.items()],
+                "cookies": [],
+                "content": conteudo,
+                "redirectURL": response.headers.get("Location", ""),
+                "headersSize": -1,
+                "bodySize": len(response.content)
+            },
+            "cache": {},
+            "timings": _timings_har(getattr(response, "traco_http", None), total_ms),
+            "_modulo": span.nome if span else None
+        }
+        with self._lock:
+            self.entradas.append(entrada)
+
+    def consultar(self, chave, buscar):
+        try:
+            valor = buscar()
+        except Exception as e:
+            with self._lock:
+                self.consultas[chave] = {"erro": str(e)}
+            raise
+        with self._lock:
+            self.consultas[chave] = {"valor": valor}
+        return valor
+
+    def estatisticas(self):
+        with self._lock:
+            return {"modo": "gravacao", "arquivo": self.arquivo, "entradas": len(self.entradas)}
+
+    def salvar(self):
+        with self._lock:
+            entradas = list(self.entradas)
+            consultas = dict(self.consultas)
+        return gravar_har(self.arquivo, {
+            "log": {
+                "version": "1.2",
+                "creator": {"name": "AEGIS Bug Hunter", "version": "1.0.0"},
+                "pages": [],
+                "entries": entradas,
+                "_consultas": consultas
+            }
+        })
+
+class ReprodutorTrafego:
+    """
+    Serve as respostas de um HAR sem rede. Requisições iguais (mesma chave) recebem
+    as respostas gravadas na ordem da gravação; esgotadas, repete-se a última.
+    Sem resposta gravada, o envio falha como erro de conexão (TrafegoNaoGravado).
+    """
+
+    offline = True
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        log = ler_har(arquivo)["log"]
+        self.consultas = log.get("_consultas", {})
+
+        self._indice = defaultdict(list)
+        for entrada in log.get("entries", []):
+            self._indice[chave_requisicao(entrada["request"])].append(entrada)
+        self._posicoes = defaultdict(int)
+        self._lock = threading.Lock()
+        self.reproduzidas = 0
+        self.nao_gravadas = []
+
+    def adaptador(self, interno=None):
+        return AdaptadorReproducao(self)
+
+    def responder(self, request):
+        """Entrada HAR para a requisição, ou None se não houver gravação"""
+        chave = chave_requisicao(requisicao_har(request))
+        with self._lock:
+            entradas = self._indice.get(chave)
+            if not entradas:
+                self.nao_gravadas.append(f"{request.method} {request.url}")
+                return None
+            posicao = self._posicoes[chave]
+            self._posicoes[chave] = posicao + 1
+            self.reproduzidas += 1
+            return entradas[min(posicao, len(entradas) - 1)]
+
+    def consultar(self, chave, buscar):
+        registro = self.consultas.get(chave)
+        if registro is None:
+            raise LookupError(f"Consulta não gravada: {chave}")
+        if "erro" in registro:
+            raise OSError(registro["erro"])
+        return registro["valor"]
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "modo": "reproducao",
+                "arquivo": self.arquivo,
+                "reproduzidas": self.reproduzidas,
+                "nao_gravadas": len(self.nao_gravadas)
+            }
+
+    def salvar(self):
+        return None
+
+class AdaptadorGravacao(HTTPAdapter):
+    """Envia pelo adaptador interno (com ou sem rastreamento) e grava requisição e resposta"""
+
+    def __init__(self, gravador, interno):
+        self.gravador = gravador
+        self.interno = interno
+        super().__init__()
+
+    def send(self, request, **kwargs):
+        inicio = datetime.now(timezone.utc)
+        response = self.interno.send(request, **kwargs)
+        # Lê o corpo (mesmo em streaming: o requests reaproveita o conteúdo já lido)
+        response.content
+        total_ms = (datetime.now(timezone.utc) - inicio).total_seconds() * 1000
+        self.gravador.registrar(request, response, inicio, total_ms)
+        return response
+
+    def close(self):
+        self.interno.close()
+        super().close()
+
+class _RespostaOriginal:
+    """O mínimo de http.client.HTTPResponse para o requests extrair cookies"""
+
+    def __init__(self, headers):
+        self.msg = _MensagemHeaders(headers)
+
+    def isclosed(self):
+        return True
+
+class _MensagemHeaders:
+    def __init__(self, headers):
+        self._headers = headers
+
+    def get_all(self, nome, padrao=None):
+        valores = self._headers.getlist(nome)
+        return valores or padrao
+
+class AdaptadorReproducao(HTTPAdapter):
+    """Monta a resposta a partir da gravação, sem abrir conexões"""
+
+    def __init__(self, reprodutor):
+        self.reprodutor = reprodutor
+        super().__init__()
+
+    def send(self, request, stream=False, **kwargs):
+        entrada = self.reprodutor.responder(request)
+        if entrada is None:
+            raise TrafegoNaoGravado(f"Sem resposta gravada para {request.method} {request.url}", request=request)
+
+        gravada = entrada["response"]
+        corpo = _bytes_har(gravada["content"].get("text"), gravada["content"].get("encoding"))
+        headers = HTTPHeaderDict()
+        for header in gravada["headers"]:
+            if header["name"].lower() not in HEADERS_TRANSPORTE:
+                headers.add(header["name"], header["value"])
+        headers["Content-Length"] = str(len(corpo))
+
+        raw = HTTPResponse(
+            body=io.BytesIO(corpo), headers=headers, status=gravada["status"], reason=gravada.get("statusText"),
+            preload_content=False, decode_content=False, original_response=_RespostaOriginal(headers),
+            request_url=request.url
+        )
+        response = self.build_response(request, raw)
+        if not stream:
+            response.content
+        return response
+
+def criar_transporte(gravar=None, reproduzir=None):
+    """Transporte do HttpClient: gravação, reprodução ou None (rede direta)"""
+    if gravar and reproduzir:
+        raise ValueError("Gravação e reprodução são exclusivas")
+    if reproduzir:
+        return ReprodutorTrafego(reproduzir)
+    if gravar:
+        return GravadorTrafego(gravar)
+    return None
@@ -0,0 +1,224 @@
+"""
+AEGIS Bug Hunter - HTTP Trace
+Registro das fases de cada requisição (DNS, conexão, TLS, primeiro byte, corpo) em JSONL rotativo
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import atexit
+import logging
+import threading
+from logging.handlers import QueueListener, RotatingFileHandler
+from urllib.parse import urlparse
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+from .metrics import span_atual
+
+# Marcos registrados, em ms desde o início do envio (ausentes em conexão reaproveitada do pool)
+MARCOS = ("dns", "conexao", "tls", "primeiro_byte", "corpo")
+
+_local = threading.local()
+
+class TracoRequisicao:
+    """Marcos de tempo de uma requisição (um salto, sem contar redirecionamentos)"""
+
+    def __init__(self, method, url):
+        self.method = method
+        self.url = url
+        self.inicio_epoch = time.time()
+        self.inicio = time.perf_counter()
+        self.marcos = {}
+        self.nova_conexao = False
+
+    def marcar(self, marco):
+        self.marcos[marco] = round((time.perf_counter() - self.inicio) * 1000, 2)
+
+    def para_dict(self, modulo, status=None, erro=None):
+        return {
+            "ts": round(self.inicio_epoch, 3),
+            "modulo": modulo,
+            "host": urlparse(self.url).netloc,
+            "metodo": self.method,
+            "status": status,
+            "nova_conexao": self.nova_conexao,
+            **{marco: self.marcos.get(marco) for marco in MARCOS},
+            "erro": erro
+        }
+
+def _traco_atual():
+    return getattr(_local, "traco", None)
+
+class _ConexaoRastreada:
+    """Mixin para conexões do urllib3: separa a resolução DNS da conexão TCP e marca o primeiro byte"""
+
+    def _new_conn(self):
+        traco = _traco_atual()
+        if traco is None:
+            return super()._new_conn()
+        traco.nova_conexao = True
+
+        # Resolve aqui para medir o DNS; a conexão usa os IPs já resolvidos, na mesma ordem
+        host_dns = self._dns_host
+        try:
+            enderecos = socket.getaddrinfo(host_dns, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except socket.gaierror:
+            enderecos = None
+        if not enderecos:
+            return super()._new_conn()  # o urllib3 converte a falha em NameResolutionError
+        traco.marcar("dns")
+
+        erro = None
+        for ip in dict.fromkeys(info[4][0] for info in enderecos):
+            self._dns_host = ip
+            try:
+                sock = super()._new_conn()
+                break
+            except (NewConnectionError, ConnectTimeoutError) as e:
+                erro = e
+            finally:
+                self._dns_host = host_dns
+        else:
+            raise erro
+        traco.marcar("conexao")
+        return sock
+
+    def getresponse(self, *args, **kwargs):
+        response = super().getresponse(*args, **kwargs)
+        traco = _traco_atual()
+        if traco is not None:
+            traco.marcar("primeiro_byte")
+        return response
+
+class _ConexaoHTTPRastreada(_ConexaoRastreada, HTTPConnection):
+    pass
+
+class _ConexaoHTTPSRastreada(_ConexaoRastreada, HTTPSConnection):
+
+    def connect(self):
+        super().connect()
+        traco = _traco_atual()
+        if traco is not None:
+            traco.marcar("tls")
+
+class _PoolHTTPRastreado(HTTPConnectionPool):
+    ConnectionCls = _ConexaoHTTPRastreada
+
+class _PoolHTTPSRastreado(HTTPSConnectionPool):
+    ConnectionCls = _ConexaoHTTPSRastreada
+
+class RastreadorHttp:
+    """
+    Grava um registro JSONL por requisição em arquivo rotativo. A escrita é feita
+    por uma thread (QueueListener), fora do caminho da requisição.
+    """
+
+    def __init__(self, arquivo, max_bytes=10 * 1024 * 1024, backups=3):
+        self.arquivo = arquivo
+        os.makedirs(os.path.dirname(arquivo) or ".", exist_ok=True)
+
+        handler = RotatingFileHandler(arquivo, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self._fila = queue.SimpleQueue()
+        self._ouvinte = QueueListener(self._fila, handler)
+        self._ouvinte.start()
+        self._ativo = True
+
+    def registrar(self, traco, status=None, erro=None):
+        span = span_atual()
+        registro = traco.para_dict(span.nome if span else None, status, erro)
+        if self._ativo:
+            linha = json.dumps(registro, separators=(",", ":"), ensure_ascii=False)
+            self._fila.put(logging.makeLogRecord({"msg": linha}))
+        return registro
+
+    def fechar(self):
+        """Grava os registros pendentes"""
+        if self._ativo:
+            self._ativo = False
+            self._ouvinte.stop()
+
+_rastreadores = {}
+_lock_rastreadores = threading.Lock()
+
+def arquivo_do_processo(arquivo):
+    """
+    Arquivo de rastreamento deste processo: o configurado no processo principal e
+    <nome>.<pid>.jsonl nos workers do modo lote (--batch), para que um arquivo
+    rotativo nunca seja escrito nem rotacionado por mais de um processo
+    """
+    # Workers do pool já importaram multiprocessing; sem ele, é o processo principal
+    multiprocessing = sys.modules.get("multiprocessing")
+    if multiprocessing is None or multiprocessing.parent_process() is None:
+        return arquivo
+    raiz, extensao = os.path.splitext(arquivo)
+    return f"{raiz}.{os.getpid()}{extensao}"
+
+def obter_rastreador(config):
+    """Rastreador do processo para o arquivo configurado (None se desativado)"""
+    trace = config.get_http_trace_config()
+    if not trace["enabled"]:
+        return None
+    arquivo = arquivo_do_processo(trace["file"])
+    with _lock_rastreadores:
+        rastreador = _rastreadores.get(arquivo)
+        if rastreador is None:
+            rastreador = RastreadorHttp(arquivo, int(trace["max_mb"] * 1024 * 1024), trace["backups"])
+            _rastreadores[arquivo] = rastreador
+            atexit.register(rastreador.fechar)
+        return rastreador
+
+class AdaptadorRastreado(HTTPAdapter):
+    """
+    HTTPAdapter que mede as fases de cada envio e anexa o registro à resposta
+    (response.traco_http). Conexões via proxy não são instrumentadas.
+    """
+
+    def __init__(self, rastreador, **kwargs):
+        self.rastreador = rastreador
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _PoolHTTPRastreado, "https": _PoolHTTPSRastreado}
+
+    def send(self, request, stream=False, **kwargs):
+        traco = TracoRequisicao(request.method, request.url)
+        _local.traco = traco
+        try:
+            response = super().send(request, stream=stream, **kwargs)
+            if not stream:
+                response.content  # lê o corpo aqui para marcar o fim do download
+                traco.marcar("corpo")
+        except Exception as e:
+            self.rastreador.registrar(traco, erro=type(e).__name__)
+            raise
+        finally:
+            _local.traco = None
+
+        response.traco_http = self.rastreador.registrar(traco, response.status_code)
+        return response
+
+def fases(registro):
+    """Duração (ms) de cada fase a partir dos marcos de um registro"""
+    if not registro:
+        return {}
+    anterior = 0.0
+    duracoes = {}
+    for marco, fase in (("dns", "dns"), ("conexao", "conexao"), ("tls", "tls"),
+                        ("primeiro_byte", "espera_servidor"), ("corpo", "download")):
+        valor = registro.get(marco)
+        if valor is None:
+            continue
+        duracoes[fase] = round(valor - anterior, 2)
+        anterior = valor
+    duracoes["total"] = round(anterior, 2)
+    return duracoes
@@ -0,0 +1,302 @@
+"""
+AEGIS Bug Hunter - Incremental Scan
+Impressões digitais das entradas de cada módulo para reaproveitar artefatos de scans anteriores
+"""
+
+import os
+import ast
+import json
+import inspect
+import hashlib
+import threading
+import importlib.util
+from datetime import datetime, timedelta
+
+from .artifact_bus import ARTEFATOS
+from .config_manager import get_config
+
+ARQUIVO_IMPRESSOES = "incremental.json"
+
+# Muda quando o cálculo das impressões muda (invalida os registros antigos)
+VERSAO_IMPRESSAO = 2
+
+# Headers que variam a cada resposta sem indicar mudança no alvo
+HEADERS_VOLATEIS = {
+    "date", "expires", "age", "etag", "last-modified", "set-cookie",
+    "x-request-id", "x-amzn-requestid", "x-amz-cf-id", "cf-ray", "server-timing",
+    "report-to", "nel", "x-runtime", "x-response-time"
+}
+
+def _hash(dados):
+    """SHA-256 da forma canônica (JSON ordenado) dos dados"""
+    texto = json.dumps(dados, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+# Pacote cujos módulos entram na versão de uma etapa (dependências externas não)
+PACOTE = "aegis"
+
+_fontes = {}
+_versoes = {}
+
+def _fonte_modulo(nome):
+    """(hash do código-fonte, módulos do pacote importados) de um módulo, sem importá-lo"""
+    if nome not in _fontes:
+        try:
+            spec = importlib.util.find_spec(nome)
+        except (ImportError, ValueError):
+            spec = None
+        if spec is None or not spec.origin or not spec.origin.endswith(".py"):
+            _fontes[nome] = None
+            return None
+        with open(spec.origin, "rb") as f:
+            codigo = f.read()
+        _fontes[nome] = (hashlib.sha256(codigo).hexdigest(), _importacoes_pacote(nome, ast.parse(codigo, filename=spec.origin)))
+    return _fontes[nome]
+
+def _importacoes_pacote(nome, arvore):
+    """Módulos do pacote importados em qualquer ponto do código (inclusive dentro de funções)"""
+    pacote = nome.rpartition(".")[0]
+    importados = set()
+    for no in ast.walk(arvore):
+        if isinstance(no, ast.Import):
+            importados.update(alias.name for alias in no.names)
+        elif isinstance(no, ast.ImportFrom):
+            if no.level:
+                base = ".".join(pacote.split(".")[:len(pacote.split(".")) - no.level + 1])
+                modulo = f"{base}.{no.module}" if no.module else base
+            else:
+                modulo = no.module or ""
+            importados.add(modulo)
+            # "from . import x" / "from .pacote import modulo": os nomes podem ser módulos
+            importados.update(f"{modulo}.{alias.name}" for alias in no.names)
+    return sorted(m for m in importados if m == PACOTE or m.startswith(PACOTE + "."))
+
+def versao_modulo(etapa):
+    """
+    Hash do código-fonte do módulo da etapa e dos módulos do pacote que ele importa,
+    direta ou indiretamente (sem importá-los): mudar um auxiliar, como o plan_compiler
+    do inject_finder, também invalida o reaproveitamento
+    """
+    nome = etapa.caminho_modulo or getattr(etapa.funcao, "__module__", None)
+    if not nome or _fonte_modulo(nome) is None:
+        # Função fora de um módulo localizável: só o próprio arquivo
+        origem = inspect.getsourcefile(etapa.funcao) if etapa.funcao else None
+        if not origem:
+            return None
+        with open(origem, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    if nome not in _versoes:
+        fontes = {}
+        pendentes = [nome]
+        while pendentes:
+            atual = pendentes.pop()
+            if atual in fontes:
+                continue
+            fonte = _fonte_modulo(atual)
+            if fonte is None:
+                continue
+            fontes[atual] = fonte[0]
+            pendentes.extend(fonte[1])
+        _versoes[nome] = _hash(fontes)
+    return _versoes[nome]
+
+def impressao_alvo(cliente, target_url):
+    """
+    Impressão da página inicial: hash do corpo, status e conjunto de headers
+    (sem os voláteis; de Set-Cookie só os nomes dos cookies). None se o alvo não responder.
+    """
+    try:
+        response = cliente.get(target_url)
+    except Exception:
+        return None
+
+    headers = {
+        nome.lower(): valor for nome, valor in response.headers.items()
+        if nome.lower() not in HEADERS_VOLATEIS
+    }
+    return _hash({
+        "status": response.status_code,
+        "corpo": hashlib.sha256(response.content).hexdigest(),
+        "headers": headers,
+        "cookies": sorted(response.cookies.keys())
+    })
+
+def assinatura_formularios(dados_parser):
+    """
+    Assinatura dos formulários: destino, método e campos (sem valores, que incluem tokens CSRF).
+    Com rastreamento, inclui a assinatura dos pontos de entrada das demais páginas (mesmos critérios)
+    """
+    formularios = []
+    for form in dados_parser.get("formularios", []):
+        formularios.append({
+            "method": form.get("method"),
+            "url": form.get("url_completa"),
+            "enctype": form.get("enctype"),
+            "campos": sorted(
+                (c.get("tag", ""), c.get("type", ""), c.get("name", "")) for c in form.get("campos", [])
+            )
+        })
+    rastreamento = dados_parser.get("rastreamento")
+    if rastreamento:
+        return _hash({"formularios": formularios, "pontos_entrada": rastreamento.get("assinatura")})
+    return _hash(formularios)
+
+# Artefatos cuja assinatura vem do próprio conteúdo; os demais herdam a impressão de quem os produziu
+ASSINATURAS_CONTEUDO = {
+    "parser": assinatura_formularios,
+}
+
+class CacheIncremental:
+    """
+    Decide, por etapa, se as entradas são as mesmas do scan anterior.
+
+    A impressão de uma etapa combina a versão do módulo, a configuração, o alvo e
+    as assinaturas das entradas: módulos sem dependências usam a impressão da
+    página inicial; os demais, a assinatura de cada artefato consumido. Assim, uma
+    página que muda sem mudar os formulários reexecuta o parser, mas não o inject_finder.
+    """
+
+    def __init__(self, artefatos, target_url, impressao_pagina, config=None, forcar=False):
+        self.artefatos = artefatos
+        self.target_url = target_url
+        self.impressao_pagina = impressao_pagina
+        self.versao_config = _hash(config or {})
+        self.forcar = forcar
+
+        self.arquivo = os.path.join(artefatos.output_dir, ARQUIVO_IMPRESSOES)
+        self.anteriores = {} if forcar else self._carregar()
+        self.atuais = {}
+        self.reaproveitadas = []
+        self._assinaturas = {}
+        self._lock = threading.Lock()
+
+    def _carregar(self):
+        if not os.path.exists(self.arquivo):
+            return {}
+        try:
+            with open(self.arquivo, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+        except Exception:
+            return {}
+        if dados.get("versao") != VERSAO_IMPRESSAO or dados.get("target_url") != self.target_url:
+            return {}
+        return dados.get("etapas", {})
+
+    def impressao(self, etapa):
+        """Impressão das entradas da etapa, ou None se alguma entrada não tiver assinatura"""
+        versao = versao_modulo(etapa)
+        if versao is None:
+            return None
+
+        with self._lock:
+            if etapa.consome:
+                entradas = {nome: self._assinaturas.get(nome) for nome in etapa.consome}
+            else:
+                entradas = {"pagina": self.impressao_pagina}
+        if any(valor is None for valor in entradas.values()):
+            return None
+
+        return _hash({
+            "formato": VERSAO_IMPRESSAO,
+            "alvo": self.target_url,
+            "modulo": versao,
+            "config": self.versao_config,
+            "entradas": entradas
+        })
+
+    def reutilizar(self, etapa, impressao):
+        """Publica os artefatos do scan anterior se a impressão bater. Retorna True se reaproveitou"""
+        if self.forcar or impressao is None:
+            return False
+        registro = self.anteriores.get(etapa.nome)
+        if not registro or registro.get("impressao") != impressao or self._expirado(etapa, registro):
+            return False
+
+        # Os arquivos precisam ser exatamente os registrados (não sobrescritos depois)
+        dados_artefatos = {}
+        for nome, conteudo in registro.get("artefatos", {}).items():
+            dados = self._ler(nome)
+            if dados is None or _hash(dados) != conteudo:
+                return False
+            dados_artefatos[nome] = dados
+        if set(dados_artefatos) != set(etapa.produz):
+            return False
+
+        for nome, dados in dados_artefatos.items():
+            self.artefatos.publicar(nome, dados, persistir=False)
+        self._registrar_assinaturas(etapa, impressao, dados_artefatos)
+        with self._lock:
+            self.atuais[etapa.nome] = registro
+            self.reaproveitadas.append(etapa.nome)
+        return True
+
+    @staticmethod
+    def _expirado(etapa, registro):
+        """
+        O parser só é reaproveitado por scanning.crawl.reuse_max_age_hours: sua impressão
+        é a da página inicial, e páginas novas mais fundas no site só aparecem rastreando de novo
+        """
+        if "parser" not in etapa.produz:
+            return False
+        crawl = get_config().get_crawl_config()
+        if not crawl["enabled"] or not crawl["reuse_max_age_hours"]:
+            return False
+        try:
+            executado = datetime.fromisoformat(registro.get("timestamp"))
+        except (TypeError, ValueError):
+            return True
+        return datetime.now() - executado > timedelta(hours=crawl["reuse_max_age_hours"])
+
+    def registrar(self, etapa, impressao, resultado):
+        """Registra a execução bem-sucedida da etapa para o próximo scan"""
+        if isinstance(resultado, dict) and "erro" in resultado:
+            return
+
+        dados_artefatos = {}
+        for nome in etapa.produz:
+            dados = self.artefatos.obter(nome, esperar=False)
+            if dados is None or (isinstance(dados, dict) and "erro" in dados):
+                return
+            dados_artefatos[nome] = dados
+        self._registrar_assinaturas(etapa, impressao, dados_artefatos)
+
+        # Só é reaproveitável quem persiste todos os artefatos em disco
+        if impressao is None or any(ARTEFATOS[nome].arquivo is None for nome in etapa.produz):
+            return
+        with self._lock:
+            self.atuais[etapa.nome] = {
+                "impressao": impressao,
+                "artefatos": {nome: _hash(dados) for nome, dados in dados_artefatos.items()},
+                "timestamp": datetime.now().isoformat()
+            }
+
+    def _registrar_assinaturas(self, etapa, impressao, dados_artefatos):
+        with self._lock:
+            for nome in etapa.produz:
+                assinar = ASSINATURAS_CONTEUDO.get(nome)
+                if assinar and nome in dados_artefatos:
+                    self._assinaturas[nome] = assinar(dados_artefatos[nome])
+                else:
+                    self._assinaturas[nome] = impressao
+
+    def _ler(self, nome):
+        caminho = self.artefatos.caminho(nome)
+        if not caminho or not os.path.exists(caminho):
+            return None
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def salvar(self):
+        """Grava as impressões (etapas que não rodaram agora mantêm o registro anterior)"""
+        with self._lock:
+            etapas = {**self.anteriores, **self.atuais}
+        return self.artefatos.salvar_json(ARQUIVO_IMPRESSOES, {
+            "versao": VERSAO_IMPRESSAO,
+            "target_url": self.target_url,
+            "timestamp": datetime.now().isoformat(),
+            "etapas": etapas
+        })
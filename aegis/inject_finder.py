@@ -3,14 +3,26 @@ AEGIS Bug Hunter - Injection Finder
 Módulo responsável por encontrar possíveis pontos de injeção
 """
 
-import os
-import json
-import requests
-import time
-import random
+import hashlib
+from itertools import islice
+from collections import Counter
 from urllib.parse import urljoin, urlparse, parse_qs, urlencode
 from datetime import datetime
 
+from .artifact_bus import barramento_local
+from .async_engine import CasoTeste, MotorAssincrono
+from .case_pruner import PodaCasos, local_achado, locais_detector
+from .config_manager import get_config
+from .http_client import HttpClient
+from .memory_writer import gravador_configurado
+from .metrics import span_atual
+from .payload_ranker import RankeadorPayloads, contexto_parametro, contexto_parametros, selecionar_payloads
+from .plan_compiler import PlanoTestes
+
+# Artefatos consumidos/produzidos (usados pelo agendador do pipeline)
+CONSOME = ("parser",)
+PRODUZ = ("injects",)
+
 def gerar_payloads_teste():
     """Gera payloads de teste para diferentes tipos de injeção"""
     payloads = {
@@ -83,13 +95,13 @@ def gerar_payloads_teste():
     }
     return payloads
 
-def testar_parametros_url(target_url):
-    """Testa parâmetros na URL para injeções"""
-    resultados = []
+def gerar_casos_parametros_url(target_url, rankeador=None):
+    """Gera casos de teste de injeção para os parâmetros da URL (ordem/corte pelo rankeador, se houver)"""
+    casos = []
     
     parsed_url = urlparse(target_url)
     if not parsed_url.query:
-        return resultados
+        return casos
     
     parametros = parse_qs(parsed_url.query)
     payloads = gerar_payloads_teste()
@@ -97,48 +109,49 @@ def testar_parametros_url(target_url):
     print(f"[inject_finder] 🔍 Testando {len(parametros)} parâmetros na URL")
     
     for param_name, param_values in parametros.items():
+        contexto_param = contexto_parametro(param_name, param_values[0] if param_values else "")
         for tipo_payload, lista_payloads in payloads.items():
-            for payload in lista_payloads[:3]:  # Limita para não ser muito agressivo
-                try:
-                    # Cria nova URL com payload
-                    novos_params = parametros.copy()
-                    novos_params[param_name] = [payload]
-                    nova_query = urlencode(novos_params, doseq=True)
-                    nova_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}?{nova_query}"
-                    
-                    # Faz requisição
-                    response = requests.get(nova_url, timeout=5)
-                    
-                    # Analisa resposta
-                    vulnerabilidade_detectada = analisar_resposta_vulnerabilidade(
-                        response, payload, tipo_payload
-                    )
-                    
-                    if vulnerabilidade_detectada:
-                        resultado = {
-                            "tipo": "parametro_url",
-                            "parametro": param_name,
-                            "payload": payload,
-                            "tipo_injecao": tipo_payload,
-                            "url_teste": nova_url,
-                            "status_code": response.status_code,
-                            "evidencia": vulnerabilidade_detectada,
-                            "timestamp": datetime.now().isoformat()
-                        }
-                        resultados.append(resultado)
-                        print(f"[inject_finder] 🚨 Possível {tipo_payload} em {param_name}")
-                    
-                    # Delay para evitar rate limiting
-                    time.sleep(random.uniform(0.5, 1.5))
-                    
-                except Exception as e:
-                    continue
+            # Limita para não ser muito agressivo
+            for payload in selecionar_payloads(rankeador, tipo_payload, lista_payloads, 3, contexto_param):
+                # Cria nova URL com payload
+                novos_params = parametros.copy()
+                novos_params[param_name] = [payload]
+                nova_query = urlencode(novos_params, doseq=True)
+                nova_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}?{nova_query}"
+                
+                casos.append(CasoTeste(
+                    "GET", nova_url, _analisar_parametro_url,
+                    contexto={"parametro": param_name, "payload": payload, "tipo_injecao": tipo_payload,
+                              "contexto_payload": contexto_param},
+                    timeout=5
+                ))
     
-    return resultados
+    return casos
 
-def testar_formularios(target_url, formularios):
-    """Testa formulários para injeções"""
-    resultados = []
+def _analisar_parametro_url(caso, response):
+    """Analisa a resposta de um caso de parâmetro de URL"""
+    ctx = caso.contexto
+    ocorrencias = detectar_indicadores(response, ctx["payload"], ctx["tipo_injecao"])
+    vulnerabilidade_detectada = descrever_evidencia(ocorrencias, response.status_code)
+    if not vulnerabilidade_detectada:
+        return []
+    
+    print(f"[inject_finder] 🚨 Possível {ctx['tipo_injecao']} em {ctx['parametro']}")
+    return [{
+        "tipo": "parametro_url",
+        "parametro": ctx["parametro"],
+        "payload": ctx["payload"],
+        "tipo_injecao": ctx["tipo_injecao"],
+        "url_teste": caso.url,
+        "status_code": response.status_code,
+        "evidencia": vulnerabilidade_detectada,
+        "indicadores": resumir_ocorrencias(ocorrencias),
+        "timestamp": datetime.now().isoformat()
+    }]
+
+def gerar_casos_formularios(formularios, rankeador=None):
+    """Gera casos de teste de injeção para os formulários (ordem/corte pelo rankeador, se houver)"""
+    casos = []
     payloads = gerar_payloads_teste()
     
     print(f"[inject_finder] 📝 Testando {len(formularios)} formulários")
@@ -147,173 +160,242 @@ def testar_formularios(target_url, formularios):
         if not form.get("url_completa") or not form.get("campos"):
             continue
         
+        contexto_form = contexto_parametros((campo.get("name", ""), campo.get("value", "")) for campo in form["campos"]
+                                            if campo.get("name") and campo.get("type") != "hidden")
         for tipo_payload, lista_payloads in payloads.items():
-            for payload in lista_payloads[:2]:  # Limita payloads por formulário
-                try:
-                    # Prepara dados do formulário
-                    form_data = {}
-                    for campo in form["campos"]:
-                        if campo.get("name"):
-                            if campo.get("type") == "hidden":
-                                form_data[campo["name"]] = campo.get("value", "")
-                            else:
-                                form_data[campo["name"]] = payload
-                    
-                    # Faz requisição
-                    if form["method"] == "POST":
-                        response = requests.post(form["url_completa"], data=form_data, timeout=5)
-                    else:
-                        response = requests.get(form["url_completa"], params=form_data, timeout=5)
-                    
-                    # Analisa resposta
-                    vulnerabilidade_detectada = analisar_resposta_vulnerabilidade(
-                        response, payload, tipo_payload
-                    )
-                    
-                    if vulnerabilidade_detectada:
-                        resultado = {
-                            "tipo": "formulario",
-                            "form_action": form["url_completa"],
-                            "form_method": form["method"],
-                            "payload": payload,
-                            "tipo_injecao": tipo_payload,
-                            "status_code": response.status_code,
-                            "evidencia": vulnerabilidade_detectada,
-                            "timestamp": datetime.now().isoformat()
-                        }
-                        resultados.append(resultado)
-                        print(f"[inject_finder] 🚨 Possível {tipo_payload} em formulário")
-                    
-                    # Delay para evitar rate limiting
-                    time.sleep(random.uniform(0.5, 1.5))
-                    
-                except Exception as e:
-                    continue
+            # Limita payloads por formulário
+            for payload in selecionar_payloads(rankeador, tipo_payload, lista_payloads, 2, contexto_form):
+                # Prepara dados do formulário
+                form_data = {}
+                for campo in form["campos"]:
+                    if campo.get("name"):
+                        if campo.get("type") == "hidden":
+                            form_data[campo["name"]] = campo.get("value", "")
+                        else:
+                            form_data[campo["name"]] = payload
+                
+                contexto = {"form": form, "payload": payload, "tipo_injecao": tipo_payload, "contexto_payload": contexto_form}
+                if form["method"] == "POST":
+                    casos.append(CasoTeste("POST", form["url_completa"], _analisar_formulario,
+                                           contexto=contexto, data=form_data, timeout=5))
+                else:
+                    casos.append(CasoTeste("GET", form["url_completa"], _analisar_formulario,
+                                           contexto=contexto, params=form_data, timeout=5))
     
-    return resultados
+    return casos
 
-def testar_headers_injection(target_url):
-    """Testa injeção em headers HTTP"""
-    resultados = []
-    
-    headers_teste = [
-        "User-Agent",
-        "Referer", 
-        "X-Forwarded-For",
-        "X-Real-IP",
-        "X-Originating-IP",
-        "X-Remote-IP",
-        "X-Client-IP"
-    ]
+def _analisar_formulario(caso, response):
+    """Analisa a resposta de um caso de formulário"""
+    ctx = caso.contexto
+    ocorrencias = detectar_indicadores(response, ctx["payload"], ctx["tipo_injecao"])
+    vulnerabilidade_detectada = descrever_evidencia(ocorrencias, response.status_code)
+    if not vulnerabilidade_detectada:
+        return []
     
-    payloads_headers = [
-        "<script>alert('XSS')</script>",
-        "'; DROP TABLE users; --",
-        "$(whoami)",
-        "../../../etc/passwd",
-        "{{7*7}}"
-    ]
+    print(f"[inject_finder] 🚨 Possível {ctx['tipo_injecao']} em formulário")
+    return [{
+        "tipo": "formulario",
+        "form_action": ctx["form"]["url_completa"],
+        "form_method": ctx["form"]["method"],
+        "payload": ctx["payload"],
+        "tipo_injecao": ctx["tipo_injecao"],
+        "status_code": response.status_code,
+        "evidencia": vulnerabilidade_detectada,
+        "indicadores": resumir_ocorrencias(ocorrencias),
+        "timestamp": datetime.now().isoformat()
+    }]
+
+HEADERS_TESTE = [
+    "User-Agent",
+    "Referer", 
+    "X-Forwarded-For",
+    "X-Real-IP",
+    "X-Originating-IP",
+    "X-Remote-IP",
+    "X-Client-IP"
+]
+
+PAYLOADS_HEADERS = [
+    "<script>alert('XSS')</script>",
+    "'; DROP TABLE users; --",
+    "$(whoami)",
+    "../../../etc/passwd",
+    "{{7*7}}"
+]
+
+def gerar_casos_headers_injection(target_url):
+    """Gera casos de teste de injeção em headers HTTP"""
+    casos = []
     
     print(f"[inject_finder] 📡 Testando injeção em headers")
     
-    for header_name in headers_teste:
-        for payload in payloads_headers:
-            try:
-                headers = {header_name: payload}
-                response = requests.get(target_url, headers=headers, timeout=5)
-                
-                # Verifica se o payload aparece na resposta
-                if payload in response.text or payload in str(response.headers):
-                    resultado = {
-                        "tipo": "header_injection",
-                        "header": header_name,
-                        "payload": payload,
-                        "status_code": response.status_code,
-                        "evidencia": f"Payload refletido na resposta",
-                        "timestamp": datetime.now().isoformat()
-                    }
-                    resultados.append(resultado)
-                    print(f"[inject_finder] 🚨 Possível header injection em {header_name}")
-                
-                time.sleep(random.uniform(0.3, 1.0))
-                
-            except Exception as e:
-                continue
+    for header_name in HEADERS_TESTE:
+        for payload in PAYLOADS_HEADERS:
+            casos.append(CasoTeste(
+                "GET", target_url, _analisar_header,
+                contexto={"header": header_name, "payload": payload},
+                headers={header_name: payload}, timeout=5
+            ))
     
-    return resultados
+    return casos
 
-def analisar_resposta_vulnerabilidade(response, payload, tipo_payload):
-    """Analisa a resposta para detectar vulnerabilidades"""
-    response_text = response.text.lower()
-    response_headers = str(response.headers).lower()
-    
-    # Indicadores por tipo de injeção
-    indicadores = {
-        "sql_injection": [
-            "sql syntax",
-            "mysql_fetch",
-            "ora-01756",
-            "microsoft ole db",
-            "odbc sql server driver",
-            "postgresql query failed",
-            "warning: mysql",
-            "valid mysql result",
-            "mysqlclient",
-            "syntax error"
-        ],
-        "xss": [
-            payload.lower() in response_text,
-            payload.lower() in response_headers
-        ],
-        "command_injection": [
-            "uid=",
-            "gid=",
-            "groups=",
-            "root:",
-            "/bin/bash",
-            "/bin/sh",
-            "command not found",
-            "ping statistics"
-        ],
-        "ldap_injection": [
-            "ldap_search",
-            "ldap error",
-            "invalid dn syntax",
-            "ldap: error code"
-        ],
-        "xpath_injection": [
-            "xpath syntax error",
-            "xpath expression",
-            "xmlxpatheval",
-            "xpath error"
-        ],
-        "nosql_injection": [
-            "mongodb",
-            "bson",
-            "couchdb",
-            "redis error",
-            "syntax error near"
-        ]
-    }
+def _analisar_header(caso, response):
+    """Verifica se o payload do header aparece na resposta"""
+    ctx = caso.contexto
+    payload = ctx["payload"]
+    if payload not in response.text and payload not in str(response.headers):
+        return []
     
-    if tipo_payload in indicadores:
-        for indicador in indicadores[tipo_payload]:
-            if isinstance(indicador, bool):
-                if indicador:
-                    return "Payload refletido na resposta"
-            elif isinstance(indicador, str):
-                if indicador in response_text or indicador in response_headers:
-                    return f"Indicador encontrado: {indicador}"
+    print(f"[inject_finder] 🚨 Possível header injection em {ctx['header']}")
+    return [{
+        "tipo": "header_injection",
+        "header": ctx["header"],
+        "payload": payload,
+        "status_code": response.status_code,
+        "evidencia": f"Payload refletido na resposta",
+        "timestamp": datetime.now().isoformat()
+    }]
+
+# Indicadores de erro por tipo de injeção (XSS é detectado pela reflexão do próprio payload)
+INDICADORES_VULNERABILIDADE = {
+    "sql_injection": [
+        "sql syntax",
+        "mysql_fetch",
+        "ora-01756",
+        "microsoft ole db",
+        "odbc sql server driver",
+        "postgresql query failed",
+        "warning: mysql",
+        "valid mysql result",
+        "mysqlclient",
+        "syntax error"
+    ],
+    "command_injection": [
+        "uid=",
+        "gid=",
+        "groups=",
+        "root:",
+        "/bin/bash",
+        "/bin/sh",
+        "command not found",
+        "ping statistics"
+    ],
+    "ldap_injection": [
+        "ldap_search",
+        "ldap error",
+        "invalid dn syntax",
+        "ldap: error code"
+    ],
+    "xpath_injection": [
+        "xpath syntax error",
+        "xpath expression",
+        "xmlxpatheval",
+        "xpath error"
+    ],
+    "nosql_injection": [
+        "mongodb",
+        "bson",
+        "couchdb",
+        "redis error",
+        "syntax error near"
+    ]
+}
+
+class MatcherIndicadores:
+    """
+    Tabela de indicadores compilada uma única vez: cada assinatura distinta é
+    procurada uma vez no texto (já em minúsculas) e cada ocorrência é atribuída
+    a todos os tipos que a declaram, com o offset em que aparece.
+    """
+
+    def __init__(self, indicadores):
+        self._tipos_por_indicador = {}
+        for tipo, lista in indicadores.items():
+            for indicador in lista:
+                tipos = self._tipos_por_indicador.setdefault(indicador.lower(), [])
+                if tipo not in tipos:
+                    tipos.append(tipo)
+
+    def encontrar(self, texto, origem="corpo", tipos=None):
+        """Todas as ocorrências em texto minúsculo, ordenadas por offset"""
+        ocorrencias = []
+        for indicador, tipos_indicador in self._tipos_por_indicador.items():
+            if tipos is not None:
+                tipos_indicador = [t for t in tipos_indicador if t in tipos]
+                if not tipos_indicador:
+                    continue
+            ocorrencias.extend(_buscar_ocorrencias(texto, indicador, tipos_indicador, origem))
+        ocorrencias.sort(key=lambda o: (o["origem"], o["offset"]))
+        return ocorrencias
+
+def _buscar_ocorrencias(texto, indicador, tipos, origem):
+    """str.find em laço: busca em C, sem reconstruir o texto a cada indicador"""
+    ocorrencias = []
+    inicio = texto.find(indicador)
+    while indicador and inicio != -1:
+        for tipo in tipos:
+            ocorrencias.append({"tipo": tipo, "indicador": indicador, "offset": inicio, "origem": origem})
+        inicio = texto.find(indicador, inicio + 1)
+    return ocorrencias
+
+MATCHER_INDICADORES = MatcherIndicadores(INDICADORES_VULNERABILIDADE)
+
+def textos_minusculos(response):
+    """
+    (("corpo", texto), ("headers", texto)) da resposta em minúsculas. Calculado uma vez e
+    guardado na própria resposta: os detectores de uma requisição mesclada a compartilham
+    """
+    textos = getattr(response, "_aegis_minusculos", None)
+    if textos is None:
+        textos = (("corpo", response.text.lower()), ("headers", str(response.headers).lower()))
+        try:
+            response._aegis_minusculos = textos
+        except AttributeError:
+            pass
+    return textos
+
+def detectar_indicadores(response, payload, tipo_payload):
+    """Retorna todas as ocorrências de indicadores do tipo no corpo e nos headers da resposta"""
+    ocorrencias = []
+    for origem, texto in textos_minusculos(response):
+        if tipo_payload == "xss":
+            ocorrencias.extend(_buscar_ocorrencias(texto, payload.lower(), ["xss"], origem))
+        else:
+            ocorrencias.extend(MATCHER_INDICADORES.encontrar(texto, origem, tipos=(tipo_payload,)))
+    return ocorrencias
+
+def resumir_ocorrencias(ocorrencias):
+    """Primeira ocorrência de cada indicador/origem com o total de ocorrências"""
+    resumo = {}
+    for ocorrencia in ocorrencias:
+        chave = (ocorrencia["indicador"], ocorrencia["origem"])
+        if chave in resumo:
+            resumo[chave]["ocorrencias"] += 1
+        else:
+            resumo[chave] = dict(ocorrencia, ocorrencias=1)
+    return list(resumo.values())
+
+def descrever_evidencia(ocorrencias, status_code):
+    """Texto de evidência a partir das ocorrências (None se nada indicar vulnerabilidade)"""
+    if ocorrencias:
+        if ocorrencias[0]["tipo"] == "xss":
+            return "Payload refletido na resposta"
+        indicadores = list(dict.fromkeys(o["indicador"] for o in ocorrencias))
+        return f"Indicador encontrado: {', '.join(indicadores)}"
     
     # Verifica mudanças no status code que podem indicar vulnerabilidade
-    if response.status_code == 500:
+    if status_code == 500:
         return "Erro interno do servidor (possível injeção)"
     
     return None
 
-def testar_file_inclusion(target_url):
-    """Testa vulnerabilidades de inclusão de arquivos"""
-    resultados = []
+def analisar_resposta_vulnerabilidade(response, payload, tipo_payload):
+    """Analisa a resposta para detectar vulnerabilidades"""
+    return descrever_evidencia(detectar_indicadores(response, payload, tipo_payload), response.status_code)
+
+def gerar_casos_file_inclusion(target_url, rankeador=None):
+    """Gera casos de teste de inclusão de arquivos (ordem/corte pelo rankeador, se houver)"""
+    casos = []
     
     payloads_lfi = [
         "../../../etc/passwd",
@@ -328,47 +410,388 @@ def testar_file_inclusion(target_url):
     # Testa apenas se houver parâmetros na URL
     parsed_url = urlparse(target_url)
     if not parsed_url.query:
-        return resultados
+        return casos
     
     parametros = parse_qs(parsed_url.query)
     
     print(f"[inject_finder] 📁 Testando inclusão de arquivos")
     
-    for param_name in parametros.keys():
-        for payload in payloads_lfi:
-            try:
-                novos_params = parametros.copy()
-                novos_params[param_name] = [payload]
-                nova_query = urlencode(novos_params, doseq=True)
-                nova_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}?{nova_query}"
-                
-                response = requests.get(nova_url, timeout=5)
-                
-                # Verifica indicadores de LFI
-                if ("root:" in response.text and "/bin/" in response.text) or \
-                   ("# localhost" in response.text and "127.0.0.1" in response.text):
-                    resultado = {
-                        "tipo": "file_inclusion",
-                        "parametro": param_name,
-                        "payload": payload,
-                        "url_teste": nova_url,
-                        "status_code": response.status_code,
-                        "evidencia": "Conteúdo de arquivo sistema detectado",
-                        "timestamp": datetime.now().isoformat()
-                    }
-                    resultados.append(resultado)
-                    print(f"[inject_finder] 🚨 Possível LFI em {param_name}")
-                
-                time.sleep(random.uniform(0.5, 1.0))
-                
-            except Exception as e:
-                continue
+    for param_name, param_values in parametros.items():
+        contexto_param = contexto_parametro(param_name, param_values[0] if param_values else "")
+        for payload in selecionar_payloads(rankeador, "file_inclusion", payloads_lfi, len(payloads_lfi), contexto_param):
+            novos_params = parametros.copy()
+            novos_params[param_name] = [payload]
+            nova_query = urlencode(novos_params, doseq=True)
+            nova_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}?{nova_query}"
+            
+            casos.append(CasoTeste(
+                "GET", nova_url, _analisar_file_inclusion,
+                contexto={"parametro": param_name, "payload": payload, "contexto_payload": contexto_param},
+                timeout=5
+            ))
+    
+    return casos
+
+def _analisar_file_inclusion(caso, response):
+    """Verifica indicadores de LFI na resposta"""
+    ctx = caso.contexto
+    if not (("root:" in response.text and "/bin/" in response.text) or
+            ("# localhost" in response.text and "127.0.0.1" in response.text)):
+        return []
+    
+    print(f"[inject_finder] 🚨 Possível LFI em {ctx['parametro']}")
+    return [{
+        "tipo": "file_inclusion",
+        "parametro": ctx["parametro"],
+        "payload": ctx["payload"],
+        "url_teste": caso.url,
+        "status_code": response.status_code,
+        "evidencia": "Conteúdo de arquivo sistema detectado",
+        "timestamp": datetime.now().isoformat()
+    }]
+
+# Modo em lote: uma requisição leva a mesma sonda a vários parâmetros/headers,
+# cada um com seu próprio canário. Reflexões são atribuídas pelo canário; erros
+# sem canário (ex: mensagem de SQL) disparam bisseção até isolar o parâmetro.
+# Se o sinal some nas metades (o erro depende de dois parâmetros juntos, por
+# exemplo), os parâmetros do último lote positivo são retestados um a um e, sem
+# sinal também assim, o lote é relatado com confiança baixa.
+STATUS_LOTE_REJEITADO = (400, 413, 414, 431)
+CONFIANCA_LOTE = 0.3
+
+def _gerar_canario(nome):
+    """
+    Marcador alfanumérico do parâmetro/header (sobrevive a URL encoding e é fácil de achar
+    no corpo). Derivado do nome: scans repetidos geram as mesmas requisições, o que
+    permite reproduzi-los a partir de uma gravação do tráfego
+    """
+    return f"zq{hashlib.sha256(f'aegis:{nome}'.encode('utf-8')).hexdigest()[:8]}"
+
+def _reflexoes_canarios(response, canarios, payload, diferenciar_caixa=False):
+    """
+    Nomes cujo canário+payload aparece refletido no corpo ou nos headers (sem
+    diferenciar caixa, como detectar_indicadores, salvo com diferenciar_caixa)
+    """
+    if diferenciar_caixa:
+        textos = (response.text, str(response.headers))
+        return [nome for nome, canario in canarios.items()
+                if any(canario + payload in texto for texto in textos)]
+    textos = textos_minusculos(response)
+    return [nome for nome, canario in canarios.items()
+            if any((canario + payload).lower() in texto for _, texto in textos)]
+
+def _dividir_lote(nomes):
+    meio = len(nomes) // 2
+    return [nomes[:meio], nomes[meio:]]
+
+def gerar_casos_parametros_url_lote(target_url, min_parametros=2, rankeador=None):
+    """
+    Gera casos em lote para os parâmetros da URL: uma requisição por payload com
+    todos os parâmetros injetados. Com menos de min_parametros usa o modo individual.
+    O contexto do lote (para o rankeador) reúne os contextos de todos os parâmetros.
+    """
+    parsed_url = urlparse(target_url)
+    if not parsed_url.query:
+        return []
+    
+    parametros = parse_qs(parsed_url.query)
+    if len(parametros) < max(2, min_parametros):
+        return gerar_casos_parametros_url(target_url, rankeador)
+    
+    print(f"[inject_finder] 🔍 Testando {len(parametros)} parâmetros na URL (em lote com canários)")
+    
+    # Um canário por parâmetro, o mesmo em todas as requisições: payloads equivalentes
+    # continuam gerando requisições equivalentes (deduplicadas pelo plano de testes)
+    base = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}"
+    canarios = {nome: _gerar_canario(nome) for nome in parametros}
+    contexto_lote = contexto_parametros((nome, valores[0] if valores else "") for nome, valores in parametros.items())
+    casos = []
+    for tipo_payload, lista_payloads in gerar_payloads_teste().items():
+        # Limita para não ser muito agressivo
+        for payload in selecionar_payloads(rankeador, tipo_payload, lista_payloads, 3, contexto_lote):
+            casos.append(_caso_lote_parametros(base, parametros, canarios, payload, tipo_payload, contexto_lote))
+    
+    return casos
+
+def _caso_lote_parametros(base, parametros, canarios, payload, tipo_payload, contexto_payload="", bisseccao=None):
+    novos_params = parametros.copy()
+    for nome, canario in canarios.items():
+        novos_params[nome] = [canario + payload]
+    nova_url = f"{base}?{urlencode(novos_params, doseq=True)}"
+    
+    contexto = {"base": base, "parametros": parametros, "canarios": canarios,
+                "payload": payload, "tipo_injecao": tipo_payload, "contexto_payload": contexto_payload}
+    if bisseccao is not None:
+        contexto["bisseccao"] = bisseccao
+    return CasoTeste("GET", nova_url, _analisar_lote_parametros, contexto=contexto, timeout=5)
+
+def _subcasos_lote(ctx, grupos, bisseccao):
+    """Um caso por grupo de nomes do lote, todos ligados ao mesmo estado de bisseção"""
+    bisseccao["restantes"] += len(grupos)
+    return [_caso_lote_parametros(ctx["base"], ctx["parametros"], {n: bisseccao["canarios"][n] for n in grupo},
+                                  ctx["payload"], ctx["tipo_injecao"], ctx.get("contexto_payload", ""), bisseccao)
+            for grupo in grupos]
+
+def _sinal_perdido(ctx, bisseccao):
+    """
+    Todos os subcasos de um lote positivo voltaram sem sinal: retesta os parâmetros
+    um a um (se as metades ainda eram lotes) ou relata o lote com confiança baixa
+    """
+    nomes = bisseccao["nomes"]
+    if not bisseccao["individual"] and len(nomes) > 2:
+        print(f"[inject_finder] 🔁 Sinal perdido na bisseção, retestando {len(nomes)} parâmetros individualmente")
+        return _subcasos_lote(ctx, [[nome] for nome in nomes], dict(bisseccao, restantes=0, sinal=False, individual=True))
+    
+    print(f"[inject_finder] ⚠️ Possível {ctx['tipo_injecao']} no lote {', '.join(nomes)} (não isolado)")
+    return [{
+        "tipo": "parametro_url",
+        "parametro": ", ".join(nomes),
+        "parametros": nomes,
+        "payload": ctx["payload"],
+        "tipo_injecao": ctx["tipo_injecao"],
+        "url_teste": bisseccao["url_teste"],
+        "status_code": bisseccao["status_code"],
+        "evidencia": f"{bisseccao['evidencia']} (só com os parâmetros em lote)",
+        "indicadores": bisseccao["indicadores"],
+        "confianca": CONFIANCA_LOTE,
+        "timestamp": datetime.now().isoformat()
+    }]
+
+def _analisar_lote_parametros(caso, response):
+    """
+    Atribui reflexões pelo canário; erros em lote com mais de um parâmetro são
+    bisseccionados. O estado da bisseção (contexto["bisseccao"]) é compartilhado
+    pelos subcasos de um lote positivo: o último a voltar sem sinal aciona o retorno
+    """
+    ctx = caso.contexto
+    nomes = list(ctx["canarios"])
+    bisseccao = ctx.get("bisseccao")
+    if bisseccao is not None:
+        bisseccao["restantes"] -= 1
+    
+    ocorrencias = []
+    positivos = []
+    if ctx["tipo_injecao"] == "xss":
+        positivos = _reflexoes_canarios(response, ctx["canarios"], ctx["payload"])
+    else:
+        ocorrencias = detectar_indicadores(response, ctx["payload"], ctx["tipo_injecao"])
+    evidencia = "Payload refletido na resposta" if positivos else descrever_evidencia(ocorrencias, response.status_code)
+    if evidencia and not positivos and len(nomes) == 1:
+        positivos = nomes
+    if evidencia and bisseccao is not None:
+        bisseccao["sinal"] = True
     
-    return resultados
+    rejeitado = response.status_code in STATUS_LOTE_REJEITADO
+    if (evidencia or rejeitado) and not positivos and len(nomes) > 1:
+        if evidencia:
+            # Novo lote positivo: guarda o que ele mostrou para o caso de o sinal sumir nas metades
+            bisseccao = {"nomes": nomes, "canarios": ctx["canarios"], "url_teste": caso.url, "status_code": response.status_code,
+                         "evidencia": evidencia, "indicadores": resumir_ocorrencias(ocorrencias),
+                         "restantes": 0, "sinal": False, "individual": False}
+        elif bisseccao is None:
+            return [_caso_lote_parametros(ctx["base"], ctx["parametros"], {n: ctx["canarios"][n] for n in metade},
+                                          ctx["payload"], ctx["tipo_injecao"], ctx.get("contexto_payload", ""))
+                    for metade in _dividir_lote(nomes)]
+        # Lote rejeitado dentro de uma bisseção: as metades continuam valendo por ele
+        return _subcasos_lote(ctx, _dividir_lote(nomes), bisseccao)
+    
+    if bisseccao is not None and not evidencia and bisseccao["restantes"] == 0 and not bisseccao["sinal"]:
+        return _sinal_perdido(ctx, bisseccao)
+    
+    achados = []
+    for nome in positivos:
+        print(f"[inject_finder] 🚨 Possível {ctx['tipo_injecao']} em {nome}")
+        achados.append({
+            "tipo": "parametro_url",
+            "parametro": nome,
+            "payload": ctx["payload"],
+            "tipo_injecao": ctx["tipo_injecao"],
+            "url_teste": caso.url,
+            "status_code": response.status_code,
+            "evidencia": evidencia,
+            "indicadores": resumir_ocorrencias(ocorrencias),
+            "canario": ctx["canarios"][nome],
+            "timestamp": datetime.now().isoformat()
+        })
+    return achados
+
+def gerar_casos_headers_injection_lote(target_url):
+    """Gera casos em lote de injeção em headers: uma requisição por payload com todos os headers"""
+    print(f"[inject_finder] 📡 Testando injeção em headers (em lote com canários)")
+    canarios = {nome: _gerar_canario(nome) for nome in HEADERS_TESTE}
+    return [_caso_lote_headers(target_url, canarios, payload) for payload in PAYLOADS_HEADERS]
+
+def _caso_lote_headers(target_url, canarios, payload):
+    nomes = list(canarios)
+    return CasoTeste(
+        "GET", target_url, _analisar_lote_headers,
+        contexto={"canarios": canarios, "payload": payload},
+        headers={nome: canarios[nome] + payload for nome in nomes}, timeout=5
+    )
+
+def _analisar_lote_headers(caso, response):
+    """Atribui reflexões de header pelo canário; lotes rejeitados pelo servidor são divididos"""
+    ctx = caso.contexto
+    nomes = list(ctx["canarios"])
+    # Como em _analisar_header, a reflexão precisa manter a caixa do payload
+    positivos = _reflexoes_canarios(response, ctx["canarios"], ctx["payload"], diferenciar_caixa=True)
+    
+    if not positivos and response.status_code in STATUS_LOTE_REJEITADO and len(nomes) > 1:
+        return [_caso_lote_headers(caso.url, {n: ctx["canarios"][n] for n in metade}, ctx["payload"])
+                for metade in _dividir_lote(nomes)]
+    
+    achados = []
+    for nome in positivos:
+        print(f"[inject_finder] 🚨 Possível header injection em {nome}")
+        achados.append({
+            "tipo": "header_injection",
+            "header": nome,
+            "payload": ctx["payload"],
+            "status_code": response.status_code,
+            "evidencia": f"Payload refletido na resposta",
+            "canario": ctx["canarios"][nome],
+            "timestamp": datetime.now().isoformat()
+        })
+    return achados
+
+def compilar_plano(target_url, formularios, rankeador=None):
+    """
+    Gera todos os casos (parâmetros URL, formulários, headers, file inclusion) e
+    compila o plano de requisições deduplicado. Com um rankeador (payload_ranker),
+    os payloads de cada tipo são ordenados e cortados pelo histórico do alvo.
+    """
+    fuzzing = get_config().get_fuzzing_config()
+    if fuzzing["canary_batching"]:
+        casos_url = gerar_casos_parametros_url_lote(target_url, fuzzing["canary_min_params"], rankeador)
+        casos_headers = gerar_casos_headers_injection_lote(target_url)
+    else:
+        casos_url = gerar_casos_parametros_url(target_url, rankeador)
+        casos_headers = gerar_casos_headers_injection(target_url)
+    
+    return PlanoTestes(
+        casos_url +
+        gerar_casos_formularios(formularios, rankeador) +
+        casos_headers +
+        gerar_casos_file_inclusion(target_url, rankeador)
+    )
+
+def compilar_plano_pontos(pontos, rankeador=None):
+    """
+    Plano de um lote de pontos de entrada do rastreamento (crawler): parâmetros e
+    inclusão de arquivos de cada URL e os formulários. Headers são testados só no alvo.
+    """
+    fuzzing = get_config().get_fuzzing_config()
+    casos = []
+    for ponto in pontos:
+        if ponto["tipo"] != "url":
+            continue
+        if fuzzing["canary_batching"]:
+            casos += gerar_casos_parametros_url_lote(ponto["url"], fuzzing["canary_min_params"], rankeador)
+        else:
+            casos += gerar_casos_parametros_url(ponto["url"], rankeador)
+        casos += gerar_casos_file_inclusion(ponto["url"], rankeador)
+    
+    formularios = [ponto["form"] for ponto in pontos if ponto["tipo"] == "formulario"]
+    if formularios:
+        casos += gerar_casos_formularios(formularios, rankeador)
+    return PlanoTestes(casos)
+
+def _em_lotes(itens, tamanho):
+    """Listas de até `tamanho` itens, consumindo o iterável aos poucos"""
+    itens = iter(itens)
+    while True:
+        lote = list(islice(itens, max(1, int(tamanho))))
+        if not lote:
+            return
+        yield lote
+
+# Tipo dos detectores cujo contexto não traz tipo_injecao (mesmo "tipo" dos achados)
+TIPO_POR_ANALISADOR = {
+    _analisar_file_inclusion: "file_inclusion",
+    _analisar_header: "header_injection",
+    _analisar_lote_headers: "header_injection",
+}
+
+def _tipo_detector(detector):
+    return detector.contexto.get("tipo_injecao") or TIPO_POR_ANALISADOR.get(detector.analisar)
 
-def executar(target_url):
+def resultados_payloads(plano, achados, podados=()):
+    """
+    (payload, tipo, usos, sucessos, contexto) de cada payload do plano, para a memória.
+    O contexto é o do parâmetro no payload_ranker; acertos são atribuídos pelo local do achado.
+    Detectores podados na execução (podados) não contam como uso. Payloads enviados com
+    outra caixa (plano mesclado) contam para o payload da lista (payload_original).
+    """
+    ignorados = {id(detector) for detector in podados}
+    usos = Counter()
+    origens = {}
+    for requisicao in plano.requisicoes:
+        for detector in requisicao.detectores:
+            ctx = detector.contexto
+            tipo = _tipo_detector(detector)
+            if tipo and "payload" in ctx and id(detector) not in ignorados:
+                contexto = ctx.get("contexto_payload", "")
+                original = ctx.get("payload_original", ctx["payload"])
+                usos[(original, tipo, contexto)] += 1
+                for local in locais_detector(ctx)[1]:
+                    origens[(ctx["payload"], tipo, local)] = (original, contexto)
+    sucessos = Counter()
+    for achado in achados:
+        payload, tipo = achado.get("payload"), achado.get("tipo_injecao", achado.get("tipo"))
+        original, contexto = origens.get((payload, tipo, local_achado(achado)[1]), (payload, ""))
+        sucessos[(original, tipo, contexto)] += 1
+    return [(payload, tipo, n, min(n, sucessos[(payload, tipo, contexto)]), contexto)
+            for (payload, tipo, contexto), n in usos.items()]
+
+def executar_casos(casos, cliente=None, estatisticas=None, poda=None):
+    """
+    Executa casos de teste no motor assíncrono (ritmo por host a cargo do controlador de taxa do cliente).
+    Se estatisticas (dict) for informado, recebe o total de requisições enviadas, incluindo bisseções,
+    e o que a poda (fuzzing.pruning) deixou de enviar nesta execução. Uma política de poda
+    pode ser compartilhada entre execuções (padrão: uma nova, da configuração).
+    """
+    cliente = cliente or HttpClient()
+    scanning = get_config().get_scanning_config()
+    poda = poda or PodaCasos.configurada(_tipo_detector)
+    inicio_podados = len(poda.podados) if poda is not None else 0
+    motor = MotorAssincrono(cliente, concorrencia=scanning["max_threads"], poda=poda)
+    achados = motor.executar(casos)
+    if estatisticas is not None:
+        estatisticas["total_requisicoes"] = motor.total_requisicoes
+        estatisticas["total_erros"] = motor.total_erros
+        if poda is not None:
+            estatisticas["poda"] = poda.estatisticas()
+            estatisticas["podados"] = poda.podados[inicio_podados:]
+    return achados
+
+def _executar_plano(plano, target_url, cliente, poda, gravador, estatisticas):
+    """Executa o plano; usos e acertos de cada payload vão para a memória em segundo plano"""
+    achados = executar_casos(plano.casos(), cliente, estatisticas, poda)
+    if gravador is not None:
+        gravador.registrar_payloads(target_url, resultados_payloads(plano, achados, estatisticas.get("podados", ())))
+    return achados
+
+def testar_parametros_url(target_url, cliente=None):
+    """Testa parâmetros na URL para injeções"""
+    return executar_casos(gerar_casos_parametros_url(target_url), cliente)
+
+def testar_formularios(target_url, formularios, cliente=None):
+    """Testa formulários para injeções"""
+    return executar_casos(gerar_casos_formularios(formularios), cliente)
+
+def testar_headers_injection(target_url, cliente=None):
+    """Testa injeção em headers HTTP"""
+    return executar_casos(gerar_casos_headers_injection(target_url), cliente)
+
+def testar_file_inclusion(target_url, cliente=None):
+    """Testa vulnerabilidades de inclusão de arquivos"""
+    return executar_casos(gerar_casos_file_inclusion(target_url), cliente)
+
+def executar(target_url, *, cliente=None, artefatos=None):
     """Executa busca completa por pontos de injeção"""
     print(f"[inject_finder] 🔍 Buscando vetores de injeção em: {target_url}")
+    cliente = cliente or HttpClient()
+    artefatos = artefatos or barramento_local(target_url)
     
     resultados_finais = {
         "target_url": target_url,
@@ -379,46 +802,72 @@ def executar(target_url):
     }
     
     try:
-        # Carrega dados do parser se disponível
-        site_name = target_url.replace('https://', '').replace('http://', '').replace('/', '_')
-        parser_file = f"output/{site_name}/parser.json"
-        formularios = []
-        
-        if os.path.exists(parser_file):
-            with open(parser_file, 'r', encoding='utf-8') as f:
-                parser_data = json.load(f)
-                formularios = parser_data.get("formularios", [])
+        # Formulários descobertos pelo parser (artefato em memória)
+        dados_parser = artefatos.obter("parser", {})
+        formularios = dados_parser.get("formularios", [])
         
         # Executa testes
         print(f"[inject_finder] 🧪 Iniciando testes de injeção...")
         
-        # Testa parâmetros URL
-        vulns_url = testar_parametros_url(target_url)
-        resultados_finais["vulnerabilidades_encontradas"].extend(vulns_url)
+        # Compila o plano (uma requisição por combinação única, alimentando todos os
+        # detectores interessados) e executa em um único motor assíncrono
+        # Histórico de payloads lido uma vez por scan; ordenar e cortar não consulta o banco
+        rankeador = RankeadorPayloads.carregar(target_url, cliente)
+        plano = compilar_plano(target_url, formularios, rankeador)
+        artefatos.salvar_json("plano_testes.json", plano.para_dict(target_url))
+        print(f"[inject_finder] 🗺️ Plano: {plano.total_casos} testes em {len(plano.requisicoes)} requisições ({plano.requisicoes_economizadas} deduplicadas)")
+        
+        resultados_finais["total_testes"] = plano.total_casos
+        resultados_finais["requisicoes_planejadas"] = len(plano.requisicoes)
+        if rankeador is not None:
+            resultados_finais["priorizacao_payloads"] = rankeador.estatisticas()
         
-        # Testa formulários
-        vulns_forms = testar_formularios(target_url, formularios)
-        resultados_finais["vulnerabilidades_encontradas"].extend(vulns_forms)
+        # Uma política de poda para o alvo e os pontos do rastreamento
+        poda = PodaCasos.configurada(_tipo_detector)
+        # Na reprodução (--replay) a memória não é alterada: o scan gravado já foi contado
+        gravador = None if cliente.offline else gravador_configurado("store_payloads")
+        estatisticas = {}
+        resultados_finais["vulnerabilidades_encontradas"].extend(_executar_plano(plano, target_url, cliente, poda, gravador, estatisticas))
+        resultados_finais["total_requisicoes"] = estatisticas.get("total_requisicoes", len(plano.requisicoes))
         
-        # Testa headers
-        vulns_headers = testar_headers_injection(target_url)
-        resultados_finais["vulnerabilidades_encontradas"].extend(vulns_headers)
+        # Pontos de entrada das demais páginas (crawler): lidos do fluxo do parser em lotes,
+        # cada lote compilado, executado e descartado antes do próximo
+        rastreamento = dados_parser.get("rastreamento")
+        if rastreamento:
+            resumo = {"pontos_testados": 0, "lotes": 0, "total_testes": 0, "requisicoes_planejadas": 0, "total_requisicoes": 0}
+            lote = get_config().get_crawl_config()["test_batch"]
+            for pontos in _em_lotes(artefatos.ler_fluxo(rastreamento["arquivo"]), lote):
+                plano_lote = compilar_plano_pontos(pontos, rankeador)
+                estatisticas = {}
+                resultados_finais["vulnerabilidades_encontradas"].extend(
+                    _executar_plano(plano_lote, target_url, cliente, poda, gravador, estatisticas))
+                resumo["pontos_testados"] += len(pontos)
+                resumo["lotes"] += 1
+                resumo["total_testes"] += plano_lote.total_casos
+                resumo["requisicoes_planejadas"] += len(plano_lote.requisicoes)
+                resumo["total_requisicoes"] += estatisticas.get("total_requisicoes", len(plano_lote.requisicoes))
+            
+            resultados_finais["rastreamento"] = resumo
+            for chave in ("total_testes", "requisicoes_planejadas", "total_requisicoes"):
+                resultados_finais[chave] += resumo[chave]
+            print(f"[inject_finder] 🕸️ Rastreamento: {resumo['pontos_testados']} pontos de entrada em {resumo['lotes']} lotes "
+                  f"({resumo['requisicoes_planejadas']} requisições planejadas)")
         
-        # Testa file inclusion
-        vulns_lfi = testar_file_inclusion(target_url)
-        resultados_finais["vulnerabilidades_encontradas"].extend(vulns_lfi)
+        if poda is not None:
+            resumo_poda = resultados_finais["poda"] = poda.estatisticas()
+            span = span_atual()
+            if span is not None:
+                span.atributos["requisicoes_podadas"] = resumo_poda["requisicoes_podadas"]
+                span.atributos["detectores_podados"] = resumo_poda["detectores_podados"]
+            print(f"[inject_finder] ✂️ Poda: {resumo_poda['requisicoes_podadas']} requisições e {resumo_poda['detectores_podados']} testes pulados "
+                  f"({resumo_poda['por_motivo']['confirmado']} em pontos já confirmados, {resumo_poda['por_motivo']['invariante']} em endpoints invariantes)")
         
         # Calcula estatísticas
         resultados_finais["total_vulnerabilidades"] = len(resultados_finais["vulnerabilidades_encontradas"])
         resultados_finais["tipos_encontrados"] = list(set([v["tipo_injecao"] if "tipo_injecao" in v else v["tipo"] for v in resultados_finais["vulnerabilidades_encontradas"]]))
         
-        # Salva resultado
-        output_dir = f"output/{site_name}"
-        os.makedirs(output_dir, exist_ok=True)
-        
-        arquivo_saida = f"{output_dir}/injects.json"
-        with open(arquivo_saida, "w", encoding="utf-8") as f:
-            json.dump(resultados_finais, f, indent=4, ensure_ascii=False)
+        # Publica resultado (gravado em disco pelo barramento)
+        arquivo_saida = artefatos.publicar("injects", resultados_finais)
         
         print(f"[inject_finder] ✅ Testes finalizados")
         print(f"[inject_finder] 🚨 {resultados_finais['total_vulnerabilidades']} possíveis vulnerabilidades detectadas")
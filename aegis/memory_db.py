@@ -0,0 +1,87 @@
+"""
+AEGIS Bug Hunter - Memory Database
+Conexão SQLite de longa duração do sistema de memória (WAL, pragmas ajustados, transações em lote)
+"""
+
+import os
+import atexit
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Pragmas aplicados a cada conexão (sobrescritos por memory_system.sqlite na configuração)
+PRAGMAS_PADRAO = {
+    "auto_vacuum": "INCREMENTAL",
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size_mb": 16,
+    "mmap_size_mb": 64,
+    "busy_timeout_ms": 5000,
+}
+
+class BancoMemoria:
+    """
+    Uma conexão por banco, compartilhada pelas threads do processo (acesso serializado
+    por lock). Escritas vão em transacao(): um único commit para o lote inteiro.
+    Com WAL, leitores de outros processos (modo lote) não bloqueiam a escrita.
+    """
+
+    def __init__(self, db_path, pragmas=None):
+        self.db_path = db_path
+        self.pragmas = {**PRAGMAS_PADRAO, **(pragmas or {})}
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=self.pragmas["busy_timeout_ms"] / 1000)
+        self._aplicar_pragmas()
+
+    def _aplicar_pragmas(self):
+        p = self.pragmas
+        # Só vale para bancos novos (antes da primeira tabela); bancos antigos precisam de VACUUM
+        self._conn.execute(f"PRAGMA auto_vacuum = {p['auto_vacuum']}")
+        self._conn.execute(f"PRAGMA journal_mode = {p['journal_mode']}")
+        self._conn.execute(f"PRAGMA synchronous = {p['synchronous']}")
+        self._conn.execute(f"PRAGMA cache_size = {-int(p['cache_size_mb'] * 1024)}")  # negativo = KiB
+        self._conn.execute(f"PRAGMA mmap_size = {int(p['mmap_size_mb'] * 1024 * 1024)}")
+        self._conn.execute(f"PRAGMA busy_timeout = {int(p['busy_timeout_ms'])}")
+        self._conn.execute("PRAGMA temp_store = MEMORY")
+
+    @property
+    def journal_mode(self):
+        with self._lock:
+            return self._conn.execute("PRAGMA journal_mode").fetchone()[0]
+
+    @contextmanager
+    def transacao(self):
+        """Conexão dentro de uma transação: commit ao sair, rollback em exceção"""
+        with self._lock, self._conn:
+            yield self._conn
+
+    @contextmanager
+    def leitura(self):
+        """Conexão para consultas (sem transação explícita)"""
+        with self._lock:
+            yield self._conn
+
+    def fechar(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        with _lock_bancos:
+            if _bancos.get(_chave(self.db_path)) is self:
+                del _bancos[_chave(self.db_path)]
+
+_bancos = {}
+_lock_bancos = threading.Lock()
+
+def _chave(db_path):
+    return db_path if db_path == ":memory:" else os.path.abspath(db_path)
+
+def obter_banco(db_path, pragmas=None):
+    """Conexão do processo para o banco (criada na primeira chamada, fechada na saída)"""
+    with _lock_bancos:
+        banco = _bancos.get(_chave(db_path))
+        if banco is None:
+            banco = BancoMemoria(db_path, pragmas)
+            _bancos[_chave(db_path)] = banco
+            atexit.register(banco.fechar)
+        return banco
@@ -0,0 +1,426 @@
+"""
+AEGIS Bug Hunter - Memory Migrations
+Migrações versionadas do esquema do banco de memória (PRAGMA user_version)
+
+Cada migração roda na sua própria transação e grava o número da versão ao final;
+bancos antigos (versão 0, criados antes das migrações) são migrados no lugar.
+Novas mudanças de esquema entram sempre como uma nova migração no fim de MIGRACOES.
+"""
+
+import hashlib
+
+def hash_vulnerabilidade(target_id, vuln_type, location, payload):
+    """Chave única de uma vulnerabilidade (alvo, tipo, localização e payload)"""
+    dados = "\x1f".join((str(target_id), vuln_type or "", location or "", payload or ""))
+    return hashlib.md5(dados.encode("utf-8")).hexdigest()
+
+def _esquema_base(conn):
+    """Tabelas originais (IF NOT EXISTS: bancos antigos já as têm)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS targets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT UNIQUE NOT NULL,
+            domain TEXT NOT NULL,
+            first_scan TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_scan TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            total_scans INTEGER DEFAULT 1,
+            risk_level TEXT,
+            technologies TEXT,
+            defenses TEXT
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS vulnerabilities (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            target_id INTEGER,
+            vuln_type TEXT NOT NULL,
+            location TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            evidence TEXT,
+            confidence REAL,
+            severity TEXT,
+            first_found TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_confirmed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status TEXT DEFAULT 'active',
+            false_positive BOOLEAN DEFAULT 0,
+            FOREIGN KEY (target_id) REFERENCES targets (id)
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS effective_payloads (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            payload TEXT NOT NULL,
+            payload_type TEXT NOT NULL,
+            target_domain TEXT NOT NULL,
+            success_rate REAL DEFAULT 0.0,
+            times_used INTEGER DEFAULT 1,
+            times_successful INTEGER DEFAULT 0,
+            last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            context TEXT
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS detected_defenses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            target_id INTEGER,
+            defense_type TEXT NOT NULL,
+            defense_name TEXT NOT NULL,
+            confidence REAL,
+            bypass_methods TEXT,
+            first_detected TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_detected TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            active BOOLEAN DEFAULT 1,
+            FOREIGN KEY (target_id) REFERENCES targets (id)
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS success_patterns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pattern_type TEXT NOT NULL,
+            pattern_data TEXT NOT NULL,
+            success_count INTEGER DEFAULT 1,
+            total_attempts INTEGER DEFAULT 1,
+            effectiveness REAL DEFAULT 0.0,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS scan_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            target_id INTEGER,
+            session_start TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            session_end TIMESTAMP,
+            modules_executed TEXT,
+            vulnerabilities_found INTEGER DEFAULT 0,
+            scan_duration INTEGER,
+            success_rate REAL DEFAULT 0.0,
+            FOREIGN KEY (target_id) REFERENCES targets (id)
+        )
+    ''')
+
+def _indices(conn):
+    """Índices das consultas por domínio, alvo e tipo de payload"""
+    # Versões anteriores criavam um índice composto de deduplicação com este nome
+    conn.execute("DROP INDEX IF EXISTS idx_vulnerabilities_target")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_targets_domain ON targets (domain)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vulnerabilities_target ON vulnerabilities (target_id, status)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_defenses_target ON detected_defenses (target_id, defense_type, defense_name)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_payloads_lookup ON effective_payloads (payload_type, target_domain, payload)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_payloads_domain ON effective_payloads (target_domain, payload_type)")
+
+def _hash_vulnerabilidades(conn):
+    """Coluna vuln_hash única: deduplicação por INSERT ... ON CONFLICT"""
+    colunas = {linha[1] for linha in conn.execute("PRAGMA table_info(vulnerabilities)")}
+    if "vuln_hash" not in colunas:
+        conn.execute("ALTER TABLE vulnerabilities ADD COLUMN vuln_hash TEXT")
+
+    conn.create_function("aegis_hash_vulnerabilidade", 4, hash_vulnerabilidade, deterministic=True)
+    conn.execute(
+        "UPDATE vulnerabilities SET vuln_hash = aegis_hash_vulnerabilidade(target_id, vuln_type, location, payload) WHERE vuln_hash IS NULL"
+    )
+
+    # Duplicatas antigas: fica a primeira ocorrência, com a confirmação mais recente do grupo
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_migracao_hash ON vulnerabilities (vuln_hash, last_confirmed)")
+    conn.execute('''
+        UPDATE vulnerabilities SET
+            last_confirmed = (SELECT MAX(d.last_confirmed) FROM vulnerabilities d WHERE d.vuln_hash = vulnerabilities.vuln_hash),
+            confidence = (SELECT d.confidence FROM vulnerabilities d WHERE d.vuln_hash = vulnerabilities.vuln_hash
+                          ORDER BY d.last_confirmed DESC, d.id DESC LIMIT 1)
+        WHERE id IN (SELECT MIN(id) FROM vulnerabilities GROUP BY vuln_hash HAVING COUNT(*) > 1)
+    ''')
+    conn.execute("DELETE FROM vulnerabilities WHERE id NOT IN (SELECT MIN(id) FROM vulnerabilities GROUP BY vuln_hash)")
+    conn.execute("DROP INDEX idx_migracao_hash")
+
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_vulnerabilities_hash ON vulnerabilities (vuln_hash)")
+
+def _retencao(conn):
+    """Tabelas de consolidação, registro das execuções da retenção e índices por idade"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS vulnerability_rollups (
+            target_id INTEGER NOT NULL,
+            vuln_type TEXT NOT NULL,
+            severity TEXT NOT NULL,
+            period TEXT NOT NULL,
+            total INTEGER NOT NULL,
+            confidence_sum REAL NOT NULL,
+            first_found TIMESTAMP,
+            last_confirmed TIMESTAMP,
+            PRIMARY KEY (target_id, vuln_type, severity, period)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS defense_rollups (
+            target_id INTEGER NOT NULL,
+            defense_type TEXT NOT NULL,
+            defense_name TEXT NOT NULL,
+            period TEXT NOT NULL,
+            total INTEGER NOT NULL,
+            first_detected TIMESTAMP,
+            last_detected TIMESTAMP,
+            PRIMARY KEY (target_id, defense_type, defense_name, period)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS payload_rollups (
+            target_domain TEXT NOT NULL,
+            payload_type TEXT NOT NULL,
+            period TEXT NOT NULL,
+            payloads INTEGER NOT NULL,
+            times_used INTEGER NOT NULL,
+            times_successful INTEGER NOT NULL,
+            last_used TIMESTAMP,
+            PRIMARY KEY (target_domain, payload_type, period)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS retention_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP,
+            cutoff TIMESTAMP NOT NULL,
+            removed INTEGER DEFAULT 0,
+            archived INTEGER DEFAULT 0,
+            freed_kb INTEGER DEFAULT 0
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_vulnerabilities_age ON vulnerabilities (last_confirmed)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_defenses_age ON detected_defenses (last_detected)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_payloads_age ON effective_payloads (last_used)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_age ON scan_sessions (session_start)")
+
+def _payloads_unicos(conn):
+    """Um registro por (tipo, domínio, payload): contagens somadas por INSERT ... ON CONFLICT"""
+    conn.execute('''
+        UPDATE effective_payloads SET
+            times_used = (SELECT SUM(d.times_used) FROM effective_payloads d
+                          WHERE d.payload_type = effective_payloads.payload_type AND d.target_domain = effective_payloads.target_domain
+                            AND d.payload = effective_payloads.payload),
+            times_successful = (SELECT SUM(d.times_successful) FROM effective_payloads d
+                                WHERE d.payload_type = effective_payloads.payload_type AND d.target_domain = effective_payloads.target_domain
+                                  AND d.payload = effective_payloads.payload),
+            last_used = (SELECT MAX(d.last_used) FROM effective_payloads d
+                         WHERE d.payload_type = effective_payloads.payload_type AND d.target_domain = effective_payloads.target_domain
+                           AND d.payload = effective_payloads.payload)
+        WHERE id IN (SELECT MIN(id) FROM effective_payloads GROUP BY payload_type, target_domain, payload HAVING COUNT(*) > 1)
+    ''')
+    conn.execute(
+        "DELETE FROM effective_payloads WHERE id NOT IN (SELECT MIN(id) FROM effective_payloads GROUP BY payload_type, target_domain, payload)"
+    )
+    conn.execute("UPDATE effective_payloads SET success_rate = CAST(times_successful AS REAL) / times_used WHERE times_used > 0")
+    conn.execute("DROP INDEX IF EXISTS idx_payloads_lookup")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_payloads_unique ON effective_payloads (payload_type, target_domain, payload)")
+
+# Linhas com domain = '*' acumulam o total global (get_statistics); as demais, o do domínio
+GLOBAL = "*"
+
+_DOMINIO_ALVO = "COALESCE((SELECT domain FROM targets WHERE id = {linha}.target_id), '')"
+
+def _somar_vulnerabilidade(linha, sinal):
+    return "".join(f"""
+        INSERT INTO stats_vulnerabilities (domain, vuln_type, severity, status, total)
+        VALUES ({dominio}, {linha}.vuln_type, COALESCE({linha}.severity, ''), COALESCE({linha}.status, 'active'), {sinal}1)
+        ON CONFLICT (domain, vuln_type, severity, status) DO UPDATE SET total = total {sinal} 1;"""
+        for dominio in (_DOMINIO_ALVO.format(linha=linha), f"'{GLOBAL}'"))
+
+def _somar_payload(linha, sinal):
+    return "".join(f"""
+        INSERT INTO stats_payloads (domain, payload_type, payloads, success_sum)
+        VALUES ({dominio}, {linha}.payload_type, {sinal}1, {sinal}COALESCE({linha}.success_rate, 0))
+        ON CONFLICT (domain, payload_type) DO UPDATE SET
+            payloads = payloads {sinal} 1, success_sum = success_sum {sinal} COALESCE({linha}.success_rate, 0);"""
+        for dominio in (f"{linha}.target_domain", f"'{GLOBAL}'"))
+
+def _somar_defesa(linha, sinal):
+    return "".join(f"""
+        INSERT INTO stats_defenses (domain, defense_type, active_total)
+        SELECT {dominio}, {linha}.defense_type, {sinal}1 WHERE {linha}.active = 1
+        ON CONFLICT (domain, defense_type) DO UPDATE SET active_total = active_total {sinal} 1;"""
+        for dominio in (_DOMINIO_ALVO.format(linha=linha), f"'{GLOBAL}'"))
+
+def _contador(nome, expressao):
+    return f"""
+        INSERT INTO stats_counters (name, value) VALUES ('{nome}', {expressao})
+        ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;"""
+
+# (tabela, gatilho, evento, corpo): cada escrita atualiza os resumos na mesma transação
+GATILHOS_ESTATISTICAS = [
+    ("vulnerabilities", "trg_stats_vuln_insert", "AFTER INSERT", _somar_vulnerabilidade("NEW", "+")),
+    ("vulnerabilities", "trg_stats_vuln_delete", "AFTER DELETE", _somar_vulnerabilidade("OLD", "-")),
+    ("vulnerabilities", "trg_stats_vuln_update", "AFTER UPDATE OF target_id, vuln_type, severity, status",
+     _somar_vulnerabilidade("OLD", "-") + _somar_vulnerabilidade("NEW", "+")),
+    ("effective_payloads", "trg_stats_payload_insert", "AFTER INSERT", _somar_payload("NEW", "+")),
+    ("effective_payloads", "trg_stats_payload_delete", "AFTER DELETE", _somar_payload("OLD", "-")),
+    ("effective_payloads", "trg_stats_payload_update", "AFTER UPDATE OF target_domain, payload_type, success_rate",
+     _somar_payload("OLD", "-") + _somar_payload("NEW", "+")),
+    ("detected_defenses", "trg_stats_defense_insert", "AFTER INSERT", _somar_defesa("NEW", "+")),
+    ("detected_defenses", "trg_stats_defense_delete", "AFTER DELETE", _somar_defesa("OLD", "-")),
+    ("detected_defenses", "trg_stats_defense_update", "AFTER UPDATE OF target_id, defense_type, active",
+     _somar_defesa("OLD", "-") + _somar_defesa("NEW", "+")),
+    ("targets", "trg_stats_target_insert", "AFTER INSERT", _contador("targets", 1)),
+    ("targets", "trg_stats_target_delete", "AFTER DELETE", _contador("targets", -1)),
+    ("vulnerability_rollups", "trg_stats_rollup_insert", "AFTER INSERT", _contador("rolled_up_vulnerabilities", "NEW.total")),
+    ("vulnerability_rollups", "trg_stats_rollup_update", "AFTER UPDATE OF total",
+     _contador("rolled_up_vulnerabilities", "NEW.total - OLD.total")),
+]
+
+def reconstruir_estatisticas(conn):
+    """Recalcula as tabelas de resumo a partir das tabelas de origem"""
+    for tabela in ("stats_vulnerabilities", "stats_payloads", "stats_defenses", "stats_counters"):
+        conn.execute(f"DELETE FROM {tabela}")
+
+    for dominio, agrupamento in (("COALESCE(t.domain, '')", "1, 2, 3, 4"), (f"'{GLOBAL}'", "2, 3, 4")):
+        conn.execute(f'''
+            INSERT INTO stats_vulnerabilities (domain, vuln_type, severity, status, total)
+            SELECT {dominio}, v.vuln_type, COALESCE(v.severity, ''), COALESCE(v.status, 'active'), COUNT(*)
+            FROM vulnerabilities v LEFT JOIN targets t ON t.id = v.target_id GROUP BY {agrupamento}
+        ''')
+        conn.execute(f'''
+            INSERT INTO stats_defenses (domain, defense_type, active_total)
+            SELECT {dominio}, d.defense_type, COUNT(*)
+            FROM detected_defenses d LEFT JOIN targets t ON t.id = d.target_id WHERE d.active = 1
+            GROUP BY {agrupamento.replace(", 3, 4", "")}
+        ''')
+    for dominio, agrupamento in (("target_domain", "1, 2"), (f"'{GLOBAL}'", "2")):
+        conn.execute(f'''
+            INSERT INTO stats_payloads (domain, payload_type, payloads, success_sum)
+            SELECT {dominio}, payload_type, COUNT(*), SUM(COALESCE(success_rate, 0))
+            FROM effective_payloads GROUP BY {agrupamento}
+        ''')
+    conn.execute("INSERT INTO stats_counters (name, value) SELECT 'targets', COUNT(*) FROM targets")
+    conn.execute("INSERT INTO stats_counters (name, value) SELECT 'rolled_up_vulnerabilities', COALESCE(SUM(total), 0) FROM vulnerability_rollups")
+
+def _estatisticas(conn):
+    """Tabelas de resumo por domínio (e global) mantidas por gatilhos"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stats_vulnerabilities (
+            domain TEXT NOT NULL,
+            vuln_type TEXT NOT NULL,
+            severity TEXT NOT NULL,
+            status TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (domain, vuln_type, severity, status)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stats_payloads (
+            domain TEXT NOT NULL,
+            payload_type TEXT NOT NULL,
+            payloads INTEGER NOT NULL DEFAULT 0,
+            success_sum REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (domain, payload_type)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stats_defenses (
+            domain TEXT NOT NULL,
+            defense_type TEXT NOT NULL,
+            active_total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (domain, defense_type)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+    for tabela, nome, evento, corpo in GATILHOS_ESTATISTICAS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {nome}")
+        conn.execute(f"CREATE TRIGGER {nome} {evento} ON {tabela} BEGIN {corpo}\n    END")
+    reconstruir_estatisticas(conn)
+
+def _contextos_payloads(conn):
+    """Usos e acertos por contexto de parâmetro (payload_ranker); apagados junto com o payload"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS payload_contexts (
+            target_domain TEXT NOT NULL,
+            payload_type TEXT NOT NULL,
+            context TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            times_used INTEGER NOT NULL DEFAULT 0,
+            times_successful INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (target_domain, payload_type, context, payload)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute("DROP TRIGGER IF EXISTS trg_payload_contexts_delete")
+    conn.execute('''
+        CREATE TRIGGER trg_payload_contexts_delete AFTER DELETE ON effective_payloads BEGIN
+            DELETE FROM payload_contexts
+            WHERE target_domain = OLD.target_domain AND payload_type = OLD.payload_type AND payload = OLD.payload;
+        END
+    ''')
+
+def _estatisticas_adiaveis(conn):
+    """
+    Gatilho de inserção de vulnerabilidades suspenso enquanto stats_adiadas tiver uma
+    linha: lotes grandes (MemorySystem) somam os resumos numa só consulta agrupada.
+    A linha só existe dentro da transação do lote, que detém a escrita do banco
+    """
+    conn.execute("CREATE TABLE IF NOT EXISTS stats_adiadas (ativo INTEGER PRIMARY KEY)")
+    conn.execute("DROP TRIGGER IF EXISTS trg_stats_vuln_insert")
+    conn.execute(f"""CREATE TRIGGER trg_stats_vuln_insert AFTER INSERT ON vulnerabilities
+        WHEN NOT EXISTS (SELECT 1 FROM stats_adiadas) BEGIN {_somar_vulnerabilidade("NEW", "+")}
+    END""")
+
+def somar_vulnerabilidades_desde(conn, ultimo_id):
+    """Soma aos resumos as vulnerabilidades com id > ultimo_id (inseridas com os gatilhos adiados)"""
+    for dominio, agrupamento in (("COALESCE(t.domain, '')", "1, 2, 3, 4"), (f"'{GLOBAL}'", "2, 3, 4")):
+        conn.execute(f'''
+            INSERT INTO stats_vulnerabilities (domain, vuln_type, severity, status, total)
+            SELECT {dominio}, v.vuln_type, COALESCE(v.severity, ''), COALESCE(v.status, 'active'), COUNT(*)
+            FROM vulnerabilities v LEFT JOIN targets t ON t.id = v.target_id WHERE v.id > ? GROUP BY {agrupamento}
+            ON CONFLICT (domain, vuln_type, severity, status) DO UPDATE SET total = total + excluded.total
+        ''', (ultimo_id,))
+
+# (versão, descrição, função): aplicadas em ordem, uma única vez por banco
+MIGRACOES = [
+    (1, "esquema base", _esquema_base),
+    (2, "índices por domínio, alvo e tipo de payload", _indices),
+    (3, "vuln_hash único em vulnerabilities", _hash_vulnerabilidades),
+    (4, "consolidação e retenção de dados antigos", _retencao),
+    (5, "payload único por tipo e domínio em effective_payloads", _payloads_unicos),
+    (6, "estatísticas mantidas por gatilhos", _estatisticas),
+    (7, "usos de payloads por contexto de parâmetro", _contextos_payloads),
+    (8, "resumos de vulnerabilidades adiáveis em lotes grandes", _estatisticas_adiaveis),
+]
+
+VERSAO_ATUAL = MIGRACOES[-1][0]
+
+def versao_esquema(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrar(banco, ate=None):
+    """
+    Aplica as migrações pendentes até `ate` (padrão: a última) e retorna as versões
+    aplicadas. BEGIN IMMEDIATE serializa processos concorrentes: quem chega depois
+    relê a versão dentro da transação e não repete a migração.
+    """
+    alvo = VERSAO_ATUAL if ate is None else ate
+    with banco.leitura() as conn:
+        inicial = versao_esquema(conn)
+        if inicial >= alvo:
+            return []
+        existente = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'targets'").fetchone()[0]
+
+    aplicadas = []
+    for numero, descricao, aplicar in MIGRACOES:
+        if numero > alvo:
+            break
+        with banco.transacao() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if versao_esquema(conn) >= numero:
+                continue
+            aplicar(conn)
+            conn.execute(f"PRAGMA user_version = {numero}")
+        aplicadas.append(numero)
+
+    # Banco novo não tem o que relatar; banco existente informa a migração feita no lugar
+    if aplicadas and existente:
+        descricoes = ", ".join(descricao for numero, descricao, _ in MIGRACOES if numero in aplicadas)
+        print(f"[memory_system] 🗄️ Banco migrado da versão {inicial} para {aplicadas[-1]} ({descricoes})")
+    return aplicadas
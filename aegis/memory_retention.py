@@ -0,0 +1,303 @@
+"""
+AEGIS Bug Hunter - Memory Retention
+Retenção do banco de memória: registros mais antigos que memory_system.retention_days
+são consolidados em tabelas de resumo e removidos (ou arquivados) em lotes curtos;
+ao final, o vacuum incremental devolve as páginas livres ao sistema de arquivos
+
+Cada lote é uma transação própria (BEGIN IMMEDIATE): entre lotes a conexão e o
+banco ficam livres, e com WAL os scans concorrentes continuam lendo e gravando.
+
+Uso: python -m aegis.memory_retention [--dias 90] [--lote 1000] [--arquivar [ARQUIVO]]
+                                      [--simular] [--vacuum-completo] [--banco aegis_memory.db]
+"""
+
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from .memory_db import obter_banco
+from .memory_migrations import migrar
+
+CONSOLIDAR_VULNERABILIDADES = '''
+    INSERT INTO vulnerability_rollups (target_id, vuln_type, severity, period, total, confidence_sum, first_found, last_confirmed)
+    SELECT COALESCE(target_id, 0), vuln_type, COALESCE(severity, ''), strftime('%Y-%m', last_confirmed),
+           COUNT(*), SUM(COALESCE(confidence, 0)), MIN(first_found), MAX(last_confirmed)
+    FROM vulnerabilities WHERE id IN (SELECT id FROM temp.retencao_lote)
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (target_id, vuln_type, severity, period) DO UPDATE SET
+        total = total + excluded.total,
+        confidence_sum = confidence_sum + excluded.confidence_sum,
+        first_found = MIN(first_found, excluded.first_found),
+        last_confirmed = MAX(last_confirmed, excluded.last_confirmed)
+'''
+
+CONSOLIDAR_DEFESAS = '''
+    INSERT INTO defense_rollups (target_id, defense_type, defense_name, period, total, first_detected, last_detected)
+    SELECT COALESCE(target_id, 0), defense_type, defense_name, strftime('%Y-%m', last_detected),
+           COUNT(*), MIN(first_detected), MAX(last_detected)
+    FROM detected_defenses WHERE id IN (SELECT id FROM temp.retencao_lote)
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (target_id, defense_type, defense_name, period) DO UPDATE SET
+        total = total + excluded.total,
+        first_detected = MIN(first_detected, excluded.first_detected),
+        last_detected = MAX(last_detected, excluded.last_detected)
+'''
+
+CONSOLIDAR_PAYLOADS = '''
+    INSERT INTO payload_rollups (target_domain, payload_type, period, payloads, times_used, times_successful, last_used)
+    SELECT target_domain, payload_type, strftime('%Y-%m', last_used),
+           COUNT(*), SUM(times_used), SUM(times_successful), MAX(last_used)
+    FROM effective_payloads WHERE id IN (SELECT id FROM temp.retencao_lote)
+    GROUP BY 1, 2, 3
+    ON CONFLICT (target_domain, payload_type, period) DO UPDATE SET
+        payloads = payloads + excluded.payloads,
+        times_used = times_used + excluded.times_used,
+        times_successful = times_successful + excluded.times_successful,
+        last_used = MAX(last_used, excluded.last_used)
+'''
+
+# Tabela: (coluna de idade, consolidação antes da remoção; None = só remove)
+TABELAS = {
+    "vulnerabilities": ("last_confirmed", CONSOLIDAR_VULNERABILIDADES),
+    "detected_defenses": ("last_detected", CONSOLIDAR_DEFESAS),
+    "effective_payloads": ("last_used", CONSOLIDAR_PAYLOADS),
+    "scan_sessions": ("session_start", None),
+}
+
+def _timestamp(momento):
+    """Mesmo formato do CURRENT_TIMESTAMP do SQLite (UTC), comparável como texto"""
+    return momento.strftime("%Y-%m-%d %H:%M:%S")
+
+class RetencaoMemoria:
+    """
+    Uma execução da retenção sobre o banco. Com `arquivo`, as linhas removidas são
+    copiadas antes para esse banco SQLite (mesmas tabelas, anexado durante a execução).
+    """
+
+    def __init__(self, banco, dias, lote=1000, arquivo=None, paginas_vacuum=1000):
+        self.banco = banco
+        self.dias = dias
+        self.lote = max(1, int(lote))
+        self.arquivo = arquivo
+        self.paginas_vacuum = max(1, int(paginas_vacuum))
+        self.corte = _timestamp(datetime.now(timezone.utc) - timedelta(days=dias))
+        self.execucao_id = None
+        self._colunas = {}
+
+    def pendentes(self):
+        """Linhas mais antigas que o corte, por tabela (o que uma execução removeria)"""
+        with self.banco.leitura() as conn:
+            return {
+                tabela: conn.execute(f"SELECT COUNT(*) FROM {tabela} WHERE {coluna} < ?", (self.corte,)).fetchone()[0]
+                for tabela, (coluna, _) in TABELAS.items()
+            }
+
+    def reservar(self, intervalo_horas):
+        """
+        Registra o início da execução se a última começou há mais de `intervalo_horas`.
+        Dentro de BEGIN IMMEDIATE: entre processos do lote, só um reserva a execução.
+        """
+        limite = _timestamp(datetime.now(timezone.utc) - timedelta(hours=intervalo_horas))
+        with self.banco.transacao() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            ultima = conn.execute("SELECT MAX(started_at) FROM retention_runs").fetchone()[0]
+            if ultima and ultima > limite:
+                return False
+            self.execucao_id = conn.execute("INSERT INTO retention_runs (cutoff) VALUES (?)", (self.corte,)).lastrowid
+        return True
+
+    def executar(self):
+        """Consolida e remove os registros antigos em lotes; retorna o resumo da execução"""
+        if self.execucao_id is None:
+            with self.banco.transacao() as conn:
+                self.execucao_id = conn.execute("INSERT INTO retention_runs (cutoff) VALUES (?)", (self.corte,)).lastrowid
+
+        inicio = time.time()
+        removidas, lotes = {}, 0
+        if self.arquivo:
+            self._anexar_arquivo()
+        try:
+            for tabela, (coluna, consolidar) in TABELAS.items():
+                removidas[tabela] = 0
+                while True:
+                    quantidade = self._remover_lote(tabela, coluna, consolidar)
+                    removidas[tabela] += quantidade
+                    lotes += 1 if quantidade else 0
+                    if quantidade < self.lote:
+                        break
+        finally:
+            if self.arquivo:
+                self._desanexar_arquivo()
+
+        liberado_kb = self.vacuum_incremental()
+        total = sum(removidas.values())
+        with self.banco.transacao() as conn:
+            conn.execute(
+                "UPDATE retention_runs SET finished_at = CURRENT_TIMESTAMP, removed = ?, archived = ?, freed_kb = ? WHERE id = ?",
+                (total, total if self.arquivo else 0, liberado_kb or 0, self.execucao_id)
+            )
+        return {
+            "corte": self.corte,
+            "removidas": removidas,
+            "total_removidas": total,
+            "arquivo": self.arquivo,
+            "lotes": lotes,
+            "liberado_kb": liberado_kb,
+            "duracao": time.time() - inicio
+        }
+
+    def _remover_lote(self, tabela, coluna, consolidar):
+        """Um lote numa transação: seleciona os ids mais antigos, consolida, arquiva e remove"""
+        with self.banco.transacao() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS retencao_lote (id INTEGER PRIMARY KEY)")
+            conn.execute("DELETE FROM temp.retencao_lote")
+            quantidade = conn.execute(
+                f"INSERT INTO temp.retencao_lote SELECT id FROM {tabela} WHERE {coluna} < ? ORDER BY {coluna} LIMIT ?",
+                (self.corte, self.lote)
+            ).rowcount
+            if not quantidade:
+                return 0
+            if consolidar:
+                conn.execute(consolidar)
+            if self.arquivo:
+                colunas = self._colunas[tabela]
+                conn.execute(
+                    f"INSERT INTO arquivo.{tabela} ({colunas}) SELECT {colunas} FROM main.{tabela} "
+                    "WHERE id IN (SELECT id FROM temp.retencao_lote)"
+                )
+            conn.execute(f"DELETE FROM main.{tabela} WHERE id IN (SELECT id FROM temp.retencao_lote)")
+        return quantidade
+
+    def _anexar_arquivo(self):
+        """Anexa o banco de arquivo e alinha suas tabelas às colunas atuais"""
+        with self.banco.leitura() as conn:
+            conn.execute("ATTACH DATABASE ? AS arquivo", (self.arquivo,))
+            for tabela in TABELAS:
+                conn.execute(f"CREATE TABLE IF NOT EXISTS arquivo.{tabela} AS SELECT * FROM main.{tabela} WHERE 0")
+                atuais = [linha[1] for linha in conn.execute(f"PRAGMA main.table_info({tabela})")]
+                arquivadas = {linha[1] for linha in conn.execute(f"PRAGMA arquivo.table_info({tabela})")}
+                for coluna in atuais:
+                    if coluna not in arquivadas:
+                        conn.execute(f"ALTER TABLE arquivo.{tabela} ADD COLUMN {coluna}")
+                self._colunas[tabela] = ", ".join(atuais)
+
+    def _desanexar_arquivo(self):
+        with self.banco.leitura() as conn:
+            conn.execute("DETACH DATABASE arquivo")
+
+    def vacuum_incremental(self):
+        """
+        Devolve as páginas livres em passos de `paginas_vacuum` (KB liberados), ou None
+        se o banco não usa auto_vacuum incremental (bancos antigos: --vacuum-completo)
+        """
+        with self.banco.leitura() as conn:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                return None
+            tamanho_pagina = conn.execute("PRAGMA page_size").fetchone()[0]
+            paginas_antes = conn.execute("PRAGMA page_count").fetchone()[0]
+
+        anteriores = None
+        while True:
+            with self.banco.leitura() as conn:
+                livres = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if not livres or livres == anteriores:
+                    break
+                # O pragma libera uma página por passo: fetchall() executa todos
+                conn.execute(f"PRAGMA incremental_vacuum({min(livres, self.paginas_vacuum)})").fetchall()
+                anteriores = livres
+
+        # Checkpoint passivo: não espera leitores nem escritores de outros processos
+        with self.banco.leitura() as conn:
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+            paginas_depois = conn.execute("PRAGMA page_count").fetchone()[0]
+        return max(0, paginas_antes - paginas_depois) * tamanho_pagina // 1024
+
+    def vacuum_completo(self):
+        """VACUUM com auto_vacuum incremental: converte bancos antigos (bloqueia o banco)"""
+        with self.banco.leitura() as conn:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+
+def _banco_configurado(config, db_path=None):
+    banco = obter_banco(db_path or config["database_path"], config["sqlite"])
+    migrar(banco)
+    return banco
+
+def manutencao_automatica():
+    """
+    Retenção ao fim do scan, se ativada (memory_system.cleanup_old_data) e se a última
+    execução foi há mais de retention.auto_interval_hours. Falhas não afetam o scan.
+    """
+    from .config_manager import get_config
+    config = get_config().get_memory_config()
+    if not config["enabled"] or not config["cleanup_old_data"]:
+        return None
+
+    retencao = config["retention"]
+    try:
+        job = RetencaoMemoria(
+            _banco_configurado(config), config["retention_days"], retencao["batch_size"],
+            retencao["archive_path"] if retencao["archive"] else None, retencao["vacuum_pages"]
+        )
+        if not job.reservar(retencao["auto_interval_hours"]):
+            return None
+        resultado = job.executar()
+    except Exception as e:
+        print(f"[memory_retention] ⚠️ Retenção do banco de memória não executada: {e}")
+        return None
+
+    if resultado["total_removidas"]:
+        print(f"[memory_retention] 🧹 {resultado['total_removidas']} registros com mais de {config['retention_days']} dias "
+              f"consolidados e {'arquivados' if resultado['arquivo'] else 'removidos'} ({resultado['duracao']:.2f}s)")
+    return resultado
+
+def formatar(resultado, dias):
+    linhas = [f"Corte: {resultado['corte']} UTC ({dias} dias)"]
+    for tabela, quantidade in resultado["removidas"].items():
+        linhas.append(f"  {tabela:<20} {quantidade:>10}")
+    destino = f"arquivados em {resultado['arquivo']}" if resultado["arquivo"] else "removidos"
+    linhas.append(f"Total: {resultado['total_removidas']} registros consolidados e {destino} em {resultado['lotes']} lotes "
+                  f"({resultado['duracao']:.2f}s)")
+    if resultado["liberado_kb"] is None:
+        linhas.append("Vacuum incremental indisponível (banco sem auto_vacuum incremental: use --vacuum-completo)")
+    else:
+        linhas.append(f"Vacuum incremental: {resultado['liberado_kb']} KB liberados")
+    return "\n".join(linhas)
+
+def main(argv=None):
+    from .config_manager import get_config
+    config = get_config().get_memory_config()
+    retencao = config["retention"]
+
+    parser = argparse.ArgumentParser(description="Retenção e compactação do banco de memória do AEGIS")
+    parser.add_argument("--banco", help=f"banco de memória (padrão: {config['database_path']})")
+    parser.add_argument("--dias", type=int, default=config["retention_days"], help="idade máxima dos registros mantidos")
+    parser.add_argument("--lote", type=int, default=retencao["batch_size"], help="registros por transação")
+    parser.add_argument("--arquivar", metavar="ARQUIVO", nargs="?", const=retencao["archive_path"],
+                        default=retencao["archive_path"] if retencao["archive"] else None,
+                        help="copia os registros removidos para outro banco SQLite")
+    parser.add_argument("--simular", action="store_true", help="só conta os registros que seriam removidos")
+    parser.add_argument("--vacuum-completo", action="store_true",
+                        help="VACUUM ao final, ativando o vacuum incremental em bancos antigos (bloqueia o banco)")
+    args = parser.parse_args(argv)
+
+    job = RetencaoMemoria(_banco_configurado(config, args.banco), args.dias, args.lote, args.arquivar, retencao["vacuum_pages"])
+    if args.simular:
+        pendentes = job.pendentes()
+        print(f"Corte: {job.corte} UTC ({args.dias} dias)")
+        for tabela, quantidade in pendentes.items():
+            print(f"  {tabela:<20} {quantidade:>10}")
+        print(f"Total: {sum(pendentes.values())} registros seriam consolidados")
+        return 0
+
+    print(formatar(job.executar(), args.dias))
+    if args.vacuum_completo:
+        inicio = time.time()
+        job.vacuum_completo()
+        print(f"VACUUM completo em {time.time() - inicio:.2f}s (vacuum incremental ativado)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,365 +3,337 @@ AEGIS Bug Hunter - Memory System
 Sistema de memória e correlação para aprendizado contínuo
 """
 
-import os
-import json
-import sqlite3
-import hashlib
 from datetime import datetime, timedelta
 from urllib.parse import urlparse
 
+from .artifact_bus import barramento_local
+from .config_manager import get_config
+from .memory_db import obter_banco
+from .memory_migrations import GLOBAL, hash_vulnerabilidade, migrar, somar_vulnerabilidades_desde
+from .memory_writer import gravador_configurado
+
+# Artefatos consumidos/produzidos (usados pelo agendador do pipeline)
+CONSOME = ("injects", "defense_analysis")
+PRODUZ = ("memory_analysis",)
+
+# A partir deste número de vulnerabilidades num lote, os resumos (stats_vulnerabilities)
+# são somados numa consulta agrupada no fim, em vez de dois upserts por linha nos gatilhos
+LOTE_ESTATISTICAS_ADIADAS = 500
+
 class MemorySystem:
-    def __init__(self, db_path="aegis_memory.db"):
+    """
+    Memória persistente entre scans. Todas as operações usam a conexão de longa
+    duração do banco (memory_db.obter_banco); gravações de um resultado de módulo
+    (vulnerabilidades, defesas) vão em lote, numa única transação.
+    """
+
+    def __init__(self, db_path="aegis_memory.db", pragmas=None):
         self.db_path = db_path
+        self.banco = obter_banco(db_path, pragmas)
+        self._alvos = {}
+        self._ids = {}
         self.init_database()
     
     def init_database(self):
-        """Inicializa o banco de dados SQLite"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Tabela de alvos
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS targets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                url TEXT UNIQUE NOT NULL,
-                domain TEXT NOT NULL,
-                first_scan TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_scan TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                total_scans INTEGER DEFAULT 1,
-                risk_level TEXT,
-                technologies TEXT,
-                defenses TEXT
-            )
-        ''')
-        
-        # Tabela de vulnerabilidades
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS vulnerabilities (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                target_id INTEGER,
-                vuln_type TEXT NOT NULL,
-                location TEXT NOT NULL,
-                payload TEXT NOT NULL,
-                evidence TEXT,
-                confidence REAL,
-                severity TEXT,
-                first_found TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_confirmed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status TEXT DEFAULT 'active',
-                false_positive BOOLEAN DEFAULT 0,
-                FOREIGN KEY (target_id) REFERENCES targets (id)
-            )
-        ''')
-        
-        # Tabela de payloads efetivos
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS effective_payloads (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                payload TEXT NOT NULL,
-                payload_type TEXT NOT NULL,
-                target_domain TEXT NOT NULL,
-                success_rate REAL DEFAULT 0.0,
-                times_used INTEGER DEFAULT 1,
-                times_successful INTEGER DEFAULT 0,
-                last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                context TEXT
-            )
-        ''')
-        
-        # Tabela de defesas detectadas
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS detected_defenses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                target_id INTEGER,
-                defense_type TEXT NOT NULL,
-                defense_name TEXT NOT NULL,
-                confidence REAL,
-                bypass_methods TEXT,
-                first_detected TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_detected TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                active BOOLEAN DEFAULT 1,
-                FOREIGN KEY (target_id) REFERENCES targets (id)
-            )
-        ''')
-        
-        # Tabela de padrões de sucesso
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS success_patterns (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                pattern_type TEXT NOT NULL,
-                pattern_data TEXT NOT NULL,
-                success_count INTEGER DEFAULT 1,
-                total_attempts INTEGER DEFAULT 1,
-                effectiveness REAL DEFAULT 0.0,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Tabela de sessões de scan
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS scan_sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                target_id INTEGER,
-                session_start TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                session_end TIMESTAMP,
-                modules_executed TEXT,
-                vulnerabilities_found INTEGER DEFAULT 0,
-                scan_duration INTEGER,
-                success_rate REAL DEFAULT 0.0,
-                FOREIGN KEY (target_id) REFERENCES targets (id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        """Cria ou migra o esquema do banco (memory_migrations)"""
+        migrar(self.banco)
     
     def get_target_id(self, target_url):
-        """Obtém ou cria ID do alvo"""
+        """Obtém ou cria ID do alvo (a varredura é contada uma vez por instância)"""
+        if target_url in self._alvos:
+            return self._alvos[target_url]
         domain = urlparse(target_url).netloc
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Verifica se alvo já existe
-        cursor.execute("SELECT id FROM targets WHERE url = ?", (target_url,))
-        result = cursor.fetchone()
-        
-        if result:
-            target_id = result[0]
-            # Atualiza última varredura
-            cursor.execute(
-                "UPDATE targets SET last_scan = CURRENT_TIMESTAMP, total_scans = total_scans + 1 WHERE id = ?",
-                (target_id,)
-            )
-        else:
-            # Cria novo alvo
-            cursor.execute(
-                "INSERT INTO targets (url, domain) VALUES (?, ?)",
-                (target_url, domain)
-            )
-            target_id = cursor.lastrowid
-        
-        conn.commit()
-        conn.close()
-        return target_id
-    
-    def store_vulnerabilities(self, target_url, vulnerabilities):
-        """Armazena vulnerabilidades encontradas"""
-        target_id = self.get_target_id(target_url)
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        for vuln in vulnerabilities:
-            # Verifica se vulnerabilidade já existe
-            vuln_hash = hashlib.md5(
-                f"{vuln.get('tipo_payload', vuln.get('tipo', ''))}{vuln.get('localizacao', vuln.get('parametro', ''))}{vuln.get('payload', '')}".encode()
-            ).hexdigest()
+        with self.banco.transacao() as conn:
+            cursor = conn.cursor()
             
-            cursor.execute(
-                "SELECT id FROM vulnerabilities WHERE target_id = ? AND vuln_type = ? AND location = ? AND payload = ?",
-                (target_id, vuln.get('tipo_payload', vuln.get('tipo', '')), 
-                 vuln.get('localizacao', vuln.get('parametro', '')), vuln.get('payload', ''))
-            )
+            # Verifica se alvo já existe
+            cursor.execute("SELECT id FROM targets WHERE url = ?", (target_url,))
+            result = cursor.fetchone()
             
-            if cursor.fetchone():
-                # Atualiza vulnerabilidade existente
+            if result:
+                target_id = result[0]
+                # Atualiza última varredura
                 cursor.execute(
-                    "UPDATE vulnerabilities SET last_confirmed = CURRENT_TIMESTAMP, confidence = ? WHERE target_id = ? AND vuln_type = ? AND location = ? AND payload = ?",
-                    (vuln.get('confianca', 0.5), target_id, vuln.get('tipo_payload', vuln.get('tipo', '')),
-                     vuln.get('localizacao', vuln.get('parametro', '')), vuln.get('payload', ''))
+                    "UPDATE targets SET last_scan = CURRENT_TIMESTAMP, total_scans = total_scans + 1 WHERE id = ?",
+                    (target_id,)
                 )
             else:
-                # Insere nova vulnerabilidade
+                # Cria novo alvo
                 cursor.execute(
-                    "INSERT INTO vulnerabilities (target_id, vuln_type, location, payload, evidence, confidence, severity) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                    (target_id, vuln.get('tipo_payload', vuln.get('tipo', '')),
-                     vuln.get('localizacao', vuln.get('parametro', '')), vuln.get('payload', ''),
-                     vuln.get('evidencia', ''), vuln.get('confianca', 0.5),
-                     self._classify_severity(vuln.get('tipo_payload', vuln.get('tipo', ''))))
+                    "INSERT INTO targets (url, domain) VALUES (?, ?)",
+                    (target_url, domain)
                 )
+                target_id = cursor.lastrowid
         
-        conn.commit()
-        conn.close()
+        self._alvos[target_url] = target_id
+        return target_id
     
-    def store_effective_payload(self, payload, payload_type, target_url, success=True, context=""):
-        """Armazena payload efetivo"""
-        domain = urlparse(target_url).netloc
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Verifica se payload já existe para este domínio
-        cursor.execute(
-            "SELECT id, times_used, times_successful FROM effective_payloads WHERE payload = ? AND payload_type = ? AND target_domain = ?",
-            (payload, payload_type, domain)
+    def id_existente(self, target_url):
+        """ID do alvo já gravado (None se ainda não existe), sem criá-lo nem contar varredura"""
+        target_id = self._alvos.get(target_url) or self._ids.get(target_url)
+        if target_id is None:
+            with self.banco.leitura() as conn:
+                linha = conn.execute("SELECT id FROM targets WHERE url = ?", (target_url,)).fetchone()
+            target_id = linha[0] if linha else None
+        return target_id
+    
+    def id_alvo(self, conn, target_url):
+        """ID do alvo dentro de uma transação já aberta, criando-o sem contar varredura"""
+        target_id = self._alvos.get(target_url) or self._ids.get(target_url)
+        if target_id is None:
+            conn.execute("INSERT OR IGNORE INTO targets (url, domain) VALUES (?, ?)", (target_url, urlparse(target_url).netloc))
+            target_id = conn.execute("SELECT id FROM targets WHERE url = ?", (target_url,)).fetchone()[0]
+            self._ids[target_url] = target_id
+        return target_id
+    
+    def _gravar_vulnerabilidades(self, conn, target_id, vulnerabilities):
+        linhas = []
+        for vuln in vulnerabilities:
+            tipo = vuln.get('tipo_payload', vuln.get('tipo', ''))
+            localizacao = vuln.get('localizacao', vuln.get('parametro', ''))
+            payload = vuln.get('payload', '')
+            linhas.append((target_id, tipo, localizacao, payload, vuln.get('evidencia', ''), vuln.get('confianca', 0.5),
+                           self._classify_severity(tipo), hash_vulnerabilidade(target_id, tipo, localizacao, payload)))
+        
+        adiar = len(linhas) >= LOTE_ESTATISTICAS_ADIADAS
+        if adiar:
+            # A primeira escrita reserva o banco: o maior id lido abaixo não muda até o commit
+            conn.execute("INSERT INTO stats_adiadas (ativo) VALUES (1)")
+            ultimo_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM vulnerabilities").fetchone()[0]
+        
+        # Já conhecidas (no banco ou repetidas no lote) só têm a confirmação atualizada
+        conn.executemany(
+            "INSERT INTO vulnerabilities (target_id, vuln_type, location, payload, evidence, confidence, severity, vuln_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (vuln_hash) DO UPDATE SET last_confirmed = CURRENT_TIMESTAMP, confidence = excluded.confidence",
+            linhas
         )
-        result = cursor.fetchone()
-        
-        if result:
-            payload_id, times_used, times_successful = result
-            new_times_used = times_used + 1
-            new_times_successful = times_successful + (1 if success else 0)
-            new_success_rate = new_times_successful / new_times_used
-            
-            cursor.execute(
-                "UPDATE effective_payloads SET times_used = ?, times_successful = ?, success_rate = ?, last_used = CURRENT_TIMESTAMP WHERE id = ?",
-                (new_times_used, new_times_successful, new_success_rate, payload_id)
-            )
-        else:
-            success_rate = 1.0 if success else 0.0
-            cursor.execute(
-                "INSERT INTO effective_payloads (payload, payload_type, target_domain, success_rate, times_successful, context) VALUES (?, ?, ?, ?, ?, ?)",
-                (payload, payload_type, domain, success_rate, 1 if success else 0, context)
-            )
         
-        conn.commit()
-        conn.close()
+        if adiar:
+            # AUTOINCREMENT: as inseridas agora são exatamente as de id maior que o anterior
+            somar_vulnerabilidades_desde(conn, ultimo_id)
+            conn.execute("DELETE FROM stats_adiadas")
     
-    def store_defenses(self, target_url, defenses):
-        """Armazena defesas detectadas"""
-        target_id = self.get_target_id(target_url)
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def _gravar_payloads(self, conn, linhas):
+        """
+        linhas: (payload, tipo, domínio, usos, sucessos, contexto); contagens somadas às existentes.
+        Com contexto (ex: o do parâmetro, do payload_ranker), também por contexto em payload_contexts
+        """
+        conn.executemany(
+            "INSERT INTO effective_payloads (payload, payload_type, target_domain, success_rate, times_used, times_successful, context) "
+            "VALUES (?1, ?2, ?3, CAST(?5 AS REAL) / ?4, ?4, ?5, ?6) "
+            "ON CONFLICT (payload_type, target_domain, payload) DO UPDATE SET "
+            "times_used = times_used + excluded.times_used, "
+            "times_successful = times_successful + excluded.times_successful, "
+            "success_rate = CAST(times_successful + excluded.times_successful AS REAL) / (times_used + excluded.times_used), "
+            "last_used = CURRENT_TIMESTAMP",
+            linhas
+        )
+        conn.executemany(
+            "INSERT INTO payload_contexts (target_domain, payload_type, context, payload, times_used, times_successful) "
+            "VALUES (?3, ?2, ?6, ?1, ?4, ?5) "
+            "ON CONFLICT (target_domain, payload_type, context, payload) DO UPDATE SET "
+            "times_used = times_used + excluded.times_used, "
+            "times_successful = times_successful + excluded.times_successful",
+            [linha for linha in linhas if linha[5]]
+        )
+    
+    def _gravar_defesas(self, conn, target_id, defenses):
+        existentes = set(conn.execute(
+            "SELECT defense_type, defense_name FROM detected_defenses WHERE target_id = ?", (target_id,)
+        ))
         
+        novas, atualizacoes = {}, []
         for defense in defenses:
-            # Verifica se defesa já foi detectada
-            cursor.execute(
-                "SELECT id FROM detected_defenses WHERE target_id = ? AND defense_type = ? AND defense_name = ?",
-                (target_id, defense.get('nome', ''), defense.get('tipo', ''))
-            )
-            
-            if cursor.fetchone():
-                # Atualiza detecção existente
-                cursor.execute(
-                    "UPDATE detected_defenses SET last_detected = CURRENT_TIMESTAMP, confidence = ? WHERE target_id = ? AND defense_type = ? AND defense_name = ?",
-                    (defense.get('confianca', 0.5), target_id, defense.get('nome', ''), defense.get('tipo', ''))
-                )
+            chave = (defense.get('nome', ''), defense.get('tipo', ''))
+            if chave in existentes or chave in novas:
+                atualizacoes.append((defense.get('confianca', 0.5), target_id, *chave))
             else:
-                # Insere nova detecção
-                cursor.execute(
-                    "INSERT INTO detected_defenses (target_id, defense_type, defense_name, confidence) VALUES (?, ?, ?, ?)",
-                    (target_id, defense.get('nome', ''), defense.get('tipo', ''), defense.get('confianca', 0.5))
-                )
+                novas[chave] = (target_id, *chave, defense.get('confianca', 0.5))
         
-        conn.commit()
-        conn.close()
+        conn.executemany(
+            "INSERT INTO detected_defenses (target_id, defense_type, defense_name, confidence) VALUES (?, ?, ?, ?)",
+            novas.values()
+        )
+        conn.executemany(
+            "UPDATE detected_defenses SET last_detected = CURRENT_TIMESTAMP, confidence = ? WHERE target_id = ? AND defense_type = ? AND defense_name = ?",
+            atualizacoes
+        )
+    
+    def store_vulnerabilities(self, target_url, vulnerabilities):
+        """Armazena vulnerabilidades encontradas (lote em uma transação, deduplicado por vuln_hash)"""
+        target_id = self.get_target_id(target_url)
+        with self.banco.transacao() as conn:
+            self._gravar_vulnerabilidades(conn, target_id, vulnerabilities)
+    
+    def store_effective_payload(self, payload, payload_type, target_url, success=True, context=""):
+        """Armazena payload efetivo"""
+        domain = urlparse(target_url).netloc
+        with self.banco.transacao() as conn:
+            self._gravar_payloads(conn, [(payload, payload_type, domain, 1, 1 if success else 0, context)])
+    
+    def store_defenses(self, target_url, defenses):
+        """Armazena defesas detectadas (lote em uma transação)"""
+        target_id = self.get_target_id(target_url)
+        with self.banco.transacao() as conn:
+            self._gravar_defesas(conn, target_id, defenses)
+    
+    def gravar_lote(self, vulnerabilidades=None, defesas=None, payloads=None):
+        """
+        Grava eventos de vários alvos numa única transação (usado pelo memory_writer).
+        vulnerabilidades/defesas: {target_url: [itens]}; payloads: linhas de _gravar_payloads.
+        BEGIN IMMEDIATE reserva a escrita já no início: entre processos, a espera fica
+        no busy_timeout, sem falha de "database is locked" ao promover a transação.
+        """
+        with self.banco.transacao() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for target_url, itens in (vulnerabilidades or {}).items():
+                self._gravar_vulnerabilidades(conn, self.id_alvo(conn, target_url), itens)
+            for target_url, itens in (defesas or {}).items():
+                self._gravar_defesas(conn, self.id_alvo(conn, target_url), itens)
+            if payloads:
+                self._gravar_payloads(conn, payloads)
     
     def get_historical_vulnerabilities(self, target_url):
         """Obtém vulnerabilidades históricas do alvo"""
-        target_id = self.get_target_id(target_url)
+        target_id = self.id_existente(target_url)
+        if target_id is None:
+            return []
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "SELECT vuln_type, location, payload, evidence, confidence, severity, first_found, status FROM vulnerabilities WHERE target_id = ? AND status = 'active'",
-            (target_id,)
-        )
-        
-        vulnerabilities = []
-        for row in cursor.fetchall():
-            vulnerabilities.append({
-                "tipo": row[0],
-                "localizacao": row[1],
-                "payload": row[2],
-                "evidencia": row[3],
-                "confianca": row[4],
-                "severidade": row[5],
-                "primeira_deteccao": row[6],
-                "status": row[7]
-            })
-        
-        conn.close()
+        with self.banco.leitura() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(
+                "SELECT vuln_type, location, payload, evidence, confidence, severity, first_found, status FROM vulnerabilities WHERE target_id = ? AND status = 'active'",
+                (target_id,)
+            )
+            
+            vulnerabilities = []
+            for row in cursor.fetchall():
+                vulnerabilities.append({
+                    "tipo": row[0],
+                    "localizacao": row[1],
+                    "payload": row[2],
+                    "evidencia": row[3],
+                    "confianca": row[4],
+                    "severidade": row[5],
+                    "primeira_deteccao": row[6],
+                    "status": row[7]
+                })
         return vulnerabilities
     
     def get_best_payloads(self, payload_type, target_url=None, limit=10):
         """Obtém melhores payloads para um tipo específico"""
         domain = urlparse(target_url).netloc if target_url else None
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        if domain:
-            cursor.execute(
-                "SELECT payload, success_rate, times_used, context FROM effective_payloads WHERE payload_type = ? AND target_domain = ? ORDER BY success_rate DESC, times_used DESC LIMIT ?",
-                (payload_type, domain, limit)
+        with self.banco.leitura() as conn:
+            cursor = conn.cursor()
+            
+            if domain:
+                cursor.execute(
+                    "SELECT payload, success_rate, times_used, context FROM effective_payloads WHERE payload_type = ? AND target_domain = ? ORDER BY success_rate DESC, times_used DESC LIMIT ?",
+                    (payload_type, domain, limit)
+                )
+            else:
+                cursor.execute(
+                    "SELECT payload, success_rate, times_used, context FROM effective_payloads WHERE payload_type = ? ORDER BY success_rate DESC, times_used DESC LIMIT ?",
+                    (payload_type, limit)
+                )
+            
+            payloads = []
+            for row in cursor.fetchall():
+                payloads.append({
+                    "payload": row[0],
+                    "success_rate": row[1],
+                    "times_used": row[2],
+                    "context": row[3]
+                })
+        return payloads
+
+    def historico_payloads(self, target_url):
+        """
+        Usos e acertos de cada payload no domínio do alvo e em todos os domínios, numa
+        única consulta: {(tipo, payload): (usos_dominio, sucessos_dominio, usos_total, sucessos_total)}
+        """
+        domain = urlparse(target_url).netloc
+
+        with self.banco.leitura() as conn:
+            cursor = conn.execute(
+                "SELECT payload_type, payload, "
+                "SUM(CASE WHEN target_domain = ?1 THEN times_used ELSE 0 END), "
+                "SUM(CASE WHEN target_domain = ?1 THEN times_successful ELSE 0 END), "
+                "SUM(times_used), SUM(times_successful) "
+                "FROM effective_payloads GROUP BY payload_type, payload",
+                (domain,)
             )
-        else:
-            cursor.execute(
-                "SELECT payload, success_rate, times_used, context FROM effective_payloads WHERE payload_type = ? ORDER BY success_rate DESC, times_used DESC LIMIT ?",
-                (payload_type, limit)
+            return {(row[0], row[1]): tuple(int(valor or 0) for valor in row[2:]) for row in cursor}
+
+    def historico_contextos(self, target_url):
+        """Usos e acertos de cada tipo de payload por contexto no domínio: {(tipo, contexto): (usos, sucessos)}"""
+        domain = urlparse(target_url).netloc
+
+        with self.banco.leitura() as conn:
+            cursor = conn.execute(
+                "SELECT payload_type, context, SUM(times_used), SUM(times_successful) "
+                "FROM payload_contexts WHERE target_domain = ? GROUP BY payload_type, context",
+                (domain,)
             )
-        
-        payloads = []
-        for row in cursor.fetchall():
-            payloads.append({
-                "payload": row[0],
-                "success_rate": row[1],
-                "times_used": row[2],
-                "context": row[3]
-            })
-        
-        conn.close()
-        return payloads
-    
+            return {(row[0], row[1]): (int(row[2] or 0), int(row[3] or 0)) for row in cursor}
+
     def get_defense_history(self, target_url):
         """Obtém histórico de defesas do alvo"""
-        target_id = self.get_target_id(target_url)
+        target_id = self.id_existente(target_url)
+        if target_id is None:
+            return []
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            "SELECT defense_type, defense_name, confidence, first_detected, last_detected, active FROM detected_defenses WHERE target_id = ?",
-            (target_id,)
-        )
-        
-        defenses = []
-        for row in cursor.fetchall():
-            defenses.append({
-                "tipo": row[0],
-                "nome": row[1],
-                "confianca": row[2],
-                "primeira_deteccao": row[3],
-                "ultima_deteccao": row[4],
-                "ativo": bool(row[5])
-            })
-        
-        conn.close()
+        with self.banco.leitura() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(
+                "SELECT defense_type, defense_name, confidence, first_detected, last_detected, active FROM detected_defenses WHERE target_id = ?",
+                (target_id,)
+            )
+            
+            defenses = []
+            for row in cursor.fetchall():
+                defenses.append({
+                    "tipo": row[0],
+                    "nome": row[1],
+                    "confianca": row[2],
+                    "primeira_deteccao": row[3],
+                    "ultima_deteccao": row[4],
+                    "ativo": bool(row[5])
+                })
         return defenses
     
     def analyze_target_patterns(self, target_url):
         """Analisa padrões do alvo baseado no histórico"""
         domain = urlparse(target_url).netloc
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Análise de vulnerabilidades mais comuns
-        cursor.execute(
-            "SELECT vuln_type, COUNT(*) as count FROM vulnerabilities v JOIN targets t ON v.target_id = t.id WHERE t.domain = ? GROUP BY vuln_type ORDER BY count DESC",
-            (domain,)
-        )
-        vuln_patterns = cursor.fetchall()
-        
-        # Análise de payloads mais efetivos
-        cursor.execute(
-            "SELECT payload_type, AVG(success_rate) as avg_success FROM effective_payloads WHERE target_domain = ? GROUP BY payload_type ORDER BY avg_success DESC",
-            (domain,)
-        )
-        payload_patterns = cursor.fetchall()
-        
-        # Análise de defesas
-        cursor.execute(
-            "SELECT defense_type, COUNT(*) as count FROM detected_defenses d JOIN targets t ON d.target_id = t.id WHERE t.domain = ? AND d.active = 1 GROUP BY defense_type",
-            (domain,)
-        )
-        defense_patterns = cursor.fetchall()
-        
-        conn.close()
+        with self.banco.leitura() as conn:
+            cursor = conn.cursor()
+            
+            # Resumos por domínio mantidos por gatilhos (memory_migrations, versão 6)
+            # Análise de vulnerabilidades mais comuns
+            cursor.execute(
+                "SELECT vuln_type, SUM(total) as count FROM stats_vulnerabilities WHERE domain = ? GROUP BY vuln_type HAVING count > 0 ORDER BY count DESC",
+                (domain,)
+            )
+            vuln_patterns = cursor.fetchall()
+            
+            # Análise de payloads mais efetivos
+            cursor.execute(
+                "SELECT payload_type, success_sum / payloads as avg_success FROM stats_payloads WHERE domain = ? AND payloads > 0 ORDER BY avg_success DESC",
+                (domain,)
+            )
+            payload_patterns = cursor.fetchall()
+            
+            # Análise de defesas
+            cursor.execute(
+                "SELECT defense_type, active_total FROM stats_defenses WHERE domain = ? AND active_total > 0",
+                (domain,)
+            )
+            defense_patterns = cursor.fetchall()
         
         return {
             "vulnerabilidades_comuns": [{"tipo": row[0], "frequencia": row[1]} for row in vuln_patterns],
@@ -369,11 +341,14 @@ class MemorySystem:
             "defesas_ativas": [{"tipo": row[0], "frequencia": row[1]} for row in defense_patterns]
         }
     
-    def generate_recommendations(self, target_url):
-        """Gera recomendações baseadas no histórico"""
-        patterns = self.analyze_target_patterns(target_url)
-        historical_vulns = self.get_historical_vulnerabilities(target_url)
-        defense_history = self.get_defense_history(target_url)
+    def generate_recommendations(self, target_url, patterns=None, historical_vulns=None, defense_history=None):
+        """Gera recomendações baseadas no histórico (consultas já feitas podem ser repassadas)"""
+        if patterns is None:
+            patterns = self.analyze_target_patterns(target_url)
+        if historical_vulns is None:
+            historical_vulns = self.get_historical_vulnerabilities(target_url)
+        if defense_history is None:
+            defense_history = self.get_defense_history(target_url)
         
         recommendations = {
             "payloads_recomendados": {},
@@ -412,6 +387,44 @@ class MemorySystem:
         
         return recommendations
     
+    def analisar(self, target_url, injects_data, defense_data):
+        """Grava os resultados do scan (um lote por módulo) e monta a análise de memória"""
+        self.get_target_id(target_url)
+        
+        # Processa vulnerabilidades se existirem
+        if "vulnerabilidades_encontradas" in injects_data:
+            self.store_vulnerabilities(target_url, injects_data["vulnerabilidades_encontradas"])
+        
+        # Processa defesas se existirem
+        if "defesas_detectadas" in defense_data:
+            self.store_defenses(target_url, defense_data["defesas_detectadas"])
+        
+        return self.montar_analise(target_url)
+    
+    def montar_analise(self, target_url):
+        """Padrões, históricos, recomendações e estatísticas do alvo (somente leitura)"""
+        patterns = self.analyze_target_patterns(target_url)
+        historical_vulns = self.get_historical_vulnerabilities(target_url)
+        defense_history = self.get_defense_history(target_url)
+        recommendations = self.generate_recommendations(target_url, patterns, historical_vulns, defense_history)
+        statistics = self.get_statistics()
+        
+        return {
+            "target_url": target_url,
+            "timestamp": datetime.now().isoformat(),
+            "padroes_identificados": patterns,
+            "recomendacoes": recommendations,
+            "historico_vulnerabilidades": historical_vulns,
+            "historico_defesas": defense_history,
+            "estatisticas_gerais": statistics,
+            "resumo": {
+                "total_vulnerabilidades_historicas": len(historical_vulns),
+                "total_defesas_ativas": len([d for d in defense_history if d["ativo"]]),
+                "tipos_payload_efetivos": len(recommendations["payloads_recomendados"]),
+                "areas_foco_identificadas": len(recommendations["areas_foco"])
+            }
+        }
+    
     def _classify_severity(self, vuln_type):
         """Classifica severidade da vulnerabilidade"""
         severity_map = {
@@ -425,98 +438,89 @@ class MemorySystem:
     
     def get_statistics(self):
         """Obtém estatísticas gerais do sistema"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Total de alvos
-        cursor.execute("SELECT COUNT(*) FROM targets")
-        total_targets = cursor.fetchone()[0]
-        
-        # Total de vulnerabilidades
-        cursor.execute("SELECT COUNT(*) FROM vulnerabilities WHERE status = 'active'")
-        total_vulns = cursor.fetchone()[0]
-        
-        # Vulnerabilidades por severidade
-        cursor.execute("SELECT severity, COUNT(*) FROM vulnerabilities WHERE status = 'active' GROUP BY severity")
-        vulns_by_severity = dict(cursor.fetchall())
-        
-        # Payloads mais efetivos
-        cursor.execute("SELECT payload_type, AVG(success_rate) FROM effective_payloads GROUP BY payload_type ORDER BY AVG(success_rate) DESC LIMIT 5")
-        top_payloads = cursor.fetchall()
-        
-        # Defesas mais comuns
-        cursor.execute("SELECT defense_type, COUNT(*) FROM detected_defenses WHERE active = 1 GROUP BY defense_type ORDER BY COUNT(*) DESC LIMIT 5")
-        common_defenses = cursor.fetchall()
-        
-        conn.close()
+        with self.banco.leitura() as conn:
+            cursor = conn.cursor()
+            
+            # Contadores mantidos por gatilhos (memory_migrations, versão 6): custo independe do tamanho do banco
+            cursor.execute("SELECT name, value FROM stats_counters")
+            counters = dict(cursor.fetchall())
+            total_targets = counters.get("targets", 0)
+            
+            # Vulnerabilidades por severidade
+            cursor.execute(
+                "SELECT NULLIF(severity, ''), SUM(total) FROM stats_vulnerabilities WHERE domain = ? AND status = 'active' GROUP BY severity HAVING SUM(total) > 0",
+                (GLOBAL,)
+            )
+            vulns_by_severity = dict(cursor.fetchall())
+            total_vulns = sum(vulns_by_severity.values())
+            
+            # Payloads mais efetivos
+            cursor.execute(
+                "SELECT payload_type, success_sum / payloads FROM stats_payloads WHERE domain = ? AND payloads > 0 ORDER BY success_sum / payloads DESC LIMIT 5",
+                (GLOBAL,)
+            )
+            top_payloads = cursor.fetchall()
+            
+            # Defesas mais comuns
+            cursor.execute(
+                "SELECT defense_type, active_total FROM stats_defenses WHERE domain = ? AND active_total > 0 ORDER BY active_total DESC LIMIT 5",
+                (GLOBAL,)
+            )
+            common_defenses = cursor.fetchall()
+            
+            # Ocorrências antigas consolidadas pela retenção (memory_retention)
+            rolled_up_vulns = counters.get("rolled_up_vulnerabilities", 0)
         
         return {
             "total_targets": total_targets,
             "total_vulnerabilities": total_vulns,
             "vulnerabilities_by_severity": vulns_by_severity,
             "top_payload_types": [{"tipo": row[0], "taxa_sucesso": row[1]} for row in top_payloads],
-            "common_defenses": [{"tipo": row[0], "frequencia": row[1]} for row in common_defenses]
+            "common_defenses": [{"tipo": row[0], "frequencia": row[1]} for row in common_defenses],
+            "rolled_up_vulnerabilities": rolled_up_vulns
         }
 
-def executar(target_url):
-    """Executa sistema de memória e correlação"""
+def executar(target_url, *, cliente=None, artefatos=None):
+    """
+    Executa sistema de memória e correlação. Na reprodução offline (cliente.offline,
+    --replay) o banco é só lido: nem o alvo nem os achados do scan gravado são contados de novo
+    """
     print(f"[memory_system] 🧠 Analisando memória e correlações para: {target_url}")
+    artefatos = artefatos or barramento_local(target_url)
     
     try:
-        memory = MemorySystem()
-        
-        # Carrega dados dos módulos anteriores
-        site_name = target_url.replace('https://', '').replace('http://', '').replace('/', '_')
-        output_dir = f"output/{site_name}"
-        
-        # Processa vulnerabilidades se existirem
-        injects_file = f"{output_dir}/injects.json"
-        if os.path.exists(injects_file):
-            with open(injects_file, 'r', encoding='utf-8') as f:
-                injects_data = json.load(f)
-                if "vulnerabilidades_encontradas" in injects_data:
-                    memory.store_vulnerabilities(target_url, injects_data["vulnerabilidades_encontradas"])
-        
-        # Processa defesas se existirem
-        defense_file = f"{output_dir}/defense_analysis.json"
-        if os.path.exists(defense_file):
-            with open(defense_file, 'r', encoding='utf-8') as f:
-                defense_data = json.load(f)
-                if "defesas_detectadas" in defense_data:
-                    memory.store_defenses(target_url, defense_data["defesas_detectadas"])
-        
-        # Gera análises e recomendações
-        patterns = memory.analyze_target_patterns(target_url)
-        recommendations = memory.generate_recommendations(target_url)
-        historical_vulns = memory.get_historical_vulnerabilities(target_url)
-        defense_history = memory.get_defense_history(target_url)
-        statistics = memory.get_statistics()
-        
-        resultado = {
-            "target_url": target_url,
-            "timestamp": datetime.now().isoformat(),
-            "padroes_identificados": patterns,
-            "recomendacoes": recommendations,
-            "historico_vulnerabilidades": historical_vulns,
-            "historico_defesas": defense_history,
-            "estatisticas_gerais": statistics,
-            "resumo": {
-                "total_vulnerabilidades_historicas": len(historical_vulns),
-                "total_defesas_ativas": len([d for d in defense_history if d["ativo"]]),
-                "tipos_payload_efetivos": len(recommendations["payloads_recomendados"]),
-                "areas_foco_identificadas": len(recommendations["areas_foco"])
-            }
-        }
-        
-        # Salva resultado
-        arquivo_saida = f"{output_dir}/memory_analysis.json"
-        with open(arquivo_saida, "w", encoding="utf-8") as f:
-            json.dump(resultado, f, indent=4, ensure_ascii=False)
+        memoria_config = get_config().get_memory_config()
+        injects_data = artefatos.obter("injects", {})
+        defense_data = artefatos.obter("defense_analysis", {})
+        offline = bool(cliente is not None and cliente.offline)
+        gravador = None if offline else gravador_configurado()
+        if offline:
+            memory = MemorySystem(memoria_config["database_path"], memoria_config["sqlite"])
+            resultado = memory.montar_analise(target_url)
+        elif gravador is None:
+            memory = MemorySystem(memoria_config["database_path"], memoria_config["sqlite"])
+            resultado = memory.analisar(target_url, injects_data, defense_data)
+        else:
+            # Gravação pelo escritor do processo; a análise lê depois da barreira
+            memory = gravador.memoria
+            memory.get_target_id(target_url)
+            if memoria_config["store_vulnerabilities"] and "vulnerabilidades_encontradas" in injects_data:
+                gravador.registrar_vulnerabilidades(target_url, injects_data["vulnerabilidades_encontradas"])
+            if memoria_config["store_defenses"] and "defesas_detectadas" in defense_data:
+                gravador.registrar_defesas(target_url, defense_data["defesas_detectadas"])
+            if not gravador.sincronizar(memoria_config["writer"]["sync_timeout_s"]):
+                print("[memory_system] ⚠️ Escritor da memória não concluiu a tempo; a análise usa o que já foi gravado")
+            resultado = memory.montar_analise(target_url)
+        historical_vulns = resultado["historico_vulnerabilidades"]
+        defense_history = resultado["historico_defesas"]
+        
+        # Publica resultado (gravado em disco pelo barramento)
+        arquivo_saida = artefatos.publicar("memory_analysis", resultado)
         
         print(f"[memory_system] ✅ Análise de memória concluída")
         print(f"[memory_system] 📊 Vulnerabilidades históricas: {len(historical_vulns)}")
         print(f"[memory_system] 🛡️ Defesas ativas: {len([d for d in defense_history if d['ativo']])}")
-        print(f"[memory_system] 🎯 Áreas de foco: {len(recommendations['areas_foco'])}")
+        print(f"[memory_system] 🎯 Áreas de foco: {resultado['resumo']['areas_foco_identificadas']}")
         print(f"[memory_system] 💾 Resultado salvo em: {arquivo_saida}")
         
         return resultado
@@ -524,4 +528,3 @@ def executar(target_url):
     except Exception as e:
         print(f"[memory_system] ❌ Erro na análise de memória: {str(e)}")
         return {"erro": str(e)}
-
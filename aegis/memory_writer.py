@@ -0,0 +1,236 @@
+"""
+AEGIS Bug Hunter - Memory Writer
+Gravação em segundo plano do banco de memória: uma única thread de escrita por banco
+no processo consome eventos (vulnerabilidades, defesas, payloads) de uma fila, agrupa
+os repetidos e grava cada lote numa única transação
+
+Os módulos registram sem esperar (registrar_*); quem precisa ler o que foi registrado
+(o passo memory_system, o fim do scan) chama sincronizar(), que espera o lote em curso.
+Entre processos (modo lote), cada transação reserva a escrita com BEGIN IMMEDIATE e
+espera no busy_timeout; bloqueios que ainda assim escapem são repetidos com recuo.
+"""
+
+import os
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+from urllib.parse import urlparse
+
+_BARREIRA = "barreira"
+_PARAR = "parar"
+
+class GravadorMemoria:
+    """
+    Escritor único de um MemorySystem. Eventos que chegam dentro de `intervalo`
+    segundos (até `max_lote` eventos) viram uma só transação; vulnerabilidades e
+    defesas repetidas são coalescidas e usos de um mesmo payload (e contexto) somados.
+    """
+
+    def __init__(self, memoria, intervalo=0.05, max_lote=5000, tentativas=5):
+        self.memoria = memoria
+        self.intervalo = intervalo
+        self.max_lote = max(1, int(max_lote))
+        self.tentativas = max(1, int(tentativas))
+
+        self._fila = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._estatisticas = {"eventos": 0, "itens": 0, "coalescidos": 0, "transacoes": 0,
+                              "repeticoes_bloqueio": 0, "falhas": 0}
+        self.ultimo_erro = None
+
+    # -- Registro (não bloqueia) --------------------------------------------------
+
+    def registrar_vulnerabilidades(self, target_url, vulnerabilidades):
+        self._enfileirar(("vulnerabilidades", target_url, list(vulnerabilidades)))
+
+    def registrar_defesas(self, target_url, defesas):
+        self._enfileirar(("defesas", target_url, list(defesas)))
+
+    def registrar_payload(self, target_url, payload, tipo, sucesso=True, contexto=""):
+        self._enfileirar(("payloads", target_url, [(payload, tipo, 1, 1 if sucesso else 0, contexto)]))
+
+    def registrar_payloads(self, target_url, resultados):
+        """resultados: (payload, tipo, usos, sucessos, contexto) por payload testado"""
+        self._enfileirar(("payloads", target_url, list(resultados)))
+
+    def _enfileirar(self, evento):
+        self._iniciar()
+        self._fila.put(evento)
+
+    # -- Barreira e encerramento ---------------------------------------------------
+
+    def sincronizar(self, timeout=None):
+        """Espera a gravação de tudo o que foi registrado antes da chamada (True se concluiu)"""
+        if self._thread is None:
+            return True
+        concluido = threading.Event()
+        self._fila.put((_BARREIRA, concluido))
+        return concluido.wait(timeout)
+
+    def fechar(self, timeout=30):
+        """Grava os pendentes e encerra a thread de escrita"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._fila.put((_PARAR, None))
+        thread.join(timeout)
+
+    def estatisticas(self):
+        with self._lock:
+            return {**self._estatisticas, "pendentes": self._fila.qsize()}
+
+    # -- Thread de escrita ---------------------------------------------------------
+
+    def _iniciar(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name="aegis-memory-writer", daemon=True)
+                self._thread.start()
+
+    def _executar(self):
+        parar = False
+        while not parar:
+            lote, barreiras, parar = self._coletar()
+            try:
+                if lote:
+                    self._gravar(lote)
+            except Exception as e:
+                # Um lote com erro (ex: ao coalescer) não encerra a thread
+                self._falha(e, lote)
+            finally:
+                # Quem espera na barreira é sempre liberado, com ou sem falha
+                for barreira in barreiras:
+                    barreira.set()
+
+    def _coletar(self):
+        """Primeiro evento (bloqueante) e os que chegarem na janela; barreira ou parada fecham o lote"""
+        lote, barreiras = [], []
+        evento = self._fila.get()
+        limite = time.monotonic() + self.intervalo
+        while True:
+            tipo = evento[0]
+            if tipo == _BARREIRA:
+                barreiras.append(evento[1])
+                return lote, barreiras, False
+            if tipo == _PARAR:
+                return lote, barreiras, True
+            lote.append(evento)
+            if len(lote) >= self.max_lote:
+                return lote, barreiras, False
+            try:
+                evento = self._fila.get(timeout=max(0.0, limite - time.monotonic()))
+            except queue.Empty:
+                return lote, barreiras, False
+
+    def _coalescer(self, lote):
+        """Agrupa os eventos do lote no formato de MemorySystem.gravar_lote"""
+        vulnerabilidades, defesas, payloads = {}, {}, {}
+        itens = 0
+        for tipo, target_url, dados in lote:
+            itens += len(dados)
+            if tipo == "vulnerabilidades":
+                por_chave = vulnerabilidades.setdefault(target_url, {})
+                for vuln in dados:
+                    chave = (vuln.get('tipo_payload', vuln.get('tipo', '')), vuln.get('localizacao', vuln.get('parametro', '')),
+                             vuln.get('payload', ''))
+                    # Como na gravação direta: a primeira evidência fica, a confiança é a mais recente
+                    anterior = por_chave.get(chave)
+                    por_chave[chave] = {**anterior, "confianca": vuln.get("confianca", 0.5)} if anterior else vuln
+            elif tipo == "defesas":
+                por_chave = defesas.setdefault(target_url, {})
+                for defesa in dados:
+                    chave = (defesa.get('nome', ''), defesa.get('tipo', ''))
+                    anterior = por_chave.get(chave)
+                    por_chave[chave] = {**anterior, "confianca": defesa.get("confianca", 0.5)} if anterior else defesa
+            elif tipo == "payloads":
+                dominio = urlparse(target_url).netloc
+                for payload, tipo_payload, usos, sucessos, contexto in dados:
+                    acumulado = payloads.setdefault((payload, tipo_payload, dominio, contexto), [0, 0])
+                    acumulado[0] += usos
+                    acumulado[1] += sucessos
+
+        vulnerabilidades = {alvo: list(v.values()) for alvo, v in vulnerabilidades.items()}
+        defesas = {alvo: list(d.values()) for alvo, d in defesas.items()}
+        linhas = [(payload, tipo, dominio, usos, sucessos, contexto)
+                  for (payload, tipo, dominio, contexto), (usos, sucessos) in payloads.items() if usos]
+        gravados = sum(map(len, vulnerabilidades.values())) + sum(map(len, defesas.values())) + len(linhas)
+        return vulnerabilidades, defesas, linhas, itens - gravados
+
+    def _gravar(self, lote):
+        vulnerabilidades, defesas, payloads, coalescidos = self._coalescer(lote)
+        recuo = 0.05
+        for tentativa in range(1, self.tentativas + 1):
+            try:
+                self.memoria.gravar_lote(vulnerabilidades, defesas, payloads)
+                break
+            except sqlite3.OperationalError as e:
+                # A transação foi desfeita: repetir o lote inteiro não duplica contagens
+                bloqueio = "locked" in str(e) or "busy" in str(e)
+                if bloqueio and tentativa < self.tentativas:
+                    with self._lock:
+                        self._estatisticas["repeticoes_bloqueio"] += 1
+                    time.sleep(recuo)
+                    recuo *= 2
+                    continue
+                self._falha(e, lote)
+                return
+            except Exception as e:
+                self._falha(e, lote)
+                return
+
+        with self._lock:
+            self._estatisticas["eventos"] += len(lote)
+            self._estatisticas["itens"] += sum(len(evento[2]) for evento in lote)
+            self._estatisticas["coalescidos"] += coalescidos
+            self._estatisticas["transacoes"] += 1
+
+    def _falha(self, erro, lote):
+        self.ultimo_erro = str(erro)
+        with self._lock:
+            self._estatisticas["falhas"] += len(lote)
+        print(f"[memory_writer] ❌ Falha ao gravar {len(lote)} eventos na memória: {erro}")
+
+_gravadores = {}
+_lock_gravadores = threading.Lock()
+
+def obter_gravador(db_path, pragmas=None, intervalo=0.05, max_lote=5000, tentativas=5):
+    """Escritor do processo para o banco (criado na primeira chamada; pendentes gravados na saída)"""
+    from .memory_system import MemorySystem
+
+    chave = db_path if db_path == ":memory:" else os.path.abspath(db_path)
+    with _lock_gravadores:
+        gravador = _gravadores.get(chave)
+        if gravador is None:
+            # O banco registra seu fechamento antes: na saída, o escritor grava e encerra primeiro
+            gravador = GravadorMemoria(MemorySystem(db_path, pragmas), intervalo, max_lote, tentativas)
+            _gravadores[chave] = gravador
+            atexit.register(gravador.fechar)
+        return gravador
+
+def gravador_configurado(recurso=None):
+    """
+    Escritor do banco da configuração, ou None se o sistema de memória estiver desativado
+    (ou o recurso, ex: "store_payloads", estiver desligado)
+    """
+    from .config_manager import get_config
+    config = get_config().get_memory_config()
+    if not config["enabled"] or (recurso and not config.get(recurso, True)):
+        return None
+    escritor = config["writer"]
+    return obter_gravador(config["database_path"], config["sqlite"], escritor["flush_interval_ms"] / 1000,
+                          escritor["max_batch"], escritor["lock_retries"])
+
+def sincronizar_gravadores(timeout=None):
+    """Barreira de fim de scan: espera a gravação dos eventos de todos os escritores do processo"""
+    with _lock_gravadores:
+        gravadores = list(_gravadores.values())
+    return all(gravador.sincronizar(timeout) for gravador in gravadores)
+
+def estatisticas_gravadores():
+    """Estatísticas dos escritores do processo, por banco"""
+    with _lock_gravadores:
+        return {chave: gravador.estatisticas() for chave, gravador in _gravadores.items()}
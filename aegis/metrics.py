@@ -0,0 +1,272 @@
+"""
+AEGIS Bug Hunter - Metrics
+Instrumentação por módulo (tempo de parede, CPU, espera, rede, requisições, bytes e memória) exportada em metrics.json
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import contextvars
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ARQUIVO_METRICAS = "metrics.json"
+ARQUIVO_CPROFILE = "metrics.prof"
+ARQUIVO_COLAPSADO = "metrics.collapsed"
+PERFIS = ("cprofile", "collapsed")
+
+# Span do módulo em execução; propagado para as threads do motor assíncrono
+_span_atual = contextvars.ContextVar("aegis_span", default=None)
+
+# Contadores somados em cada span (segundos ou unidades)
+CONTADORES = (
+    "espera", "rede", "gravacao", "requisicoes", "erros_rede",
+    "bytes_enviados", "bytes_recebidos"
+)
+
+def span_atual():
+    return _span_atual.get()
+
+def registrar(**valores):
+    """Soma valores aos contadores do span atual (sem span ativo não faz nada)"""
+    span = _span_atual.get()
+    if span is not None:
+        span.registrar(**valores)
+
+def dormir(segundos):
+    """time.sleep contabilizado como espera do módulo atual"""
+    time.sleep(segundos)
+    registrar(espera=segundos)
+
+def rss_pico_kb():
+    """Pico de memória residente do processo em KB (None sem o módulo resource)"""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico // 1024 if sys.platform == "darwin" else pico
+
+class Span:
+    """Medições de um módulo do pipeline"""
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.inicio = 0.0
+        self.parede = 0.0
+        self.cpu = 0.0
+        self.contadores = dict.fromkeys(CONTADORES, 0)
+        self.memoria = {}
+        self.atributos = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, **valores):
+        with self._lock:
+            for chave, valor in valores.items():
+                self.contadores[chave] = self.contadores.get(chave, 0) + valor
+
+    def para_dict(self):
+        with self._lock:
+            contadores = dict(self.contadores)
+        for chave in ("espera", "rede", "gravacao"):
+            contadores[chave] = round(contadores[chave], 4)
+        return {
+            "modulo": self.nome,
+            "inicio": round(self.inicio, 4),
+            "parede": round(self.parede, 4),
+            "cpu": round(self.cpu, 4),
+            **contadores,
+            **self.memoria,
+            **self.atributos
+        }
+
+class ColetorMetricas:
+    """
+    Coleta os spans de um scan e grava metrics.json no diretório do alvo.
+
+    CPU é o tempo da thread do módulo (time.thread_time); requisições feitas pelo
+    motor assíncrono entram no span pelo contexto propagado. Os módulos rodam em
+    paralelo, então RSS e tracemalloc são picos do processo observados ao fim de
+    cada span, não exclusivos do módulo.
+
+    perfil="cprofile" grava metrics.prof (pstats, threads dos módulos);
+    perfil="collapsed" amostra as pilhas das threads de trabalho e grava
+    metrics.collapsed no formato de flamegraph.pl / speedscope. No Python 3.12+
+    só um cProfile fica ativo por vez no processo (sys.monitoring): um módulo que
+    começa com outro já perfilado cai para a amostragem (metrics.collapsed).
+    """
+
+    def __init__(self, output_dir, perfil=None, memoria=False, intervalo_amostragem=0.005):
+        if perfil not in (None,) + PERFIS:
+            raise ValueError(f"Perfil desconhecido: '{perfil}' (use {', '.join(PERFIS)})")
+        self.output_dir = output_dir
+        self.perfil = perfil
+        self.memoria = memoria
+        self.intervalo_amostragem = intervalo_amostragem
+
+        self.spans = []
+        self._inicio = None
+        self._cpu_inicio = None
+        self._lock = threading.Lock()
+        self._perfis = []
+        self._threads_span = {}
+        self._amostras = Counter()
+        self._parar = threading.Event()
+        self._amostrador = None
+        self._tracemalloc_proprio = False
+
+    def iniciar(self):
+        self._inicio = time.perf_counter()
+        self._cpu_inicio = time.process_time()
+        if self.memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracemalloc_proprio = True
+        if self.perfil == "collapsed":
+            self._iniciar_amostrador()
+        return self
+
+    def _iniciar_amostrador(self):
+        with self._lock:
+            if self._amostrador is None:
+                self._amostrador = threading.Thread(target=self._amostrar, name="aegis-amostrador", daemon=True)
+                self._amostrador.start()
+
+    def parar(self):
+        self.duracao = time.perf_counter() - self._inicio
+        self.cpu_total = time.process_time() - self._cpu_inicio
+        if self._amostrador is not None:
+            self._parar.set()
+            self._amostrador.join()
+        self.tracemalloc_pico_kb = None
+        if tracemalloc.is_tracing():
+            self.tracemalloc_pico_kb = tracemalloc.get_traced_memory()[1] // 1024
+            if self._tracemalloc_proprio:
+                tracemalloc.stop()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.parar()
+
+    @contextmanager
+    def span(self, nome):
+        """Mede o bloco como o módulo `nome` (deve rodar na thread do módulo)"""
+        span = Span(nome)
+        token = _span_atual.set(span)
+        thread = threading.get_ident()
+        with self._lock:
+            self._threads_span[thread] = nome
+
+        profiler = None
+        if self.perfil == "cprofile":
+            import cProfile
+            profiler = cProfile.Profile()
+
+        memoria_inicio = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        span.inicio = time.perf_counter() - self._inicio
+        cpu_inicio = time.thread_time()
+        if profiler:
+            try:
+                profiler.enable()
+            except ValueError:
+                # Python 3.12+: "Another profiling tool is already active" (outro módulo em paralelo)
+                profiler = None
+                span.atributos["perfil"] = "amostrado"
+                self._iniciar_amostrador()
+        try:
+            yield span
+        finally:
+            if profiler:
+                profiler.disable()
+            span.cpu = time.thread_time() - cpu_inicio
+            span.parede = time.perf_counter() - self._inicio - span.inicio
+
+            span.memoria["rss_pico_kb"] = rss_pico_kb()
+            if memoria_inicio is not None:
+                atual, pico = tracemalloc.get_traced_memory()
+                span.memoria["tracemalloc_delta_kb"] = (atual - memoria_inicio) // 1024
+                span.memoria["tracemalloc_pico_kb"] = pico // 1024
+
+            _span_atual.reset(token)
+            with self._lock:
+                self._threads_span.pop(thread, None)
+                self.spans.append(span)
+                if profiler:
+                    self._perfis.append(profiler)
+
+    def _amostrar(self):
+        """Amostra as pilhas das threads de trabalho; a raiz de cada pilha é o módulo (ou 'aegis-motor')"""
+        while not self._parar.wait(self.intervalo_amostragem):
+            nomes = {t.ident: t.name for t in threading.enumerate()}
+            with self._lock:
+                threads_span = dict(self._threads_span)
+            for ident, frame in sys._current_frames().items():
+                # Só threads de módulos e do motor: as demais (pools ociosos, principal) só esperam
+                raiz = threads_span.get(ident)
+                if raiz is None and nomes.get(ident, "").startswith("aegis-motor"):
+                    raiz = "aegis-motor"
+                if raiz is None:
+                    continue
+
+                pilha = []
+                while frame is not None:
+                    codigo = frame.f_code
+                    pilha.append(f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}")
+                    frame = frame.f_back
+                self._amostras[";".join([raiz] + pilha[::-1])] += 1
+
+    def resumo(self):
+        spans = sorted((s.para_dict() for s in self.spans), key=lambda s: s["inicio"])
+        totais = dict.fromkeys(CONTADORES, 0)
+        for span in spans:
+            for chave in CONTADORES:
+                totais[chave] += span[chave]
+        for chave in ("espera", "rede", "gravacao"):
+            totais[chave] = round(totais[chave], 4)
+
+        return {
+            "duracao": round(self.duracao, 4),
+            "cpu_processo": round(self.cpu_total, 4),
+            "rss_pico_kb": rss_pico_kb(),
+            "tracemalloc_pico_kb": self.tracemalloc_pico_kb,
+            "totais": totais,
+            "modulos": spans
+        }
+
+    def salvar(self, target_url, extras=None):
+        """Grava metrics.json (e o perfil, se pedido) e retorna o caminho"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        dados = {
+            "target_url": target_url,
+            "timestamp": datetime.now().isoformat(),
+            **self.resumo(),
+            **(extras or {})
+        }
+
+        if self.perfil == "cprofile" and self._perfis:
+            import pstats
+            estatisticas = pstats.Stats(self._perfis[0])
+            for profiler in self._perfis[1:]:
+                estatisticas.add(profiler)
+            dados["perfil"] = os.path.join(self.output_dir, ARQUIVO_CPROFILE)
+            estatisticas.dump_stats(dados["perfil"])
+        if self.perfil == "collapsed" or self._amostras:
+            # Com cprofile, as amostras são dos módulos que não puderam ser perfilados
+            chave = "perfil" if self.perfil == "collapsed" else "perfil_amostrado"
+            dados[chave] = os.path.join(self.output_dir, ARQUIVO_COLAPSADO)
+            with open(dados[chave], "w", encoding="utf-8") as f:
+                for pilha, total in self._amostras.most_common():
+                    f.write(f"{pilha} {total}\n")
+
+        arquivo = os.path.join(self.output_dir, ARQUIVO_METRICAS)
+        with open(arquivo, "w", encoding="utf-8") as f:
+            json.dump(dados, f, indent=4, ensure_ascii=False)
+        return arquivo
@@ -3,14 +3,17 @@ AEGIS Bug Hunter - HTML Parser
 Módulo responsável pela análise e parsing de conteúdo HTML
 """
 
-import os
-import json
-import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 from datetime import datetime
 import re
 
+from .artifact_bus import barramento_local
+from .http_client import HttpClient
+
+# Artefatos consumidos/produzidos (usados pelo agendador do pipeline)
+CONSOME = ()
+PRODUZ = ("parser",)
+
 def extrair_formularios(soup, base_url):
     """Extrai todos os formulários da página"""
     formularios = []
@@ -231,16 +234,41 @@ def calcular_metricas_pagina(soup, response_text):
     
     return metricas
 
-def executar(target_url):
+def rastrear_pontos_entrada(target_url, formularios, cliente, artefatos):
+    """
+    Rastreia as demais páginas do alvo (crawler) e grava em fluxo os formulários e URLs
+    com parâmetros além dos da página inicial. Retorna as estatísticas do rastreamento
+    (com o arquivo do fluxo), ou None se o rastreamento estiver desativado.
+    """
+    from .crawler import ARQUIVO_PONTOS, Rastreador
+    rastreador = Rastreador.configurado(cliente, target_url)
+    if rastreador is None:
+        return None
+
+    # A página inicial o inject_finder já testa pelo próprio artefato do parser
+    rastreador.pontos.novo({"tipo": "url", "url": target_url})
+    for form in formularios:
+        rastreador.pontos.novo({"tipo": "formulario", "form": form})
+
+    print(f"[parser] 🕸️ Rastreando o alvo (profundidade {rastreador.fronteira.profundidade_maxima}, até {rastreador.fronteira.max_paginas} páginas)")
+    with artefatos.abrir_fluxo(ARQUIVO_PONTOS) as fluxo:
+        for ponto in rastreador.pontos_entrada():
+            fluxo.emitir(ponto)
+    return {"arquivo": ARQUIVO_PONTOS, **rastreador.estatisticas()}
+
+def executar(target_url, *, cliente=None, artefatos=None):
     """Executa parsing completo da página"""
     print(f"[parser] 🔍 Fazendo parse da página: {target_url}")
+    cliente = cliente or HttpClient()
+    artefatos = artefatos or barramento_local(target_url)
     
     try:
         # Faz requisição
-        response = requests.get(target_url, timeout=10)
+        response = cliente.get(target_url)
         response.raise_for_status()
         
-        # Cria objeto BeautifulSoup
+        # Cria objeto BeautifulSoup (importado aqui: bs4 só é carregado quando o parser roda)
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(response.text, 'html.parser')
         
         # Extrai informações
@@ -253,6 +281,13 @@ def executar(target_url):
         tecnologias = analisar_tecnologias_frontend(soup)
         metricas = calcular_metricas_pagina(soup, response.text)
         
+        # Demais páginas: pontos de entrada em fluxo para o inject_finder
+        try:
+            rastreamento = rastrear_pontos_entrada(target_url, formularios, cliente, artefatos)
+        except Exception as e:
+            print(f"[parser] ⚠️ Rastreamento interrompido: {e}")
+            rastreamento = None
+        
         # Compila resultado
         resultado = {
             "target_url": target_url,
@@ -278,21 +313,20 @@ def executar(target_url):
                 "densidade_texto": metricas["densidade_texto"]
             }
         }
+        if rastreamento is not None:
+            resultado["rastreamento"] = rastreamento
         
-        # Salva resultado
-        site_name = target_url.replace('https://', '').replace('http://', '').replace('/', '_')
-        output_dir = f"output/{site_name}"
-        os.makedirs(output_dir, exist_ok=True)
-        
-        arquivo_saida = f"{output_dir}/parser.json"
-        with open(arquivo_saida, "w", encoding="utf-8") as f:
-            json.dump(resultado, f, indent=4, ensure_ascii=False)
+        # Publica resultado (gravado em disco pelo barramento)
+        arquivo_saida = artefatos.publicar("parser", resultado)
         
         print(f"[parser] ✅ Parse concluído")
         print(f"[parser] 📄 Título: {title}")
         print(f"[parser] 📝 Formulários encontrados: {len(formularios)}")
         print(f"[parser] 🔗 Links encontrados: {len(links)}")
         print(f"[parser] 📜 Scripts encontrados: {len(scripts)}")
+        if rastreamento is not None:
+            print(f"[parser] 🕸️ Rastreamento: {rastreamento['paginas']} páginas, {rastreamento['urls_com_parametros']} URLs com parâmetros "
+                  f"e {rastreamento['formularios']} formulários novos → {rastreamento['arquivo']}")
         print(f"[parser] 💾 Resultado salvo em: {arquivo_saida}")
         
         return resultado
@@ -0,0 +1,201 @@
+"""
+AEGIS Bug Hunter - Payload Ranker
+Priorização de payloads por amostragem de Thompson sobre o histórico de
+effective_payloads (usos e acertos de cada payload, por domínio)
+
+O histórico é lido uma única vez, ao compilar o plano do scan; ordenar e cortar
+payloads depois disso não toca o SQLite. Cada payload tem uma distribuição Beta
+para a taxa de acerto no domínio, com a taxa dos outros domínios como prior:
+payloads que já acertaram no domínio vêm primeiro e a amostragem ordena os
+demais. Sem histórico algum para o tipo, a ordem curada das listas é mantida. Tipos que
+nunca acertaram após `min_trials_to_trim` tentativas recebem só `trimmed_limit`
+payloads. O corte olha primeiro o contexto do parâmetro (payload_contexts: um tipo
+que acerta no parâmetro "file" não mantém a lista inteira no "id"); se o contexto
+(nome e valor) indica afinidade com o tipo, são necessárias FATOR_AFINIDADE vezes
+mais tentativas.
+"""
+
+import re
+import random
+import hashlib
+from urllib.parse import urlparse
+
+from .config_manager import get_config
+
+# Tipos de injeção que o contexto do parâmetro torna plausíveis: só são cortados
+# com FATOR_AFINIDADE vezes mais tentativas sem acerto
+FATOR_AFINIDADE = 3
+
+AFINIDADE_CONTEXTO = {
+    "arquivo": ("file_inclusion", "command_injection"),
+    "url": ("file_inclusion", "xss"),
+    "numerico": ("sql_injection", "nosql_injection"),
+    "texto": ("xss",),
+}
+
+CONTEXTOS = ("arquivo", "url", "numerico", "texto")
+
+NOMES_ARQUIVO = re.compile(r"file|path|page|doc|include|inc|template|tpl|dir|folder|load|read|view|lang", re.I)
+NOMES_URL = re.compile(r"url|uri|redirect|next|return|dest|link|callback|goto|continue", re.I)
+VALOR_ARQUIVO = re.compile(r"[/\\]|\.\w{2,4}$")
+
+def contexto_parametro(nome, valor=""):
+    """Contexto de um parâmetro pelo nome e pelo valor de exemplo: arquivo, url, numerico ou texto"""
+    valor = str(valor or "")
+    if NOMES_ARQUIVO.search(nome or "") or (VALOR_ARQUIVO.search(valor) and "://" not in valor):
+        return "arquivo"
+    if NOMES_URL.search(nome or "") or "://" in valor:
+        return "url"
+    if valor.lstrip("-").isdigit():
+        return "numerico"
+    return "texto"
+
+def contexto_parametros(pares):
+    """Contexto de vários (nome, valor) juntos, ex: "arquivo+numerico" (lotes de parâmetros e formulários)"""
+    contextos = {contexto_parametro(nome, valor) for nome, valor in pares}
+    return "+".join(contexto for contexto in CONTEXTOS if contexto in contextos) or "texto"
+
+def afinidades(contexto):
+    """Tipos de injeção plausíveis para o contexto (de um parâmetro ou de vários)"""
+    return {tipo for parte in (contexto or "").split("+") for tipo in AFINIDADE_CONTEXTO.get(parte, ())}
+
+def ler_historico(target_url):
+    """Histórico de payloads do alvo na memória, em listas (serializável com o tráfego gravado)"""
+    memoria = get_config().get_memory_config()
+    if not memoria["enabled"]:
+        return {"payloads": [], "contextos": []}
+    try:
+        from .memory_system import MemorySystem
+        memory = MemorySystem(memoria["database_path"], memoria["sqlite"])
+        return {
+            "payloads": [[*chave, *contagens] for chave, contagens in memory.historico_payloads(target_url).items()],
+            "contextos": [[*chave, *contagens] for chave, contagens in memory.historico_contextos(target_url).items()]
+        }
+    except Exception as e:
+        print(f"[payload_ranker] ⚠️ Histórico de payloads indisponível, usando a ordem padrão: {e}")
+        return {"payloads": [], "contextos": []}
+
+class RankeadorPayloads:
+    """
+    Ordena e corta payloads de um alvo. historico: {(tipo, payload): (usos_dominio,
+    sucessos_dominio, usos_total, sucessos_total)}, como em MemorySystem.historico_payloads;
+    contextos: {(tipo, contexto): (usos, sucessos)} no domínio (historico_contextos).
+    A amostragem usa uma semente derivada de domínio, tipo e contexto: o mesmo
+    histórico gera o mesmo plano (scans reproduzíveis a partir de uma gravação).
+    """
+
+    def __init__(self, dominio, historico=None, contextos=None, peso_prior=4, min_tentativas=6, limite_reduzido=1):
+        self.dominio = dominio
+        self._contextos = dict(contextos or {})
+        self.peso_prior = max(0.0, float(peso_prior))
+        self.min_tentativas = max(1, int(min_tentativas))
+        self.limite_reduzido = max(1, int(limite_reduzido))
+
+        # Contagens do domínio e dos demais domínios (prior), por payload e por tipo
+        self._dominio, self._outros = {}, {}
+        self._tipos_dominio, self._tipos_outros = {}, {}
+        for (tipo, payload), (usos, sucessos, usos_total, sucessos_total) in (historico or {}).items():
+            self._dominio[(tipo, payload)] = (usos, sucessos)
+            self._outros[(tipo, payload)] = (usos_total - usos, sucessos_total - sucessos)
+            for por_tipo, (u, s) in ((self._tipos_dominio, (usos, sucessos)),
+                                     (self._tipos_outros, (usos_total - usos, sucessos_total - sucessos))):
+                acumulado = por_tipo.get(tipo, (0, 0))
+                por_tipo[tipo] = (acumulado[0] + u, acumulado[1] + s)
+
+        self._ordens = {}
+        self._estatisticas = {"payloads_historico": len(self._dominio), "contextos_historico": len(self._contextos), "ordenados": 0,
+                              "tipos_reduzidos": 0, "payloads_cortados": 0}
+
+    @classmethod
+    def carregar(cls, target_url, cliente=None):
+        """
+        Rankeador do alvo com o histórico da memória (None se a priorização estiver desativada).
+        Com um cliente, a leitura é uma consulta do transporte: gravada com o tráfego
+        (--record) e reproduzida (--replay), para que o plano reproduzido seja o gravado.
+        """
+        ranking = get_config().get_fuzzing_config()["payload_ranking"]
+        if not ranking["enabled"]:
+            return None
+
+        dominio = urlparse(target_url).netloc
+        try:
+            dados = cliente.consultar(f"payload_ranker:{dominio}", lambda: ler_historico(target_url)) if cliente else ler_historico(target_url)
+        except LookupError:
+            # Gravação anterior à priorização: a ordem padrão é a que foi gravada
+            dados = {"payloads": [], "contextos": []}
+
+        historico = {(tipo, payload): tuple(contagens) for tipo, payload, *contagens in dados["payloads"]}
+        contextos = {(tipo, contexto): tuple(contagens) for tipo, contexto, *contagens in dados["contextos"]}
+        print(f"[payload_ranker] 🎯 Priorizando payloads com {len(historico)} registros de histórico")
+        return cls(dominio, historico, contextos, ranking["prior_weight"], ranking["min_trials_to_trim"], ranking["trimmed_limit"])
+
+    def posterior(self, tipo, payload):
+        """(alfa, beta) da taxa de acerto do payload no domínio"""
+        usos, sucessos = self._dominio.get((tipo, payload), (0, 0))
+        usos_outros, sucessos_outros = self._outros.get((tipo, payload), (0, 0))
+        if not usos_outros:
+            # Payload nunca usado em outro domínio: prior vem da taxa do tipo
+            usos_outros, sucessos_outros = self._tipos_outros.get(tipo, (0, 0))
+        media = (sucessos_outros + 1) / (usos_outros + 2)
+        return (1 + self.peso_prior * media + sucessos,
+                1 + self.peso_prior * (1 - media) + max(0, usos - sucessos))
+
+    def _media(self, tipo, payload):
+        alfa, beta = self.posterior(tipo, payload)
+        return alfa / (alfa + beta)
+
+    def ordenar(self, tipo, payloads, contexto=None):
+        """Payloads do tipo em ordem de prioridade (ordem original se não houver histórico do tipo)"""
+        payloads = list(payloads)
+        if not (self._tipos_dominio.get(tipo, (0, 0))[0] or self._tipos_outros.get(tipo, (0, 0))[0]):
+            return payloads
+
+        chave = (tipo, contexto, tuple(payloads))
+        ordem = self._ordens.get(chave)
+        if ordem is None:
+            semente = hashlib.sha256(f"{self.dominio}|{tipo}|{contexto}".encode("utf-8")).hexdigest()
+            rng = random.Random(semente)
+            amostras = {payload: rng.betavariate(*self.posterior(tipo, payload)) for payload in payloads}
+            # Quem já acertou no domínio vai à frente (pela média); a amostragem ordena o restante
+            acertos = sorted((payload for payload in payloads if self._dominio.get((tipo, payload), (0, 0))[1]),
+                             key=lambda payload: -self._media(tipo, payload))
+            ordem = acertos + sorted((payload for payload in payloads if payload not in acertos),
+                                     key=lambda payload: -amostras[payload])
+            self._ordens[chave] = ordem
+            self._estatisticas["ordenados"] += 1
+        return list(ordem)
+
+    def limite(self, tipo, limite, contexto=None):
+        """
+        Quantos payloads do tipo enviar: menos quando o histórico indica que o tipo não acerta
+        (no mesmo contexto de parâmetro; sem tentativas suficientes nele, no domínio; por fim, nos outros domínios)
+        """
+        minimo = self.min_tentativas * (FATOR_AFINIDADE if tipo in afinidades(contexto) else 1)
+        for usos, sucessos in (self._contextos.get((tipo, contexto), (0, 0)), self._tipos_dominio.get(tipo, (0, 0))):
+            if sucessos:
+                return limite
+            if usos >= minimo:
+                return min(limite, self.limite_reduzido)
+        usos, _ = self._tipos_dominio.get(tipo, (0, 0))
+        usos_outros, sucessos_outros = self._tipos_outros.get(tipo, (0, 0))
+        if not usos and not sucessos_outros and usos_outros >= minimo:
+            return min(limite, self.limite_reduzido)
+        return limite
+
+    def selecionar(self, tipo, payloads, limite, contexto=None):
+        """Os `limite` payloads mais promissores do tipo (ou menos, ver limite())"""
+        ordem = self.ordenar(tipo, payloads, contexto)
+        quantidade = self.limite(tipo, limite, contexto)
+        if quantidade < limite:
+            self._estatisticas["tipos_reduzidos"] += 1
+            self._estatisticas["payloads_cortados"] += min(limite, len(ordem)) - min(quantidade, len(ordem))
+        return ordem[:quantidade]
+
+    def estatisticas(self):
+        return dict(self._estatisticas)
+
+def selecionar_payloads(rankeador, tipo, payloads, limite, contexto=None):
+    """Primeiros `limite` payloads na ordem do rankeador (ou da lista, sem rankeador)"""
+    if rankeador is None:
+        return list(payloads)[:limite]
+    return rankeador.selecionar(tipo, payloads, limite, contexto)
@@ -0,0 +1,241 @@
+"""
+AEGIS Bug Hunter - Test Plan Compiler
+Compila os casos de teste em um plano de requisições deduplicado (uma resposta alimenta todos os detectores)
+"""
+
+import json
+from urllib.parse import urlparse, urlsplit, parse_qsl
+
+from .async_engine import CasoTeste
+
+# Tipos cujo payload não depende de maiúsculas/minúsculas (SQL ignora a caixa de palavras-chave).
+# Um caso só desses tipos pode ser atendido por uma requisição que difira apenas na caixa.
+TIPOS_SEM_CAIXA = {"sql_injection"}
+
+def _dobrar_valor(texto, payloads):
+    """O valor sem caixa se contiver um dos payloads (já sem caixa); senão, exato"""
+    dobrado = texto.casefold()
+    return dobrado if any(payload in dobrado for payload in payloads) else texto
+
+def _normalizar(valor, payloads=(), nomes_sem_caixa=False):
+    """
+    Estrutura hashable e independente de ordem para params/data/headers. Nomes só
+    perdem a caixa com nomes_sem_caixa (headers); valores, só os que levam um payload
+    """
+    if valor is None:
+        return None
+    if isinstance(valor, dict):
+        return tuple(sorted((str(k).lower() if nomes_sem_caixa else str(k), _normalizar(v, payloads))
+                            for k, v in valor.items()))
+    if isinstance(valor, (list, tuple)):
+        return tuple(_normalizar(v, payloads) for v in valor)
+    if isinstance(valor, bytes):
+        return valor
+    return _dobrar_valor(str(valor), payloads)
+
+class EspecRequisicao:
+    """
+    Uma requisição do plano e os detectores que analisam sua resposta.
+    Cada detector é o CasoTeste original, que mantém seu contexto e sua função de análise.
+    """
+
+    def __init__(self, method, url, params=None, data=None, headers=None, detectores=None, **kwargs):
+        self.method = method.upper()
+        self.url = url
+        self.params = params
+        self.data = data
+        self.headers = headers
+        self.detectores = list(detectores or [])
+        self.kwargs = kwargs
+
+    @classmethod
+    def de_caso(cls, caso):
+        kwargs = dict(caso.kwargs)
+        return cls(
+            caso.method, caso.url,
+            params=kwargs.pop("params", None),
+            data=kwargs.pop("data", None),
+            headers=kwargs.pop("headers", None),
+            detectores=[caso],
+            **kwargs
+        )
+
+    @property
+    def tipos(self):
+        return {d.contexto.get("tipo_injecao") for d in self.detectores}
+
+    @property
+    def aceita_caixa_diferente(self):
+        """True se todos os detectores testam tipos que ignoram a caixa do payload"""
+        return self.tipos <= TIPOS_SEM_CAIXA
+
+    def chave(self, dobrar_caixa=False):
+        """
+        Chave de deduplicação. Com dobrar_caixa, só os valores que levam o payload de
+        um detector perdem a caixa: caminho e nomes de parâmetros/campos ficam exatos
+        (/Item e /item, User e user são requisições diferentes)
+        """
+        payloads = ()
+        url = self.url
+        if dobrar_caixa:
+            payloads = {str(d.contexto["payload"]).casefold() for d in self.detectores if d.contexto.get("payload")}
+            partes = urlsplit(self.url)
+            query = tuple((nome, _dobrar_valor(valor, payloads)) for nome, valor in parse_qsl(partes.query, keep_blank_values=True))
+            url = (partes.scheme, partes.netloc, partes.path, query)
+        return (
+            self.method, url,
+            _normalizar(self.params, payloads),
+            _normalizar(self.data, payloads),
+            _normalizar(self.headers, payloads, nomes_sem_caixa=True)
+        )
+
+    def mesclar(self, outra):
+        self.detectores.extend(outra.detectores)
+
+    def absorver(self, outra):
+        """
+        Junta uma especificação que difere desta só na caixa. Os detectores dela passam a
+        descrever a requisição que será enviada (URL, params/data/headers e a grafia do
+        payload), para que os achados sejam reproduzíveis; o payload da lista fica em
+        contexto["payload_original"]
+        """
+        for detector in outra.detectores:
+            contexto = dict(detector.contexto)
+            payload = contexto.get("payload")
+            if isinstance(payload, str):
+                enviado = self._grafia_enviada(payload)
+                if enviado != payload:
+                    contexto["payload"] = enviado
+                    contexto.setdefault("payload_original", payload)
+            self.detectores.append(CasoTeste(self.method, self.url, detector.analisar, contexto=contexto, **self._kwargs_requisicao()))
+
+    def _grafia_enviada(self, payload):
+        """O payload com a caixa em que aparece nos valores desta requisição (ou como veio)"""
+        alvo = payload.casefold()
+        for valor in self._valores():
+            dobrado = valor.casefold()
+            posicao = dobrado.find(alvo)
+            if posicao >= 0 and len(dobrado) == len(valor):
+                return valor[posicao:posicao + len(payload)]
+        return payload
+
+    def _valores(self):
+        """Valores textuais enviados: query da URL, params, data e headers"""
+        for _, valor in parse_qsl(urlparse(self.url).query, keep_blank_values=True):
+            yield valor
+        for campo in (self.params, self.data, self.headers):
+            if isinstance(campo, dict):
+                for valor in campo.values():
+                    for item in (valor if isinstance(valor, (list, tuple)) else [valor]):
+                        if isinstance(item, str):
+                            yield item
+            elif isinstance(campo, str):
+                yield campo
+
+    def _kwargs_requisicao(self):
+        kwargs = dict(self.kwargs)
+        for campo in ("params", "data", "headers"):
+            if getattr(self, campo) is not None:
+                kwargs[campo] = getattr(self, campo)
+        return kwargs
+
+    def para_caso(self):
+        """
+        CasoTeste executável pelo motor: a resposta é entregue a cada detector de
+        contexto["detectores"] (a poda do motor pode remover alguns antes do envio)
+        """
+        return CasoTeste(self.method, self.url, self._analisar, contexto={"detectores": self.detectores}, **self._kwargs_requisicao())
+
+    def _analisar(self, caso, response):
+        resultados = []
+        for detector in caso.contexto.get("detectores", self.detectores):
+            try:
+                resultados.extend(detector.analisar(detector, response) or [])
+            except Exception:
+                continue
+        return resultados
+
+    def exportar(self):
+        detectores = []
+        for detector in self.detectores:
+            descricao = {"analisador": detector.analisar.__name__}
+            for campo in ("tipo_injecao", "payload", "parametro", "header"):
+                if campo in detector.contexto:
+                    descricao[campo] = detector.contexto[campo]
+            detectores.append(descricao)
+
+        return {
+            "method": self.method,
+            "url": self.url,
+            "params": self.params,
+            "data": self.data,
+            "headers": self.headers,
+            "detectores": detectores
+        }
+
+class PlanoTestes:
+    """Plano compilado: requisições únicas na ordem em que foram geradas"""
+
+    def __init__(self, casos):
+        self.total_casos = 0
+        self.requisicoes = []
+        self._compilar(casos)
+
+    def _compilar(self, casos):
+        # 1) Requisições idênticas viram uma só
+        por_chave = {}
+        for caso in casos:
+            self.total_casos += 1
+            espec = EspecRequisicao.de_caso(caso)
+            chave = espec.chave()
+            if chave in por_chave:
+                por_chave[chave].mesclar(espec)
+            else:
+                por_chave[chave] = espec
+
+        # 2) Especificações que só testam tipos sem caixa se juntam a uma que difira
+        #    apenas na caixa, preservando a grafia exata da que não aceita troca de caixa
+        especs = list(por_chave.values())
+        sem_troca = {}
+        for espec in especs:
+            if not espec.aceita_caixa_diferente:
+                sem_troca.setdefault(espec.chave(dobrar_caixa=True), espec)
+
+        com_troca = {}
+        absorvidas = set()
+        for espec in especs:
+            if not espec.aceita_caixa_diferente:
+                continue
+            chave = espec.chave(dobrar_caixa=True)
+            destino = sem_troca.get(chave) or com_troca.get(chave)
+            if destino is not None:
+                destino.absorver(espec)
+                absorvidas.add(id(espec))
+            else:
+                com_troca[chave] = espec
+
+        self.requisicoes = [e for e in especs if id(e) not in absorvidas]
+
+    @property
+    def requisicoes_economizadas(self):
+        return self.total_casos - len(self.requisicoes)
+
+    def casos(self):
+        """Casos executáveis pelo MotorAssincrono, um por requisição do plano"""
+        return [espec.para_caso() for espec in self.requisicoes]
+
+    def para_dict(self, target_url=None):
+        """Plano serializável (requisições planejadas; bisseções em lote não entram na conta)"""
+        return {
+            "target_url": target_url,
+            "total_casos": self.total_casos,
+            "total_requisicoes": len(self.requisicoes),
+            "requisicoes_economizadas": self.requisicoes_economizadas,
+            "requisicoes": [espec.exportar() for espec in self.requisicoes]
+        }
+
+    def exportar(self, arquivo, target_url=None):
+        """Salva o plano em JSON"""
+        with open(arquivo, "w", encoding="utf-8") as f:
+            json.dump(self.para_dict(target_url), f, indent=4, ensure_ascii=False, default=str)
+        return arquivo
@@ -0,0 +1,154 @@
+"""
+AEGIS Bug Hunter - Rate Controller
+Controle de taxa por host (token bucket com ajuste AIMD) usado por todas as requisições do scan
+"""
+
+import time
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from .agent_loop import detectar_bloqueio
+from .metrics import registrar
+
+def interpretar_retry_after(valor):
+    """Converte Retry-After (segundos ou data HTTP) em segundos de espera"""
+    if not valor:
+        return None
+    valor = str(valor).strip()
+    if valor.isdigit():
+        return float(valor)
+    try:
+        data = parsedate_to_datetime(valor)
+        if data.tzinfo is None:
+            data = data.replace(tzinfo=timezone.utc)
+        return max(0.0, (data - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+class _EstadoHost:
+    def __init__(self, taxa, rajada):
+        self.taxa = taxa
+        self.tokens = float(rajada)
+        self.ultimo = time.monotonic()
+        self.bloqueado_ate = 0.0
+        self.ultima_reducao = 0.0
+        self.lock = threading.Lock()
+        self.requisicoes = 0
+        self.bloqueios = 0
+        self.tempo_espera = 0.0
+
+class ControladorTaxa:
+    """
+    Um token bucket por host. A taxa sobe de forma aditiva enquanto as respostas
+    são saudáveis e cai de forma multiplicativa em 429/503 ou nos sinais de
+    bloqueio de agent_loop.detectar_bloqueio, respeitando Retry-After.
+    Com respeitar_limites=False (security.rate_limiting_respect) os sinais de
+    bloqueio não reduzem a taxa nem pausam o host.
+    """
+
+    def __init__(self, taxa_inicial=1.0, taxa_min=0.2, taxa_max=20.0, incremento=0.5,
+                 fator_reducao=0.5, rajada=2, respeitar_limites=True):
+        self.taxa_inicial = taxa_inicial
+        self.taxa_min = taxa_min
+        self.taxa_max = max(taxa_min, taxa_max)
+        self.incremento = incremento
+        self.fator_reducao = fator_reducao
+        self.rajada = max(1, rajada)
+        self.respeitar_limites = respeitar_limites
+
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def de_config(cls, config):
+        """Cria o controlador a partir do ConfigManager"""
+        rc = config.get_rate_control_config()
+        return cls(
+            taxa_inicial=rc["initial_rps"],
+            taxa_min=rc["min_rps"],
+            taxa_max=rc["max_rps"],
+            incremento=rc["additive_increase"],
+            fator_reducao=rc["multiplicative_decrease"],
+            rajada=rc["burst"],
+            respeitar_limites=config.get("security.rate_limiting_respect", True),
+        )
+
+    def _estado(self, host):
+        with self._lock:
+            estado = self._hosts.get(host)
+            if estado is None:
+                estado = _EstadoHost(self.taxa_inicial, self.rajada)
+                self._hosts[host] = estado
+            return estado
+
+    def aguardar(self, host):
+        """Reserva um token do host, dormindo o necessário. Retorna o tempo dormido"""
+        estado = self._estado(host)
+
+        with estado.lock:
+            agora = time.monotonic()
+            estado.tokens = min(self.rajada, estado.tokens + (agora - estado.ultimo) * estado.taxa)
+            estado.ultimo = agora
+            estado.tokens -= 1
+            espera = max(0.0, -estado.tokens / estado.taxa)
+            espera = max(espera, estado.bloqueado_ate - agora)
+            estado.requisicoes += 1
+            estado.tempo_espera += espera
+
+        if espera > 0:
+            time.sleep(espera)
+            registrar(espera=espera)
+        return espera
+
+    def registrar_resposta(self, host, status_code, headers=None, texto=""):
+        """Ajusta a taxa do host de acordo com a resposta recebida"""
+        headers = headers or {}
+        if status_code in (429, 503) or detectar_bloqueio(status_code, texto if status_code >= 400 else ""):
+            self._reduzir(host, interpretar_retry_after(headers.get("Retry-After")))
+        else:
+            self._aumentar(host)
+
+    def registrar_falha(self, host):
+        """Timeout/erro de conexão também indica sobrecarga do host"""
+        self._reduzir(host, None)
+
+    def _aumentar(self, host):
+        estado = self._estado(host)
+        with estado.lock:
+            # +incremento req/s por segundo de tráfego saudável
+            estado.taxa = min(self.taxa_max, estado.taxa + self.incremento / estado.taxa)
+
+    def _reduzir(self, host, retry_after):
+        estado = self._estado(host)
+        with estado.lock:
+            estado.bloqueios += 1
+            if not self.respeitar_limites:
+                return
+
+            agora = time.monotonic()
+            # Uma redução por janela: respostas de requisições já em voo não derrubam a taxa de novo
+            if agora - estado.ultima_reducao >= 1.0 / estado.taxa:
+                estado.taxa = max(self.taxa_min, estado.taxa * self.fator_reducao)
+                estado.ultima_reducao = agora
+                estado.tokens = min(estado.tokens, 0.0)
+
+            if retry_after:
+                estado.bloqueado_ate = max(estado.bloqueado_ate, agora + retry_after)
+
+    def estado(self, host):
+        """Situação atual do host"""
+        estado = self._estado(host)
+        with estado.lock:
+            return {
+                "taxa": round(estado.taxa, 3),
+                "requisicoes": estado.requisicoes,
+                "bloqueios": estado.bloqueios,
+                "tempo_espera": round(estado.tempo_espera, 3),
+                "pausado_por": round(max(0.0, estado.bloqueado_ate - time.monotonic()), 3)
+            }
+
+    def estatisticas(self):
+        with self._lock:
+            hosts = list(self._hosts)
+        return {host: self.estado(host) for host in hosts}
@@ -3,33 +3,26 @@ AEGIS Bug Hunter - Report Generator
 Módulo responsável pela geração de relatórios técnicos
 """
 
-import os
 import json
 from datetime import datetime
 import hashlib
 
-def carregar_dados_modulos(site_name):
+from .artifact_bus import barramento_local
+
+# Artefatos consumidos/produzidos (usados pelo agendador do pipeline)
+CONSOME = ("pre_recon", "headers_analysis", "parser", "injects")
+PRODUZ = ("relatorio_final",)
+
+def carregar_dados_modulos(artefatos):
     """Carrega dados de todos os módulos executados"""
-    output_dir = f"output/{site_name}"
     dados = {}
     
-    arquivos_modulos = {
-        "pre_recon": "pre_recon.json",
-        "headers_analysis": "headers_analysis.json", 
-        "parser": "parser.json",
-        "injects": "injects.json"
-    }
-    
-    for modulo, arquivo in arquivos_modulos.items():
-        caminho_arquivo = f"{output_dir}/{arquivo}"
-        if os.path.exists(caminho_arquivo):
-            try:
-                with open(caminho_arquivo, 'r', encoding='utf-8') as f:
-                    dados[modulo] = json.load(f)
-            except Exception as e:
-                dados[modulo] = {"erro": f"Erro ao carregar {arquivo}: {str(e)}"}
+    for modulo in CONSOME:
+        publicado = artefatos.obter(modulo)
+        if publicado is not None:
+            dados[modulo] = publicado
         else:
-            dados[modulo] = {"erro": f"Arquivo {arquivo} não encontrado"}
+            dados[modulo] = {"erro": f"Artefato {modulo} não encontrado"}
     
     return dados
 
@@ -269,30 +262,24 @@ def gerar_relatorio_markdown(relatorio):
     
     return md_content
 
-def executar(target_url):
+def executar(target_url, *, artefatos=None):
     """Executa geração completa do relatório"""
     print(f"[report_gen] 📊 Gerando relatório técnico para: {target_url}")
+    artefatos = artefatos or barramento_local(target_url)
     
     try:
-        site_name = target_url.replace("https://", "").replace("http://", "").replace("/", "_")
-        output_dir = f"output/{site_name}"
-        
         # Carrega dados dos módulos
-        dados = carregar_dados_modulos(site_name)
+        dados = carregar_dados_modulos(artefatos)
         
         # Gera relatório JSON
         relatorio = gerar_relatorio_json(dados, target_url)
         
-        # Salva relatório JSON
-        arquivo_json = f"{output_dir}/relatorio_final.json"
-        with open(arquivo_json, "w", encoding="utf-8") as f:
-            json.dump(relatorio, f, indent=4, ensure_ascii=False)
+        # Publica relatório JSON
+        arquivo_json = artefatos.publicar("relatorio_final", relatorio)
         
         # Gera e salva relatório Markdown
         relatorio_md = gerar_relatorio_markdown(relatorio)
-        arquivo_md = f"{output_dir}/relatorio_final.md"
-        with open(arquivo_md, "w", encoding="utf-8") as f:
-            f.write(relatorio_md)
+        arquivo_md = artefatos.salvar_texto("relatorio_final.md", relatorio_md)
         
         # Estatísticas do relatório
         resumo = relatorio["resumo_executivo"]
@@ -5,13 +5,14 @@ Módulo responsável por envio e exportação de relatórios
 
 import os
 import json
-import smtplib
 import zipfile
 from datetime import datetime
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
+
+from .artifact_bus import barramento_local
+
+# Artefatos consumidos/produzidos (usados pelo agendador do pipeline)
+CONSOME = ("relatorio_final", "memory_analysis", "ai_interpretation", "status_analise", "fuzzer_results")
+PRODUZ = ("reporter_log",)
 
 def criar_pacote_relatorio(target_url, output_dir):
     """Cria pacote ZIP com todos os arquivos do relatório"""
@@ -86,6 +87,13 @@ def enviar_email_relatorio(destinatario, relatorio_data, caminho_zip=None, confi
         print(f"[reporter] ⚠️ Configuração de email não fornecida")
         return False
     
+    # Dependências de email só são carregadas quando há envio
+    import smtplib
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+    from email.mime.base import MIMEBase
+    from email import encoders
+    
     try:
         # Configura email
         msg = MIMEMultipart()
@@ -241,23 +249,20 @@ def carregar_configuracao_reporter():
         }
     }
 
-def executar(target_url):
+def executar(target_url, *, artefatos=None):
     """Executa envio/exportação do relatório final"""
     print(f"[reporter] 📤 Enviando relatório final sobre: {target_url}")
+    artefatos = artefatos or barramento_local(target_url)
     
     try:
-        site_name = target_url.replace("https://", "").replace("http://", "").replace("/", "_")
-        output_dir = f"output/{site_name}"
+        output_dir = artefatos.output_dir
         
         # Carrega relatório final
-        arquivo_relatorio = f"{output_dir}/relatorio_final.json"
-        if not os.path.exists(arquivo_relatorio):
-            print(f"[reporter] ❌ Relatório final não encontrado: {arquivo_relatorio}")
+        relatorio_data = artefatos.obter("relatorio_final")
+        if relatorio_data is None:
+            print(f"[reporter] ❌ Relatório final não encontrado: {artefatos.caminho('relatorio_final')}")
             return {"erro": "Relatório final não encontrado"}
         
-        with open(arquivo_relatorio, 'r', encoding='utf-8') as f:
-            relatorio_data = json.load(f)
-        
         # Carrega configuração
         config = carregar_configuracao_reporter()
         
@@ -270,6 +275,8 @@ def executar(target_url):
         
         # Cria pacote ZIP
         if config.get("formatos", {}).get("zip", True):
+            # O pacote lê o diretório: espera as gravações pendentes dos artefatos
+            artefatos.flush()
             caminho_zip = criar_pacote_relatorio(target_url, output_dir)
             if caminho_zip:
                 resultados["acoes_executadas"].append(f"Pacote ZIP criado: {os.path.basename(caminho_zip)}")
@@ -309,9 +316,7 @@ def executar(target_url):
                     resultados["erros"].append(f"Falha ao enviar webhook: {url}")
         
         # Salva log de ações
-        log_file = f"{output_dir}/reporter_log.json"
-        with open(log_file, 'w', encoding='utf-8') as f:
-            json.dump(resultados, f, indent=4, ensure_ascii=False)
+        artefatos.publicar("reporter_log", resultados)
         
         print(f"[reporter] ✅ Relatório processado")
         print(f"[reporter] 📋 Ações executadas: {len(resultados['acoes_executadas'])}")
@@ -0,0 +1,138 @@
+"""
+AEGIS Bug Hunter - Response Cache
+Cache de respostas HTTP por scan (TTL + LRU limitado por tamanho), com busca única por chave
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+# Só respostas definitivas vão para o cache: sucesso, redirecionamento e "não existe".
+# Erros passageiros (408, 425, 429, 5xx) voltam à rede na próxima chamada, e o
+# controle de taxa do cliente vê cada um deles
+STATUS_ARMAZENAVEIS_EXTRAS = (404, 410)
+
+def armazenavel(resposta):
+    """True se a resposta pode ser reaproveitada por outras chamadas do scan"""
+    status = resposta.status_code
+    return 200 <= status < 400 or status in STATUS_ARMAZENAVEIS_EXTRAS
+
+def _normalizar(valor):
+    """Converte params/headers em uma estrutura hashable e independente de ordem"""
+    if valor is None:
+        return None
+    if isinstance(valor, dict):
+        return tuple(sorted((str(k).lower(), _normalizar(v)) for k, v in valor.items()))
+    if isinstance(valor, (list, tuple)):
+        return tuple(_normalizar(v) for v in valor)
+    if isinstance(valor, bytes):
+        return valor
+    return str(valor)
+
+class _EmAndamento:
+    """Busca em andamento: requisições concorrentes da mesma chave aguardam a primeira"""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resposta = None
+        self.erro = None
+
+class CacheRespostas:
+    def __init__(self, ttl=300, max_entradas=256, max_bytes=32 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+
+        self._entradas = OrderedDict()  # chave -> (expira_em, tamanho, resposta)
+        self._em_andamento = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def chave(method, url, params=None, headers=None, allow_redirects=True):
+        """Chave da requisição: método, URL, parâmetros e headers explícitos da chamada"""
+        return (method.upper(), url, _normalizar(params), _normalizar(headers), bool(allow_redirects))
+
+    def obter_ou_buscar(self, chave, buscar):
+        """
+        Retorna a resposta em cache ou executa buscar() uma única vez para a chave.
+        Chamadas concorrentes da mesma chave recebem a mesma resposta, mesmo que ela
+        não seja armazenada (ver armazenavel)
+        """
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada and entrada[0] > time.monotonic():
+                self._entradas.move_to_end(chave)
+                self.hits += 1
+                return entrada[2]
+            if entrada:
+                self._remover(chave)
+
+            andamento = self._em_andamento.get(chave)
+            dono = andamento is None
+            if dono:
+                andamento = _EmAndamento()
+                self._em_andamento[chave] = andamento
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not dono:
+            andamento.evento.wait()
+            if andamento.erro is not None:
+                raise andamento.erro
+            return andamento.resposta
+
+        try:
+            resposta = buscar()
+            resposta.content  # garante o corpo lido antes de compartilhar a resposta
+        except Exception as e:
+            andamento.erro = e
+            with self._lock:
+                self._em_andamento.pop(chave, None)
+            andamento.evento.set()
+            raise
+
+        andamento.resposta = resposta
+        with self._lock:
+            self._em_andamento.pop(chave, None)
+            self._armazenar(chave, resposta)
+        andamento.evento.set()
+        return resposta
+
+    def _armazenar(self, chave, resposta):
+        tamanho = len(resposta.content or b"")
+        if tamanho > self.max_bytes or not armazenavel(resposta):
+            return
+
+        self._entradas[chave] = (time.monotonic() + self.ttl, tamanho, resposta)
+        self._bytes += tamanho
+
+        # Eviction LRU por número de entradas e por bytes
+        while len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes:
+            self._remover(next(iter(self._entradas)))
+
+    def _remover(self, chave):
+        _, tamanho, _ = self._entradas.pop(chave)
+        self._bytes -= tamanho
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estatisticas(self):
+        """Contadores do cache (cada hit é uma requisição economizada)"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "requisicoes_economizadas": self.hits,
+                "taxa_acerto": round(self.hits / total, 3) if total else 0.0,
+                "entradas": len(self._entradas),
+                "bytes": self._bytes
+            }
@@ -0,0 +1,179 @@
+"""
+AEGIS Bug Hunter - Pipeline Scheduler
+Módulo responsável por agendar os módulos do pipeline respeitando suas dependências
+"""
+
+import ast
+import sys
+import time
+import importlib
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+def ler_declaracoes(caminho_modulo):
+    """Lê CONSOME/PRODUZ do código-fonte do módulo sem importá-lo"""
+    spec = importlib.util.find_spec(caminho_modulo)
+    if spec is None or not spec.origin:
+        raise ImportError(f"Módulo '{caminho_modulo}' não encontrado")
+
+    with open(spec.origin, 'r', encoding='utf-8') as f:
+        arvore = ast.parse(f.read(), filename=spec.origin)
+
+    declaracoes = {"CONSOME": (), "PRODUZ": ()}
+    for no in arvore.body:
+        if isinstance(no, ast.Assign):
+            for alvo in no.targets:
+                if isinstance(alvo, ast.Name) and alvo.id in declaracoes:
+                    declaracoes[alvo.id] = tuple(ast.literal_eval(no.value))
+    return declaracoes["CONSOME"], declaracoes["PRODUZ"]
+
+
+class Etapa:
+    """Módulo do pipeline com os artefatos que consome e produz"""
+
+    def __init__(self, nome, funcao, consome=(), produz=(), caminho_modulo=None):
+        self.nome = nome
+        self.funcao = funcao
+        self.consome = tuple(consome)
+        self.produz = tuple(produz)
+        self.caminho_modulo = caminho_modulo
+
+    @classmethod
+    def de_modulo(cls, nome, caminho_modulo):
+        """
+        Cria etapa a partir do nome importável (ex: 'aegis.parser').
+        O módulo (e suas dependências pesadas) só é importado quando a etapa é resolvida.
+        """
+        consome, produz = ler_declaracoes(caminho_modulo)
+        return cls(nome, None, consome=consome, produz=produz, caminho_modulo=caminho_modulo)
+
+    def resolver(self):
+        """Retorna a função executar da etapa, importando o módulo na primeira vez"""
+        if self.funcao is None:
+            self.funcao = importlib.import_module(self.caminho_modulo).executar
+        return self.funcao
+
+    @classmethod
+    def de_funcao(cls, nome, funcao):
+        """Cria etapa lendo CONSOME/PRODUZ declarados no módulo da função"""
+        modulo = sys.modules.get(getattr(funcao, "__module__", ""), None)
+        return cls(
+            nome,
+            funcao,
+            consome=getattr(modulo, "CONSOME", ()),
+            produz=getattr(modulo, "PRODUZ", ()),
+        )
+
+
+class PipelineScheduler:
+    def __init__(self, etapas, max_workers=5):
+        self.etapas = list(etapas)
+        self.max_workers = max(1, int(max_workers))
+        self.dependencias = self._montar_dependencias()
+        self.ordem = self._ordem_topologica()
+
+    def _montar_dependencias(self):
+        """Monta o DAG: etapa -> etapas que produzem os artefatos que ela consome"""
+        produtores = {}
+        for etapa in self.etapas:
+            for artefato in etapa.produz:
+                if artefato in produtores:
+                    raise ValueError(
+                        f"Artefato '{artefato}' produzido por '{produtores[artefato]}' e '{etapa.nome}'"
+                    )
+                produtores[artefato] = etapa.nome
+
+        dependencias = {}
+        for etapa in self.etapas:
+            deps = set()
+            for artefato in etapa.consome:
+                if artefato not in produtores:
+                    raise ValueError(
+                        f"Artefato '{artefato}' consumido por '{etapa.nome}' não é produzido por nenhum módulo"
+                    )
+                deps.add(produtores[artefato])
+            deps.discard(etapa.nome)
+            dependencias[etapa.nome] = deps
+
+        return dependencias
+
+    def _ordem_topologica(self):
+        """Ordena as etapas preservando a ordem declarada entre etapas independentes"""
+        ordem = []
+        restantes = [etapa.nome for etapa in self.etapas]
+
+        while restantes:
+            prontas = [nome for nome in restantes if self.dependencias[nome] <= set(ordem)]
+            if not prontas:
+                raise ValueError(f"Dependência circular entre módulos: {', '.join(restantes)}")
+            ordem.extend(prontas)
+            restantes = [nome for nome in restantes if nome not in prontas]
+
+        return ordem
+
+    def _rodar(self, executor_etapa, etapa, inicio_pipeline):
+        """Executa uma etapa registrando tempos e falhas"""
+        inicio = time.perf_counter()
+        registro = {
+            "nome": etapa.nome,
+            "sucesso": True,
+            "erro": None,
+            "resultado": None,
+        }
+
+        try:
+            registro["resultado"] = executor_etapa(etapa)
+        except Exception as e:
+            registro["sucesso"] = False
+            registro["erro"] = str(e)
+
+        fim = time.perf_counter()
+        registro["inicio"] = inicio - inicio_pipeline
+        registro["fim"] = fim - inicio_pipeline
+        registro["duracao"] = fim - inicio
+        return registro
+
+    def executar(self, executor_etapa):
+        """
+        Executa o pipeline em um pool limitado de workers.
+        Cada etapa inicia assim que todas as etapas das quais depende terminam;
+        falhas não interrompem as dependentes (mesmo comportamento do fluxo sequencial).
+        Retorna os registros de execução na ordem topológica.
+        """
+        por_nome = {etapa.nome: etapa for etapa in self.etapas}
+        pendentes = {nome: set(self.dependencias[nome]) for nome in self.ordem}
+        registros = {}
+        em_execucao = {}
+        inicio_pipeline = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="aegis-etapa") as pool:
+            while pendentes or em_execucao:
+                prontas = [nome for nome in self.ordem if nome in pendentes and not pendentes[nome]]
+                for nome in prontas:
+                    del pendentes[nome]
+                    future = pool.submit(self._rodar, executor_etapa, por_nome[nome], inicio_pipeline)
+                    em_execucao[future] = nome
+
+                concluidas, _ = wait(list(em_execucao), return_when=FIRST_COMPLETED)
+                for future in concluidas:
+                    nome = em_execucao.pop(future)
+                    registros[nome] = future.result()
+                    for deps in pendentes.values():
+                        deps.discard(nome)
+
+        return [registros[nome] for nome in self.ordem]
+
+    def caminho_critico(self, registros):
+        """Retorna (etapas, duração) do caminho mais longo do DAG pelas durações medidas"""
+        duracoes = {r["nome"]: r["duracao"] for r in registros}
+        melhor = {}
+
+        for nome in self.ordem:
+            anterior = max(self.dependencias[nome], key=lambda dep: melhor[dep][1], default=None)
+            caminho, total = melhor[anterior] if anterior else ([], 0.0)
+            melhor[nome] = (caminho + [nome], total + duracoes.get(nome, 0.0))
+
+        if not melhor:
+            return [], 0.0
+        return max(melhor.values(), key=lambda item: item[1])
@@ -0,0 +1,89 @@
+"""
+AEGIS Bug Hunter - Startup Profiler
+Relatório de tempo de importação (saída de -X importtime) com orçamento para a inicialização do run.py
+"""
+
+import os
+import re
+import sys
+import subprocess
+
+ORCAMENTO_INICIALIZACAO_MS = 100.0
+
+_LINHA_IMPORTTIME = re.compile(r"^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)")
+
+def medir_importacao(modulo, cwd=None):
+    """
+    Importa `modulo` em um interpretador novo com -X importtime e retorna as
+    entradas {modulo, proprio_ms, acumulado_ms, profundidade} na ordem da saída
+    """
+    cwd = cwd or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        capture_output=True, text=True, cwd=cwd
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(f"Falha ao importar '{modulo}': {processo.stderr.strip().splitlines()[-1:]}")
+
+    entradas = []
+    for linha in processo.stderr.splitlines():
+        m = _LINHA_IMPORTTIME.match(linha)
+        if not m:
+            continue
+        entradas.append({
+            "modulo": m.group(4),
+            "proprio_ms": int(m.group(1)) / 1000,
+            "acumulado_ms": int(m.group(2)) / 1000,
+            "profundidade": (len(m.group(3)) - 1) // 2
+        })
+    return entradas
+
+def subarvore(entradas, modulo):
+    """
+    Entradas da importação de nível superior do módulo (a saída do importtime é
+    pós-ordem: os filhos aparecem antes do módulo). Exclui a inicialização do interpretador.
+    """
+    fim = None
+    for i in range(len(entradas) - 1, -1, -1):
+        if entradas[i]["modulo"] == modulo and entradas[i]["profundidade"] == 0:
+            fim = i
+            break
+    if fim is None:
+        return []
+
+    inicio = fim
+    while inicio > 0 and entradas[inicio - 1]["profundidade"] > 0:
+        inicio -= 1
+    return entradas[inicio:fim + 1]
+
+def custo_total(entradas, modulo):
+    """Tempo acumulado da importação de nível superior do módulo"""
+    arvore = subarvore(entradas, modulo)
+    return arvore[-1]["acumulado_ms"] if arvore else 0.0
+
+def relatorio_inicializacao(modulos_pipeline, orcamento_ms=ORCAMENTO_INICIALIZACAO_MS, top=10):
+    """
+    Imprime o custo de importação do run.py contra o orçamento e o custo que cada
+    módulo do pipeline adiciona quando é resolvido. Retorna True se couber no orçamento.
+    """
+    print(f"[startup_profiler] ⏱️ Medindo importação do run.py (orçamento: {orcamento_ms:.0f}ms)")
+    entradas = subarvore(medir_importacao("run"), "run")
+    total = entradas[-1]["acumulado_ms"] if entradas else 0.0
+
+    print(f"\n📦 Maiores importações na inicialização (acumulado):")
+    maiores = sorted((e for e in entradas if e["profundidade"] <= 2), key=lambda e: e["acumulado_ms"], reverse=True)
+    for entrada in maiores[:top]:
+        print(f"  {entrada['acumulado_ms']:8.1f}ms  {'  ' * entrada['profundidade']}{entrada['modulo']}")
+
+    print(f"\n🧩 Custo de cada módulo do pipeline (importado só quando executa):")
+    for modulo in modulos_pipeline:
+        try:
+            custo = custo_total(medir_importacao(modulo), modulo)
+            print(f"  {custo:8.1f}ms  {modulo}")
+        except RuntimeError as e:
+            print(f"  {'erro':>8}    {modulo}: {e}")
+
+    dentro = total <= orcamento_ms
+    status = "✅ dentro do" if dentro else "❌ acima do"
+    print(f"\n{status} orçamento: run.py importa em {total:.1f}ms (orçamento {orcamento_ms:.0f}ms)")
+    return dentro
@@ -0,0 +1,128 @@
+"""
+AEGIS Bug Hunter - Trace Query
+Consulta o rastreamento HTTP (logs/http_trace.jsonl e os dos workers do modo lote): percentis de cada fase por host ou por módulo
+
+Uso: python -m aegis.trace_query [ARQUIVO] [--por host|modulo] [--host H] [--modulo M] [--ultimos-min N]
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+
+from .http_trace import fases
+
+FASES = ("dns", "conexao", "tls", "espera_servidor", "download", "total")
+PERCENTIS = (50, 90, 99)
+
+def arquivos_rotacionados(arquivo):
+    """Arquivo atual e backups (.1, .2, ...), do mais antigo para o mais novo"""
+    backups = [c for c in glob.glob(f"{glob.escape(arquivo)}.*") if c.rsplit(".", 1)[-1].isdigit()]
+    backups.sort(key=lambda c: int(c.rsplit(".", 1)[-1]), reverse=True)
+    return [caminho for caminho in backups + [arquivo] if os.path.exists(caminho)]
+
+def arquivos_processos(arquivo):
+    """Arquivo configurado e os dos workers do modo lote (<nome>.<pid>.jsonl), com seus backups"""
+    raiz, extensao = os.path.splitext(arquivo)
+    workers = sorted(c for c in glob.glob(f"{glob.escape(raiz)}.*{glob.escape(extensao)}")
+                     if c[len(raiz) + 1:len(c) - len(extensao)].isdigit())
+    return [caminho for base in [arquivo] + workers for caminho in arquivos_rotacionados(base)]
+
+def ler_registros(arquivo, host=None, modulo=None, desde=None):
+    """Registros do arquivo, dos arquivos dos workers e de seus backups que passam pelos filtros"""
+    for caminho in arquivos_processos(arquivo):
+        with open(caminho, "r", encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    registro = json.loads(linha)
+                except ValueError:
+                    continue
+                if host and registro.get("host") != host:
+                    continue
+                if modulo and registro.get("modulo") != modulo:
+                    continue
+                if desde and registro.get("ts", 0) < desde:
+                    continue
+                yield registro
+
+def percentil(valores_ordenados, p):
+    """Percentil pelo posto mais próximo"""
+    if not valores_ordenados:
+        return None
+    posto = max(1, -(-p * len(valores_ordenados) // 100))
+    return valores_ordenados[posto - 1]
+
+def agregar(registros, por="host"):
+    """Por grupo: total de requisições, erros, conexões novas e percentis de cada fase"""
+    grupos = {}
+    for registro in registros:
+        chave = registro.get(por) or "-"
+        grupo = grupos.setdefault(chave, {"requisicoes": 0, "erros": 0, "novas_conexoes": 0, "fases": {f: [] for f in FASES}})
+        grupo["requisicoes"] += 1
+        if registro.get("erro"):
+            grupo["erros"] += 1
+            continue
+        if registro.get("nova_conexao"):
+            grupo["novas_conexoes"] += 1
+        for fase, duracao in fases(registro).items():
+            grupo["fases"][fase].append(duracao)
+
+    resumo = {}
+    for chave, grupo in grupos.items():
+        resumo[chave] = {
+            "requisicoes": grupo["requisicoes"],
+            "erros": grupo["erros"],
+            "novas_conexoes": grupo["novas_conexoes"],
+            "fases": {
+                fase: {f"p{p}": percentil(sorted(valores), p) for p in PERCENTIS}
+                for fase, valores in grupo["fases"].items() if valores
+            }
+        }
+    return resumo
+
+def formatar(resumo, por="host"):
+    """Tabela de texto: uma linha por grupo e fase"""
+    cabecalho = f"{por.upper():<28} {'FASE':<16} " + " ".join(f"{'p' + str(p) + ' ms':>10}" for p in PERCENTIS)
+    linhas = [cabecalho, "-" * len(cabecalho)]
+    for chave in sorted(resumo, key=lambda c: -resumo[c]["requisicoes"]):
+        grupo = resumo[chave]
+        pool = grupo["requisicoes"] - grupo["novas_conexoes"] - grupo["erros"]
+        linhas.append(f"{chave[:28]:<28} {grupo['requisicoes']} requisições, {grupo['novas_conexoes']} conexões novas, "
+                      f"{pool} pelo pool, {grupo['erros']} erros")
+        for fase in FASES:
+            if fase not in grupo["fases"]:
+                continue
+            valores = " ".join(f"{grupo['fases'][fase][f'p{p}']:>10.1f}" for p in PERCENTIS)
+            linhas.append(f"{'':<28} {fase:<16} {valores}")
+    return "\n".join(linhas)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Percentis das fases das requisições rastreadas")
+    parser.add_argument("arquivo", nargs="?", help="arquivo de rastreamento (padrão: o da configuração)")
+    parser.add_argument("--por", choices=("host", "modulo"), default="host")
+    parser.add_argument("--host", help="filtra por host (ex: exemplo.com:443)")
+    parser.add_argument("--modulo", help="filtra por módulo (ex: inject_finder)")
+    parser.add_argument("--ultimos-min", type=float, help="só registros dos últimos N minutos")
+    parser.add_argument("--json", action="store_true", help="saída em JSON")
+    args = parser.parse_args(argv)
+
+    arquivo = args.arquivo
+    if not arquivo:
+        from .config_manager import get_config
+        arquivo = get_config().get_http_trace_config()["file"]
+    if not arquivos_processos(arquivo):
+        print(f"[trace_query] ❌ Nenhum rastreamento encontrado em {arquivo}")
+        return 1
+
+    desde = time.time() - args.ultimos_min * 60 if args.ultimos_min else None
+    resumo = agregar(ler_registros(arquivo, args.host, args.modulo, desde), args.por)
+    if args.json:
+        print(json.dumps(resumo, indent=4, ensure_ascii=False))
+    else:
+        print(formatar(resumo, args.por))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
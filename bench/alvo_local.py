@@ -0,0 +1,270 @@
+"""
+AEGIS Bug Hunter - Alvo Local
+Aplicação vulnerável de referência (só biblioteca padrão) para benchmarks e testes de ponta a ponta
+
+Expõe, de forma determinística, o que os módulos procuram: parâmetros refletidos (XSS),
+mensagens de erro de SQL, inclusão de arquivos, header refletido, formulários, headers
+de WAF falsos (cf-ray, x-sucuri-id), marcadores de CAPTCHA, token CSRF, HTTP 429 para
+rajadas repetidas e uma página de pedidos só alcançável pelo rastreamento. O gabarito
+(GABARITO) lista o que um scan completo deveria encontrar.
+
+Uso: python bench/alvo_local.py [--porta 8765] [--latencia-ms 0]
+     (GET /__aegis/gabarito e /__aegis/estatisticas para consulta)
+"""
+
+import sys
+import json
+import time
+import threading
+import argparse
+from collections import Counter, deque
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+# O que um scan completo deveria encontrar (chaves comparadas pelo benchmark)
+GABARITO = {
+    "vulnerabilidades": [
+        {"local": "parametro_url", "alvo": "id", "tipo": "sql_injection"},
+        {"local": "parametro_url", "alvo": "q", "tipo": "xss"},
+        {"local": "parametro_url", "alvo": "file", "tipo": "file_inclusion"},
+        {"local": "header", "alvo": "Referer", "tipo": "header_injection"},
+        {"local": "formulario", "alvo": "/busca", "tipo": "xss"},
+        {"local": "formulario", "alvo": "/login", "tipo": "sql_injection"},
+        # Só alcançável pelo rastreamento: / → /pedidos → /pedido?codigo=10
+        {"local": "parametro_url", "alvo": "codigo", "tipo": "sql_injection"}
+    ],
+    "defesas": ["Cloudflare", "Sucuri", "Rate Limiting", "CAPTCHA", "CSRF Protection"]
+}
+
+# Query string da URL de entrada do scan (parâmetros do gabarito)
+QUERY_ENTRADA = "id=1&q=teste&file=inicio"
+
+ERRO_SQL = ("You have an error in your SQL syntax; check the manual that corresponds to "
+            "your MySQL server version for the right syntax to use near '{valor}' at line 1")
+
+PASSWD = (
+    "root:x:0:0:root:/root:/bin/bash\n"
+    "daemon:x:1:1:daemon:/usr/sbin:/usr/sbin/nologin\n"
+    "www-data:x:33:33:www-data:/var/www:/usr/sbin/nologin\n"
+)
+
+PAGINA = """<!DOCTYPE html>
+<html>
+<head>
+<title>Loja Exemplo</title>
+<script src="https://www.google.com/recaptcha/api.js" async defer></script>
+</head>
+<body>
+<h1>Loja Exemplo</h1>
+<p>Resultado para: {busca}</p>
+<p>Você veio de: {referer}</p>
+{conteudo}
+<nav>
+<a href="/produtos?id=2">Produtos</a>
+<a href="/sobre">Sobre</a>
+<a href="/login">Entrar</a>
+<a href="/pedidos">Meus pedidos</a>
+</nav>
+<form action="/busca" method="GET">
+<input type="text" name="termo">
+<button type="submit">Buscar</button>
+</form>
+<form action="/login" method="POST">
+<input type="text" name="usuario">
+<input type="password" name="senha">
+<input type="hidden" name="csrf_token" value="{csrf}">
+<div class="g-recaptcha" data-sitekey="6Lc-exemplo"></div>
+<button type="submit">Entrar</button>
+</form>
+</body>
+</html>
+"""
+
+PAGINA_BLOQUEIO = """<!DOCTYPE html>
+<html>
+<head><title>Security check</title></head>
+<body>
+<h1>Too Many Requests</h1>
+<p>Please verify you are human to continue.</p>
+<div class="g-recaptcha" data-sitekey="6Lc-exemplo"></div>
+</body>
+</html>
+"""
+
+class AlvoLocal:
+    """
+    Servidor do alvo em thread própria. Rajadas da mesma URL (mais de `limite_repeticoes`
+    requisições idênticas em `janela` segundos) recebem 429; requisições distintas não são limitadas.
+    """
+
+    def __init__(self, host="127.0.0.1", porta=0, latencia_ms=0, limite_repeticoes=6, janela=2.0):
+        self.latencia = latencia_ms / 1000
+        self.limite_repeticoes = limite_repeticoes
+        self.janela = janela
+
+        self.contagem = Counter()
+        self._historico = {}
+        self._lock = threading.Lock()
+
+        self.servidor = ThreadingHTTPServer((host, porta), _criar_handler(self))
+        self.servidor.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url_base(self):
+        host, porta = self.servidor.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    @property
+    def url_entrada(self):
+        return f"{self.url_base}/?{QUERY_ENTRADA}"
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self.servidor.serve_forever, name="alvo-local", daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.parar()
+
+    def estatisticas(self):
+        with self._lock:
+            return dict(self.contagem)
+
+    def zerar_estatisticas(self):
+        """Zera contagens e janelas de rajada (entre scans contra o mesmo servidor)"""
+        with self._lock:
+            self.contagem.clear()
+            self._historico.clear()
+
+    def _contar(self, chave):
+        with self._lock:
+            self.contagem[chave] += 1
+
+    def _limitado(self, cliente, requisicao):
+        """True se a requisição idêntica passou do limite na janela"""
+        agora = time.monotonic()
+        with self._lock:
+            historico = self._historico.setdefault((cliente, requisicao), deque())
+            while historico and agora - historico[0] > self.janela:
+                historico.popleft()
+            historico.append(agora)
+            return len(historico) > self.limite_repeticoes
+
+    def responder(self, metodo, caminho, params, headers, cliente):
+        """(status, headers extras, corpo) para a requisição"""
+        self._contar("requisicoes")
+        if caminho == "/__aegis/gabarito":
+            return 200, {"Content-Type": "application/json"}, json.dumps(GABARITO)
+        if caminho == "/__aegis/estatisticas":
+            return 200, {"Content-Type": "application/json"}, json.dumps(self.estatisticas())
+
+        if self.latencia:
+            time.sleep(self.latencia)
+
+        chave = (metodo, caminho, tuple(sorted((k, tuple(v)) for k, v in params.items())),
+                 headers.get("Referer"), headers.get("X-Forwarded-For"))
+        if self._limitado(cliente, chave):
+            self._contar("bloqueadas_429")
+            return 429, {"Retry-After": "1"}, PAGINA_BLOQUEIO
+
+        valor = lambda nome: (params.get(nome) or [""])[0]
+        conteudo = ""
+
+        # SQL: id (URL), codigo (pedido) e usuario (login) montam a consulta por concatenação
+        for nome in ("id", "codigo", "usuario"):
+            if any(aspa in valor(nome) for aspa in ("'", '"')):
+                conteudo += f"<div class=\"erro\">{escape(ERRO_SQL.format(valor=valor(nome)))}</div>\n"
+
+        # Inclusão de arquivo: file é lido do disco sem validação
+        arquivo = unquote(valor("file")).replace("\\", "/")
+        if "etc/passwd" in arquivo:
+            conteudo += f"<pre>{PASSWD}</pre>\n"
+        elif arquivo:
+            conteudo += f"<!-- incluido: {escape(arquivo)} -->\n"
+
+        if caminho == "/pedidos":
+            conteudo += "<ul><li><a href=\"/pedido?codigo=10\">Pedido 10</a></li></ul>\n"
+        if caminho == "/busca":
+            conteudo += f"<p>Busca: {valor('termo')}</p>\n"  # refletido sem escape
+
+        corpo = PAGINA.format(
+            busca=valor("q"),  # refletido sem escape
+            referer=headers.get("Referer", ""),  # refletido sem escape
+            conteudo=conteudo,
+            csrf="a1b2c3d4e5f6"
+        )
+        return 200, {"Content-Type": "text/html; charset=utf-8"}, corpo
+
+def _criar_handler(alvo):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        server_version = "cloudflare"
+        sys_version = ""
+        # Resposta inteira em um só envio: cabeçalho e corpo separados esbarram no ACK atrasado
+        wbufsize = 64 * 1024
+        disable_nagle_algorithm = True
+
+        def _tratar(self, metodo):
+            url = urlparse(self.path)
+            params = parse_qs(url.query, keep_blank_values=True)
+            if metodo == "POST":
+                tamanho = int(self.headers.get("Content-Length") or 0)
+                corpo = self.rfile.read(tamanho).decode("utf-8", "replace")
+                for nome, valores in parse_qs(corpo, keep_blank_values=True).items():
+                    params.setdefault(nome, []).extend(valores)
+
+            status, extras, corpo = alvo.responder(metodo, url.path, params, self.headers, self.client_address[0])
+            dados = corpo.encode("utf-8")
+            self.send_response(status)
+            self.send_header("cf-ray", f"{int(time.time() * 1000) % 10**12:x}-GRU")
+            self.send_header("x-sucuri-id", "11005")
+            self.send_header("Set-Cookie", "sessao=abc123; Path=/")
+            for nome, valor in extras.items():
+                self.send_header(nome, valor)
+            self.send_header("Content-Length", str(len(dados)))
+            self.end_headers()
+            if metodo != "HEAD":
+                self.wfile.write(dados)
+
+        def do_GET(self):
+            self._tratar("GET")
+
+        def do_POST(self):
+            self._tratar("POST")
+
+        def do_HEAD(self):
+            self._tratar("HEAD")
+
+        def log_message(self, formato, *args):
+            pass
+
+    return Handler
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Alvo vulnerável local para benchmarks do AEGIS")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia-ms", type=float, default=0, help="atraso artificial por resposta")
+    args = parser.parse_args(argv)
+
+    alvo = AlvoLocal(args.host, args.porta, args.latencia_ms)
+    print(f"[alvo_local] 🎯 Servindo em {alvo.url_entrada}")
+    try:
+        alvo.servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        alvo.servidor.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
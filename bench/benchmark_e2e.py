@@ -0,0 +1,285 @@
+"""
+AEGIS Bug Hunter - Benchmark de Ponta a Ponta
+Executa o pipeline completo (run.py) contra o alvo local e mede requisições/s, tempo
+de parede por módulo, pico de memória e recall dos achados em relação ao gabarito
+
+Cada repetição roda em um diretório temporário (saída, logs e banco de memória limpos)
+com uma cópia da configuração do repositório. Por padrão o ritmo inicial do controlador
+de taxa é elevado (AJUSTES_PADRAO) para que a espera não esconda o custo do código;
+--set substitui ou acrescenta ajustes. --aquecimento N roda N scans antes do medido,
+no mesmo diretório e contra o mesmo alvo: o scan medido parte do banco de memória
+que eles preencheram (priorização de payloads pelo histórico).
+
+Uso: python bench/benchmark_e2e.py [--repeticoes 3] [--saida resultado.json]
+                                   [--baseline anterior.json --tolerancia 0.25]
+                                   [--set scanning.rate_control.initial_rps=1.0]
+                                   [--aquecimento 2]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime
+from urllib.parse import urlparse
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from aegis.artifact_bus import ARTEFATOS, diretorio_saida  # noqa: E402
+from aegis.metrics import ARQUIVO_METRICAS  # noqa: E402
+from alvo_local import AlvoLocal, GABARITO  # noqa: E402
+
+RUN_PY = os.path.join(RAIZ, "run.py")
+CONFIG = os.path.join(RAIZ, "config", "aegis_config.json")
+
+AJUSTES_PADRAO = {
+    "scanning.rate_control.initial_rps": 50.0,
+    "scanning.rate_control.max_rps": 200.0,
+}
+
+# Métricas comparadas com o baseline: nome -> True se maior é melhor
+COMPARAVEIS = {
+    "duracao_pipeline": False,
+    "requisicoes_por_segundo": True,
+    "rss_pico_kb": False,
+    "recall_vulnerabilidades": True,
+    "recall_defesas": True,
+}
+
+def aplicar_ajustes(config, ajustes):
+    """Aplica ajustes no formato {"secao.chave": valor} à configuração"""
+    for caminho, valor in ajustes.items():
+        *secoes, chave = caminho.split(".")
+        destino = config
+        for secao in secoes:
+            destino = destino.setdefault(secao, {})
+        destino[chave] = valor
+    return config
+
+def ler_ajuste(texto):
+    """'secao.chave=valor' -> (caminho, valor); o valor é lido como JSON quando possível"""
+    caminho, _, valor = texto.partition("=")
+    if not caminho or not _:
+        raise argparse.ArgumentTypeError(f"Ajuste inválido: '{texto}' (use secao.chave=valor)")
+    try:
+        return caminho, json.loads(valor)
+    except ValueError:
+        return caminho, valor
+
+def preparar_diretorio(ajustes):
+    """Diretório de trabalho temporário com a configuração ajustada"""
+    diretorio = tempfile.mkdtemp(prefix="aegis-bench-")
+    with open(CONFIG, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    os.makedirs(os.path.join(diretorio, "config"))
+    with open(os.path.join(diretorio, "config", "aegis_config.json"), "w", encoding="utf-8") as f:
+        json.dump(aplicar_ajustes(config, ajustes), f, indent=4, ensure_ascii=False)
+    return diretorio
+
+def _ler_json(caminho):
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def chaves_achados(injects):
+    """Achados do inject_finder no formato das chaves do gabarito"""
+    chaves = set()
+    for achado in (injects or {}).get("vulnerabilidades_encontradas", []):
+        tipo = achado.get("tipo")
+        if tipo == "parametro_url":
+            chaves.add(("parametro_url", achado.get("parametro"), achado.get("tipo_injecao")))
+        elif tipo == "file_inclusion":
+            chaves.add(("parametro_url", achado.get("parametro"), "file_inclusion"))
+        elif tipo == "header_injection":
+            chaves.add(("header", achado.get("header"), "header_injection"))
+        elif tipo == "formulario":
+            chaves.add(("formulario", urlparse(achado.get("form_action") or "").path, achado.get("tipo_injecao")))
+    return chaves
+
+def avaliar_achados(injects, defesas):
+    """Recall de vulnerabilidades e defesas e achados fora do gabarito"""
+    esperadas = {(v["local"], v["alvo"], v["tipo"]) for v in GABARITO["vulnerabilidades"]}
+    encontradas = chaves_achados(injects)
+    tipos_defesa = {d.get("tipo") for d in (defesas or {}).get("defesas_detectadas", [])}
+    defesas_esperadas = set(GABARITO["defesas"])
+
+    return {
+        "recall_vulnerabilidades": round(len(esperadas & encontradas) / len(esperadas), 4),
+        "recall_defesas": round(len(defesas_esperadas & tipos_defesa) / len(defesas_esperadas), 4),
+        "vulnerabilidades_perdidas": sorted("/".join(c) for c in esperadas - encontradas),
+        "defesas_perdidas": sorted(defesas_esperadas - tipos_defesa),
+        "fora_do_gabarito": sorted("/".join(str(p) for p in c) for c in encontradas - esperadas)
+    }
+
+def executar_repeticao(ajustes, timeout, manter=False, latencia_ms=0, aquecimento=0):
+    """Uma execução completa do run.py contra um alvo local novo (após `aquecimento` scans não medidos)"""
+    diretorio = preparar_diretorio(ajustes)
+    try:
+        with AlvoLocal(latencia_ms=latencia_ms) as alvo:
+            for _ in range(aquecimento):
+                subprocess.run([sys.executable, RUN_PY, "--force"], input=f"{alvo.url_entrada}\ns\n", cwd=diretorio,
+                               capture_output=True, text=True, timeout=timeout)
+            # Rajadas dos scans de aquecimento não contam para o scan medido
+            alvo.zerar_estatisticas()
+            inicio = time.perf_counter()
+            processo = subprocess.run(
+                [sys.executable, RUN_PY, "--force"],
+                input=f"{alvo.url_entrada}\ns\n", cwd=diretorio,
+                capture_output=True, text=True, timeout=timeout
+            )
+            parede_total = time.perf_counter() - inicio
+            servidor = alvo.estatisticas()
+            url = alvo.url_entrada
+
+        saida = os.path.join(diretorio, diretorio_saida(url))
+        metricas = _ler_json(os.path.join(saida, ARQUIVO_METRICAS))
+        if processo.returncode != 0 or metricas is None:
+            raise RuntimeError(f"run.py falhou (código {processo.returncode}):\n{processo.stdout[-2000:]}{processo.stderr[-2000:]}")
+
+        injects = _ler_json(os.path.join(saida, ARTEFATOS["injects"].arquivo))
+        defesas = _ler_json(os.path.join(saida, ARTEFATOS["defense_analysis"].arquivo))
+        duracao = metricas["duracao"]
+        requisicoes = metricas["totais"]["requisicoes"]
+        return {
+            "parede_total": round(parede_total, 4),
+            "duracao_pipeline": duracao,
+            "requisicoes": requisicoes,
+            "requisicoes_servidor": servidor.get("requisicoes", 0),
+            "bloqueadas_429": servidor.get("bloqueadas_429", 0),
+            "requisicoes_por_segundo": round(requisicoes / duracao, 2) if duracao else None,
+            "cpu_processo": metricas["cpu_processo"],
+            "rss_pico_kb": metricas["rss_pico_kb"],
+            "tracemalloc_pico_kb": metricas.get("tracemalloc_pico_kb"),
+            "modulos": {m["modulo"]: m["parede"] for m in metricas["modulos"]},
+            "erros_modulos": [m["modulo"] for m in metricas["modulos"] if m.get("erro")],
+            **avaliar_achados(injects, defesas)
+        }
+    finally:
+        if manter:
+            print(f"[benchmark_e2e] 📁 Diretório mantido: {diretorio}")
+        else:
+            shutil.rmtree(diretorio, ignore_errors=True)
+
+def mediana(repeticoes):
+    """Mediana de cada métrica numérica (e de cada módulo) entre as repetições"""
+    resultado = {}
+    for chave, valor in repeticoes[0].items():
+        if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            valores = [r[chave] for r in repeticoes if r.get(chave) is not None]
+            resultado[chave] = round(statistics.median(valores), 4) if valores else None
+    modulos = {}
+    for repeticao in repeticoes:
+        for modulo, parede in repeticao["modulos"].items():
+            modulos.setdefault(modulo, []).append(parede)
+    resultado["modulos"] = {m: round(statistics.median(v), 4) for m, v in modulos.items()}
+    return resultado
+
+def comparar(atual, baseline, tolerancia):
+    """Regressões em relação ao baseline (variação além da tolerância no sentido ruim)"""
+    regressoes = []
+    for chave, maior_melhor in COMPARAVEIS.items():
+        antes, agora = baseline.get(chave), atual.get(chave)
+        if not antes or agora is None:
+            continue
+        variacao = (agora - antes) / antes
+        # Recall não tem tolerância: qualquer achado a menos é regressão
+        limite = 0 if chave.startswith("recall") else tolerancia
+        if (maior_melhor and variacao < -limite) or (not maior_melhor and variacao > limite):
+            regressoes.append(f"{chave}: {antes} -> {agora} ({variacao:+.1%})")
+
+    for modulo, antes in baseline.get("modulos", {}).items():
+        agora = atual["modulos"].get(modulo)
+        # Módulos muito rápidos oscilam mais que a tolerância sem significar nada
+        if agora is None or antes < 0.05:
+            continue
+        variacao = (agora - antes) / antes
+        if variacao > tolerancia:
+            regressoes.append(f"modulo {modulo}: {antes}s -> {agora}s ({variacao:+.1%})")
+    return regressoes
+
+def formatar(resultado):
+    linhas = [
+        f"Duração do pipeline: {resultado['duracao_pipeline']:.2f}s (processo: {resultado['parede_total']:.2f}s)",
+        f"Requisições: {resultado['requisicoes']:.0f} ({resultado['requisicoes_por_segundo']} req/s), "
+        f"{resultado['requisicoes_servidor']:.0f} recebidas pelo alvo, {resultado['bloqueadas_429']:.0f} com 429",
+        f"CPU: {resultado['cpu_processo']:.2f}s | RSS pico: {resultado['rss_pico_kb'] / 1024:.1f} MB",
+        f"Recall: vulnerabilidades {resultado['recall_vulnerabilidades']:.0%}, defesas {resultado['recall_defesas']:.0%}",
+        "",
+        f"{'MÓDULO':<24} {'PAREDE (s)':>10}"
+    ]
+    for modulo, parede in sorted(resultado["modulos"].items(), key=lambda item: -item[1]):
+        linhas.append(f"{modulo:<24} {parede:>10.3f}")
+    return "\n".join(linhas)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de ponta a ponta do pipeline contra o alvo local")
+    parser.add_argument("--repeticoes", type=int, default=1)
+    parser.add_argument("--saida", help="grava o resultado em JSON (serve de baseline depois)")
+    parser.add_argument("--baseline", help="resultado anterior para comparação; regressões saem com código 1")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="variação aceita em tempos e vazão (padrão: 25%%)")
+    parser.add_argument("--set", dest="ajustes", action="append", type=ler_ajuste, default=[],
+                        metavar="SECAO.CHAVE=VALOR", help="ajuste na configuração usada pelo scan (repetível)")
+    parser.add_argument("--latencia-ms", type=float, default=0, help="atraso artificial por resposta do alvo")
+    parser.add_argument("--timeout", type=float, default=600, help="limite por execução em segundos")
+    parser.add_argument("--manter", action="store_true", help="mantém os diretórios de trabalho")
+    parser.add_argument("--aquecimento", type=int, default=0, help="scans anteriores ao medido, com o mesmo banco de memória")
+    args = parser.parse_args(argv)
+
+    ajustes = {**AJUSTES_PADRAO, **dict(args.ajustes)}
+    repeticoes = []
+    for i in range(args.repeticoes):
+        print(f"[benchmark_e2e] 🚀 Repetição {i + 1}/{args.repeticoes}...")
+        try:
+            repeticoes.append(executar_repeticao(ajustes, args.timeout, args.manter, args.latencia_ms, args.aquecimento))
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            print(f"[benchmark_e2e] ❌ {e}")
+            return 1
+        print(f"[benchmark_e2e] ⏱️ {repeticoes[-1]['duracao_pipeline']:.2f}s, "
+              f"{repeticoes[-1]['requisicoes_por_segundo']} req/s")
+
+    resultado = mediana(repeticoes)
+    print("\n📊 BENCHMARK DE PONTA A PONTA (mediana)")
+    print(formatar(resultado))
+    for chave in ("vulnerabilidades_perdidas", "defesas_perdidas", "fora_do_gabarito", "erros_modulos"):
+        itens = sorted({item for r in repeticoes for item in r[chave]})
+        if itens:
+            print(f"{chave.replace('_', ' ').capitalize()}: {', '.join(itens)}")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump({
+                "timestamp": datetime.now().isoformat(),
+                "ambiente": {"python": platform.python_version(), "plataforma": platform.platform(), "cpus": os.cpu_count()},
+                "ajustes": ajustes,
+                "mediana": resultado,
+                "repeticoes": repeticoes
+            }, f, indent=4, ensure_ascii=False)
+        print(f"💾 Resultado salvo em: {args.saida}")
+
+    if args.baseline:
+        baseline = _ler_json(args.baseline)
+        if baseline is None:
+            print(f"[benchmark_e2e] ❌ Baseline ilegível: {args.baseline}")
+            return 1
+        if baseline.get("ajustes") != ajustes:
+            print("[benchmark_e2e] ⚠️ Baseline gerado com outros ajustes de configuração")
+        regressoes = comparar(resultado, baseline["mediana"], args.tolerancia)
+        if regressoes:
+            print(f"\n🚨 {len(regressoes)} regressões em relação a {args.baseline}:")
+            for regressao in regressoes:
+                print(f"  - {regressao}")
+            return 1
+        print(f"\n✅ Sem regressões em relação a {args.baseline} (tolerância {args.tolerancia:.0%})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
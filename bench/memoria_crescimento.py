@@ -0,0 +1,177 @@
+"""
+AEGIS Bug Hunter - Crescimento do Banco de Memória
+Custo das consultas e da gravação do MemorySystem conforme o aegis_memory.db cresce
+
+Para cada tamanho, um banco novo é preenchido com achados sintéticos espalhados por
+muitos alvos e domínios; mede-se então, para um alvo, a gravação de um lote (metade
+já conhecida: INSERT ... ON CONFLICT) e as consultas do passo de memória. Com os
+índices, o custo deve ficar praticamente constante (get_statistics lê as tabelas de
+resumo mantidas por gatilhos); --sem-indices remove os índices secundários (os índices
+únicos ficam: a gravação depende deles) para comparação.
+
+Uso: python bench/memoria_crescimento.py [--tamanhos 1000,10000,100000] [--repeticoes 20]
+                                         [--sem-indices] [--limite 3.0] [--salvar crescimento.json]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from aegis.memory_system import MemorySystem
+from aegis.memory_migrations import hash_vulnerabilidade
+
+SEMENTE = 42
+TIPOS = ["sql_injection", "xss", "command_injection", "file_inclusion", "header_injection"]
+ACHADOS_POR_ALVO = 100
+ALVOS_POR_DOMINIO = 10
+ALVO_MEDIDO = "https://alvo-medido.exemplo/"
+
+# Índices secundários (removidos com --sem-indices; os únicos ficam: a gravação depende deles)
+INDICES_SECUNDARIOS = ("idx_targets_domain", "idx_vulnerabilities_target", "idx_defenses_target", "idx_payloads_domain")
+
+def preencher(memoria, total):
+    """Insere `total` vulnerabilidades (e payloads/defesas proporcionais) direto no banco"""
+    rng = random.Random(SEMENTE)
+    alvos = max(1, total // ACHADOS_POR_ALVO)
+    with memoria.banco.transacao() as conn:
+        conn.executemany(
+            "INSERT INTO targets (url, domain) VALUES (?, ?)",
+            ((f"https://d{a // ALVOS_POR_DOMINIO}.exemplo/app{a}", f"d{a // ALVOS_POR_DOMINIO}.exemplo") for a in range(alvos))
+        )
+
+        def vulnerabilidades():
+            for i in range(total):
+                target_id = i % alvos + 1
+                tipo = rng.choice(TIPOS)
+                local, payload = f"p{i % 37}", f"payload-{i}"
+                yield (target_id, tipo, local, payload, "evidencia", round(rng.random(), 2), "HIGH",
+                       hash_vulnerabilidade(target_id, tipo, local, payload))
+
+        conn.executemany(
+            "INSERT INTO vulnerabilities (target_id, vuln_type, location, payload, evidence, confidence, severity, vuln_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            vulnerabilidades()
+        )
+        conn.executemany(
+            "INSERT INTO effective_payloads (payload, payload_type, target_domain, success_rate) VALUES (?, ?, ?, ?)",
+            ((f"payload-{i}", rng.choice(TIPOS), f"d{(i % alvos) // ALVOS_POR_DOMINIO}.exemplo", rng.random())
+             for i in range(total // 10))
+        )
+        conn.executemany(
+            "INSERT INTO detected_defenses (target_id, defense_type, defense_name, confidence) VALUES (?, ?, ?, ?)",
+            ((i % alvos + 1, "WAF", f"Defesa {i % 7}", 0.9) for i in range(total // 10))
+        )
+
+def lote_alvo(rodada):
+    """Lote de 100 achados do alvo medido: metade se repete a cada rodada, metade é nova"""
+    return [{
+        "tipo_payload": TIPOS[i % len(TIPOS)],
+        "parametro": f"p{i % 10}",
+        "payload": f"fixo-{i}" if i < 50 else f"novo-{rodada}-{i}",
+        "confianca": 0.9
+    } for i in range(100)]
+
+def _mediana_ms(funcao, repeticoes):
+    tempos = []
+    for rodada in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(rodada)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos) * 1000
+
+def medir_tamanho(total, repeticoes, sem_indices=False):
+    """Mediana (ms) de cada operação num banco com `total` vulnerabilidades"""
+    diretorio = tempfile.mkdtemp(prefix="aegis-crescimento-")
+    memoria = MemorySystem(os.path.join(diretorio, "memoria.db"))
+    try:
+        inicio = time.perf_counter()
+        preencher(memoria, total)
+        if sem_indices:
+            with memoria.banco.transacao() as conn:
+                for indice in INDICES_SECUNDARIOS:
+                    conn.execute(f"DROP INDEX IF EXISTS {indice}")
+        with memoria.banco.transacao() as conn:
+            conn.execute("ANALYZE")
+        preenchimento = time.perf_counter() - inicio
+
+        memoria.store_vulnerabilities(ALVO_MEDIDO, lote_alvo(-1))
+        return {
+            "preenchimento_s": round(preenchimento, 2),
+            "tamanho_arquivo_kb": sum(os.path.getsize(arquivo) for arquivo in (memoria.db_path, f"{memoria.db_path}-wal")
+                                      if os.path.exists(arquivo)) // 1024,
+            "ms": {
+                "store_vulnerabilities.lote100": _mediana_ms(lambda r: memoria.store_vulnerabilities(ALVO_MEDIDO, lote_alvo(r)), repeticoes),
+                "get_historical_vulnerabilities": _mediana_ms(lambda r: memoria.get_historical_vulnerabilities(ALVO_MEDIDO), repeticoes),
+                "get_defense_history": _mediana_ms(lambda r: memoria.get_defense_history(ALVO_MEDIDO), repeticoes),
+                "analyze_target_patterns": _mediana_ms(lambda r: memoria.analyze_target_patterns(ALVO_MEDIDO), repeticoes),
+                "get_best_payloads": _mediana_ms(lambda r: memoria.get_best_payloads("xss", ALVO_MEDIDO), repeticoes),
+                "get_statistics": _mediana_ms(lambda r: memoria.get_statistics(), repeticoes),
+            }
+        }
+    finally:
+        memoria.banco.fechar()
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+def crescimento(resultados):
+    """Razão entre o custo no maior e no menor banco, por operação"""
+    tamanhos = sorted(resultados)
+    menor, maior = resultados[tamanhos[0]]["ms"], resultados[tamanhos[-1]]["ms"]
+    return {operacao: maior[operacao] / menor[operacao] if menor[operacao] else 0.0 for operacao in menor}
+
+def formatar(resultados, razoes):
+    tamanhos = sorted(resultados)
+    cabecalho = f"{'OPERAÇÃO':<34}" + "".join(f"{f'{t:,} linhas':>16}" for t in tamanhos) + f"{'CRESCIMENTO':>14}"
+    linhas = [cabecalho, "-" * len(cabecalho)]
+    for operacao, razao in razoes.items():
+        linhas.append(f"{operacao:<34}" + "".join(f"{resultados[t]['ms'][operacao]:>14.3f}ms" for t in tamanhos) + f"{razao:>13.1f}x")
+    linhas.append(f"{'(arquivo)':<34}" + "".join(f"{resultados[t]['tamanho_arquivo_kb']:>14}KB" for t in tamanhos))
+    return "\n".join(linhas)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Custo das operações do MemorySystem conforme o banco cresce")
+    parser.add_argument("--tamanhos", default="1000,10000,100000", help="vulnerabilidades no banco, separadas por vírgula")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--sem-indices", action="store_true", help="remove os índices secundários (comparação)")
+    parser.add_argument("--limite", type=float, default=3.0, help="crescimento máximo tolerado do menor ao maior banco")
+    parser.add_argument("--salvar", metavar="ARQUIVO", help="grava os resultados em JSON")
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    for total in sorted(int(t) for t in args.tamanhos.split(",")):
+        print(f"[memoria_crescimento] ⏱️ {total:,} vulnerabilidades...", flush=True)
+        resultados[total] = medir_tamanho(total, args.repeticoes, args.sem_indices)
+
+    razoes = crescimento(resultados)
+    print()
+    print(formatar(resultados, razoes))
+
+    if args.salvar:
+        with open(args.salvar, "w", encoding="utf-8") as f:
+            json.dump({
+                "timestamp": datetime.now().isoformat(),
+                "ambiente": {"python": platform.python_version(), "plataforma": platform.platform(), "cpus": os.cpu_count()},
+                "sem_indices": args.sem_indices,
+                "resultados": resultados,
+                "crescimento": razoes
+            }, f, indent=4, ensure_ascii=False)
+        print(f"💾 Resultados salvos em: {args.salvar}")
+
+    acima = [operacao for operacao, razao in razoes.items() if razao > args.limite]
+    if len(resultados) > 1 and acima:
+        print(f"\n📈 Custo cresceu mais de {args.limite:.1f}x em: {', '.join(acima)}")
+        return 1
+    print(f"\n✅ Custo das operações estável (até {args.limite:.1f}x) do menor ao maior banco")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,351 @@
+"""
+AEGIS Bug Hunter - Microbenchmarks
+Vazão dos caminhos quentes de CPU (análise de respostas, parser, detecção de WAF e
+gravação de achados) sobre um corpus sintético determinístico, com baselines em JSON
+
+Cada caso roda em rodadas calibradas (várias chamadas por rodada até passar de
+--tempo-minimo); a estatística é por chamada, como no pytest-benchmark. Casos com
+preparação (ex: banco novo por chamada) medem uma chamada por vez, sem a preparação.
+
+Uso: python bench/micro.py executar [--filtro parser] [--rodadas 7] [--escala 1] [--salvar base.json]
+     python bench/micro.py comparar base.json atual.json [--limite 0.10] [--filtro parser]
+     python bench/micro.py executar --comparar base.json     # executa e compara em seguida
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+SEMENTE = 42
+
+# ---------------------------------------------------------------------------
+# Corpus sintético (mesma semente, mesmo corpus)
+# ---------------------------------------------------------------------------
+
+class RespostaSintetica:
+    """O suficiente de requests.Response para os analisadores"""
+
+    def __init__(self, text, headers=None, status_code=200):
+        self.text = text
+        self.headers = headers or {}
+        self.status_code = status_code
+
+def _palavras(rng, n):
+    vocabulario = ["produto", "cliente", "pedido", "oferta", "conta", "frete", "login",
+                   "senha", "busca", "carrinho", "pagamento", "categoria", "estoque"]
+    return " ".join(rng.choice(vocabulario) for _ in range(n))
+
+def corpus_html(escala=1):
+    """Página grande: formulários, links, scripts, metas e comentários (~1 MB na escala 1)"""
+    rng = random.Random(SEMENTE)
+    partes = ["<!DOCTYPE html><html><head><title>Loja Sintética</title>"]
+    for i in range(40 * escala):
+        partes.append(f'<meta name="m{i}" content="{_palavras(rng, 4)}">')
+    for i in range(60 * escala):
+        if i % 3:
+            partes.append(f'<script src="/static/js/lib{i}.min.js?v={rng.randint(1, 99)}"></script>')
+        else:
+            partes.append(f"<script>var cfg{i} = {{api: '/api/v{i}', token: '{rng.getrandbits(64):x}'}}; // jquery react</script>")
+    partes.append("</head><body>")
+    for i in range(800 * escala):
+        partes.append(f"<div class=\"item\"><h2>{_palavras(rng, 3)}</h2><p>{_palavras(rng, 40)}</p>"
+                      f'<a href="/produto?id={i}">ver</a> <a href="https://externo{i % 7}.com/p/{i}">parceiro</a></div>')
+        if i % 20 == 0:
+            partes.append(f"<!-- TODO: remover senha de teste do usuario admin{i} / debug -->")
+        if i % 25 == 0:
+            partes.append(
+                f'<form action="/form{i}" method="{"POST" if i % 2 else "GET"}">'
+                f'<input type="text" name="campo{i}"><input type="hidden" name="csrf_token" value="{rng.getrandbits(64):x}">'
+                f'<select name="opcao{i}"><option value="1">1</option></select><textarea name="texto{i}"></textarea></form>'
+            )
+    partes.append("</body></html>")
+    return "".join(partes)
+
+def corpus_headers(escala=1):
+    """Muitos headers, sem nenhuma assinatura de WAF (pior caso: todas as comparações)"""
+    rng = random.Random(SEMENTE)
+    headers = {f"X-Custom-{i}": f"valor-{rng.getrandbits(48):x}-{_palavras(rng, 3)}" for i in range(200 * escala)}
+    headers.update({"Content-Type": "text/html; charset=utf-8", "Server": "nginx"})
+    return headers
+
+def corpus_achados(escala=1):
+    """Achados no formato do inject_finder/fuzzer"""
+    rng = random.Random(SEMENTE)
+    tipos = ["sql_injection", "xss", "command_injection", "file_inclusion", "ldap_injection"]
+    return [{
+        "tipo": "parametro_url",
+        "tipo_payload": rng.choice(tipos),
+        "parametro": f"p{i % 50}",
+        "payload": f"' OR {i}={i}-- {rng.getrandbits(32):x}",
+        "evidencia": "Indicador encontrado: sql syntax",
+        "confianca": round(rng.random(), 2)
+    } for i in range(2000 * escala)]
+
+# ---------------------------------------------------------------------------
+# Casos
+# ---------------------------------------------------------------------------
+
+class Caso:
+    """
+    Um microbenchmark: `executar` é chamado sem argumentos ou, com `preparar`,
+    com o retorno de preparar() (feito fora da medição)
+    """
+
+    def __init__(self, nome, executar, preparar=None, limpar=None):
+        self.nome = nome
+        self.executar = executar
+        self.preparar = preparar
+        self.limpar = limpar
+
+def casos_inject_finder(escala):
+    from aegis.inject_finder import analisar_resposta_vulnerabilidade
+    html = corpus_html(escala)
+    # Indicador perto do fim: o pior caso para uma busca linear
+    corpo = html[:-14] + "<p>You have an error in your SQL syntax</p></body></html>"
+    resposta = RespostaSintetica(corpo, corpus_headers(escala))
+    return [
+        Caso("inject_finder.analisar_resposta.sql", lambda: analisar_resposta_vulnerabilidade(resposta, "'", "sql_injection")),
+        Caso("inject_finder.analisar_resposta.xss", lambda: analisar_resposta_vulnerabilidade(resposta, "<script>alert('XSS')</script>", "xss")),
+        Caso("inject_finder.analisar_resposta.cmd", lambda: analisar_resposta_vulnerabilidade(resposta, "; ls", "command_injection")),
+    ]
+
+def casos_parser(escala):
+    from bs4 import BeautifulSoup
+    from aegis import parser
+    html = corpus_html(escala)
+    soup = BeautifulSoup(html, "html.parser")
+    base = "https://exemplo.com/"
+
+    def completo():
+        parser.extrair_metas(soup)
+        parser.extrair_formularios(soup, base)
+        parser.extrair_links(soup, base)
+        parser.extrair_scripts(soup)
+        parser.extrair_comentarios(soup)
+        parser.analisar_tecnologias_frontend(soup)
+        parser.calcular_metricas_pagina(soup, html)
+
+    return [
+        Caso("parser.html_parser", lambda: BeautifulSoup(html, "html.parser")),
+        Caso("parser.extrair_formularios", lambda: parser.extrair_formularios(soup, base)),
+        Caso("parser.extrair_links", lambda: parser.extrair_links(soup, base)),
+        Caso("parser.extrair_scripts", lambda: parser.extrair_scripts(soup)),
+        Caso("parser.extrair_comentarios", lambda: parser.extrair_comentarios(soup)),
+        Caso("parser.analisar_tecnologias", lambda: parser.analisar_tecnologias_frontend(soup)),
+        Caso("parser.extracao_completa", completo),
+    ]
+
+def casos_headers_analyzer(escala):
+    from aegis.headers_analyzer import detectar_waf_avancado
+    headers = corpus_headers(escala)
+    html = corpus_html(escala)
+    return [
+        Caso("headers_analyzer.detectar_waf.headers", lambda: detectar_waf_avancado(headers)),
+        Caso("headers_analyzer.detectar_waf.completo", lambda: detectar_waf_avancado(headers, html)),
+    ]
+
+def casos_memory_system(escala):
+    from aegis.memory_system import MemorySystem
+    achados = corpus_achados(escala)
+    muitos = corpus_achados(escala * 10)
+    defesas = {"defesas_detectadas": [{"nome": f"Defesa {i}", "tipo": "WAF", "confianca": 0.9} for i in range(10)]}
+    alvo = "https://exemplo.com/"
+    abertos = []
+
+    def banco_novo(preencher=None):
+        diretorio = tempfile.mkdtemp(prefix="aegis-micro-")
+        memoria = MemorySystem(os.path.join(diretorio, "memoria.db"))
+        abertos.append((diretorio, memoria))
+        if preencher:
+            memoria.store_vulnerabilities(alvo, preencher)
+        return memoria
+
+    def limpar():
+        while abertos:
+            diretorio, memoria = abertos.pop()
+            memoria.banco.fechar()
+            shutil.rmtree(diretorio, ignore_errors=True)
+
+    return [
+        Caso("memory_system.store_vulnerabilities.novos",
+             lambda memoria: memoria.store_vulnerabilities(alvo, achados), banco_novo, limpar),
+        Caso("memory_system.store_vulnerabilities.existentes",
+             lambda memoria: memoria.store_vulnerabilities(alvo, achados), lambda: banco_novo(achados), limpar),
+        # Passo completo do pipeline (gravação + análises) com dezenas de milhares de achados
+        Caso("memory_system.analisar.20k",
+             lambda memoria: memoria.analisar(alvo, {"vulnerabilidades_encontradas": muitos}, defesas), banco_novo, limpar),
+    ]
+
+GRUPOS = {
+    "inject_finder": casos_inject_finder,
+    "parser": casos_parser,
+    "headers_analyzer": casos_headers_analyzer,
+    "memory_system": casos_memory_system,
+}
+
+# ---------------------------------------------------------------------------
+# Execução e estatísticas
+# ---------------------------------------------------------------------------
+
+def _cronometrar(caso, iteracoes):
+    """Tempo total de `iteracoes` chamadas (sem a preparação)"""
+    if caso.preparar is None:
+        inicio = time.perf_counter()
+        for _ in range(iteracoes):
+            caso.executar()
+        return time.perf_counter() - inicio
+
+    total = 0.0
+    for _ in range(iteracoes):
+        argumento = caso.preparar()
+        inicio = time.perf_counter()
+        caso.executar(argumento)
+        total += time.perf_counter() - inicio
+        if caso.limpar:
+            caso.limpar()
+    return total
+
+def medir(caso, rodadas=7, tempo_minimo=0.2):
+    """Estatísticas por chamada (segundos) e vazão (chamadas/s) do caso"""
+    _cronometrar(caso, 1)  # aquecimento (imports, caches)
+
+    # Calibração: dobra as iterações até a rodada passar do tempo mínimo
+    iteracoes = 1
+    while _cronometrar(caso, iteracoes) < tempo_minimo and iteracoes < 1_000_000:
+        iteracoes *= 2
+
+    tempos = []
+    gc.collect()
+    for _ in range(rodadas):
+        tempos.append(_cronometrar(caso, iteracoes) / iteracoes)
+
+    media = statistics.fmean(tempos)
+    return {
+        "rodadas": rodadas,
+        "iteracoes": iteracoes,
+        "min": min(tempos),
+        "max": max(tempos),
+        "media": media,
+        "mediana": statistics.median(tempos),
+        "desvio": statistics.stdev(tempos) if len(tempos) > 1 else 0.0,
+        "ops": 1 / statistics.median(tempos)
+    }
+
+def executar_suite(filtro=None, rodadas=7, tempo_minimo=0.2, escala=1):
+    """Executa os casos (filtro: substring do nome) e retorna {nome: estatísticas}"""
+    resultados = {}
+    for grupo, fabrica in GRUPOS.items():
+        casos = fabrica(escala)
+        for caso in casos:
+            if filtro and filtro not in caso.nome:
+                continue
+            print(f"[micro] ⏱️ {caso.nome}...", flush=True)
+            resultados[caso.nome] = medir(caso, rodadas, tempo_minimo)
+    return resultados
+
+def comparar(baseline, atual, limite=0.10, filtro=None):
+    """
+    Linhas de comparação e lista de regressões: queda de vazão acima do limite e casos
+    do baseline ausentes do resultado atual (quebrados ou renomeados). Com filtro, só
+    os casos do baseline que ele seleciona precisam estar presentes
+    """
+    linhas, regressoes = [], []
+    for nome in baseline:
+        if nome not in atual and (not filtro or filtro in nome):
+            linhas.append(f"{nome:<50} {baseline[nome]['ops']:>12.1f} {'(ausente)':>12}  🚨")
+            regressoes.append(nome)
+    for nome, estatisticas in atual.items():
+        anterior = baseline.get(nome)
+        if not anterior:
+            linhas.append(f"{nome:<50} {'(novo)':>12} {estatisticas['ops']:>12.1f}")
+            continue
+        variacao = estatisticas["ops"] / anterior["ops"] - 1
+        marca = ""
+        if variacao < -limite:
+            marca = "  🚨"
+            regressoes.append(nome)
+        linhas.append(f"{nome:<50} {anterior['ops']:>12.1f} {estatisticas['ops']:>12.1f} {variacao:>+9.1%}{marca}")
+    return linhas, regressoes
+
+def formatar(resultados):
+    cabecalho = f"{'CASO':<50} {'MEDIANA':>12} {'MIN':>12} {'DESVIO':>10} {'OPS/S':>12}"
+    linhas = [cabecalho, "-" * len(cabecalho)]
+    for nome, e in resultados.items():
+        linhas.append(f"{nome:<50} {e['mediana'] * 1000:>10.3f}ms {e['min'] * 1000:>10.3f}ms "
+                      f"{e['desvio'] / e['mediana']:>9.1%} {e['ops']:>12.1f}")
+    return "\n".join(linhas)
+
+def _ler_resultados(arquivo):
+    with open(arquivo, "r", encoding="utf-8") as f:
+        dados = json.load(f)
+    return dados.get("resultados", dados)
+
+def _relatorio_comparacao(baseline, atual, limite, origem, filtro=None):
+    linhas, regressoes = comparar(baseline, atual, limite, filtro)
+    print(f"\n{'CASO':<50} {'BASE OPS/S':>12} {'ATUAL OPS/S':>12} {'VARIAÇÃO':>9}")
+    print("\n".join(linhas))
+    ausentes = [nome for nome in regressoes if nome not in atual]
+    if ausentes:
+        print(f"\n🚨 {len(ausentes)} casos do baseline não estão no resultado atual: {', '.join(ausentes)}")
+    if len(regressoes) > len(ausentes):
+        print(f"\n🚨 {len(regressoes) - len(ausentes)} casos perderam mais de {limite:.0%} de vazão em relação a {origem}")
+    if regressoes:
+        return 1
+    print(f"\n✅ Nenhuma queda de vazão acima de {limite:.0%} em relação a {origem}")
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmarks dos caminhos quentes de CPU do AEGIS")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_exec = sub.add_parser("executar", help="executa a suíte")
+    p_exec.add_argument("--filtro", help="só casos cujo nome contém o texto (ex: parser)")
+    p_exec.add_argument("--rodadas", type=int, default=7)
+    p_exec.add_argument("--tempo-minimo", type=float, default=0.2, help="duração mínima de cada rodada em segundos")
+    p_exec.add_argument("--escala", type=int, default=1, help="multiplicador do tamanho do corpus")
+    p_exec.add_argument("--salvar", metavar="ARQUIVO", help="grava os resultados em JSON (baseline)")
+    p_exec.add_argument("--comparar", metavar="BASELINE", help="compara com um baseline ao fim")
+    p_exec.add_argument("--limite", type=float, default=0.10, help="queda de vazão tolerada (padrão: 10%%)")
+
+    p_comp = sub.add_parser("comparar", help="compara dois resultados salvos")
+    p_comp.add_argument("baseline")
+    p_comp.add_argument("atual")
+    p_comp.add_argument("--limite", type=float, default=0.10, help="queda de vazão tolerada (padrão: 10%%)")
+    p_comp.add_argument("--filtro", help="só exige do resultado atual os casos do baseline cujo nome contém o texto")
+    args = parser.parse_args(argv)
+
+    if args.comando == "comparar":
+        return _relatorio_comparacao(_ler_resultados(args.baseline), _ler_resultados(args.atual), args.limite, args.baseline, args.filtro)
+
+    resultados = executar_suite(args.filtro, args.rodadas, args.tempo_minimo, args.escala)
+    print()
+    print(formatar(resultados))
+
+    if args.salvar:
+        with open(args.salvar, "w", encoding="utf-8") as f:
+            json.dump({
+                "timestamp": datetime.now().isoformat(),
+                "ambiente": {"python": platform.python_version(), "plataforma": platform.platform(), "cpus": os.cpu_count()},
+                "escala": args.escala,
+                "resultados": resultados
+            }, f, indent=4, ensure_ascii=False)
+        print(f"💾 Resultados salvos em: {args.salvar}")
+
+    if args.comparar:
+        return _relatorio_comparacao(_ler_resultados(args.comparar), resultados, args.limite, args.comparar, args.filtro)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,21 +6,18 @@ import sys
 import time
 import json
 import inspect
+import argparse
+import functools
+import contextlib
 from datetime import datetime
-from urllib.parse import urlparse
-
-from aegis.agent_loop import executar as agent_loop
-from aegis.pre_recon import executar as pre_recon
-from aegis.headers_analyzer import executar as headers_analyzer
-from aegis.parser import executar as parser_mod
-from aegis.inject_finder import executar as inject_finder
-from aegis.fuzzer import executar as fuzzer
-from aegis.defense_detector import executar as defense_detector
-from aegis.memory_system import executar as memory_system
-from aegis.ai_interpreter import executar as ai_interpreter
-from aegis.estado_printer import executar as estado_printer
-from aegis.report_gen import executar as report_gen
-from aegis.reporter import executar as reporter
+
+from aegis.scheduler import Etapa, PipelineScheduler
+from aegis.artifact_bus import BarramentoArtefatos, diretorio_saida
+from aegis.incremental import CacheIncremental, impressao_alvo
+from aegis.metrics import ColetorMetricas, PERFIS
+from aegis.batch import ler_alvos, executar_lote, formatar_tabela, salvar_resumo
+from aegis.config_manager import get_config
+from aegis.startup_profiler import ORCAMENTO_INICIALIZACAO_MS, relatorio_inicializacao
 
 BANNER = r"""
     ╔═══════════════════════════════════════════════════════════════╗
@@ -38,85 +35,154 @@ def norm_target(raw):
     return raw
 
 def outdir_for(target):
-    host = urlparse(target).hostname or "alvo"
-    d = os.path.join("output", host)
+    d = diretorio_saida(target)
     os.makedirs(d, exist_ok=True)
     return d
 
-def call_module(mod_fn, target, outdir):
+def call_module(mod_fn, target, outdir, **injetaveis):
     """
     Chama executar(...) de forma inteligente:
     - se aceitar (target, outdir) passa ambos
     - se aceitar (target) passa só o alvo
     - se não aceitar nada, chama sem args
+    - objetos compartilhados do scan (ex: cliente, artefatos) são passados por nome
+      apenas para módulos que declaram o parâmetro correspondente
     """
-    try:
-        sig = inspect.signature(mod_fn)
-        params = list(sig.parameters.values())
-        if len(params) >= 2:
-            return mod_fn(target, outdir)
-        elif len(params) == 1:
-            return mod_fn(target)
-        else:
-            return mod_fn()
-    except Exception as e:
-        raise
+    sig = inspect.signature(mod_fn)
+    kwargs = {nome: valor for nome, valor in injetaveis.items() if nome in sig.parameters}
+    posicionais = [
+        p for p in sig.parameters.values()
+        if p.name not in injetaveis and p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)
+    ]
+    args = [target, outdir][:len(posicionais)]
+    return mod_fn(*args, **kwargs)
 
-def main():
-    print(BANNER)
-    if len(sys.argv) > 1 and sys.argv[1] in ("-h","--help"):
-        print("Uso: python run.py  (modo interativo)")
-        sys.exit(0)
-
-    alvo = input("🌐 Digite o alvo para iniciar (ex: https://exemplo.com): ").strip()
-    if not alvo:
-        print("Nada informado. Saindo.")
-        return
-    alvo = norm_target(alvo)
-    print(f"\n🎯 Alvo selecionado: {alvo}")
-    cont = input("Deseja continuar? (s/n): ").strip().lower()
-    if cont != "s":
-        print("Cancelado.")
-        return
+# Módulos do pipeline pelo nome importável (como runner_fix.MODULES); cada um só é
+# importado quando sua etapa executa, junto com suas dependências pesadas
+MODULES = [
+    "aegis.agent_loop",
+    "aegis.pre_recon",
+    "aegis.headers_analyzer",
+    "aegis.parser",
+    "aegis.inject_finder",
+    "aegis.fuzzer",
+    "aegis.defense_detector",
+    "aegis.memory_system",
+    "aegis.ai_interpreter",
+    "aegis.estado_printer",
+    "aegis.report_gen",
+    "aegis.reporter",
+]
 
+def executar_alvo(alvo, forcar=False, perfil=None, memoria=False, gravar=False, reproduzir=None):
+    """
+    Executa o fluxo completo contra um alvo e retorna o resumo da execução.
+    Módulos cujas entradas não mudaram desde o último scan reaproveitam os
+    artefatos anteriores, exceto com forcar=True. As métricas de cada módulo
+    vão para metrics.json (perfil: 'cprofile' ou 'collapsed'; memoria: tracemalloc).
+    gravar=True grava o tráfego em output/<host>/trafego.har.gz; reproduzir (arquivo,
+    ou True para essa gravação) serve as respostas gravadas sem acessar a rede.
+    """
     output_dir = outdir_for(alvo)
+    transporte = None
+    if gravar or reproduzir:
+        from aegis.http_replay import ARQUIVO_GRAVACAO, criar_transporte
+        arquivo_trafego = os.path.join(output_dir, ARQUIVO_GRAVACAO)
+        if reproduzir is True:
+            reproduzir = arquivo_trafego
+        if reproduzir and not os.path.exists(reproduzir):
+            print(f"❌ Gravação não encontrada: {reproduzir} (grave antes com --record)")
+            return {"alvo": alvo, "status": "erro", "erro": f"gravação não encontrada: {reproduzir}",
+                    "modulos_erro": [], "output_dir": output_dir}
+        transporte = criar_transporte(gravar=arquivo_trafego if gravar else None, reproduzir=reproduzir)
     print("\n============================================================")
     print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] 🧠 Iniciando fluxo completo contra: {alvo}")
 
-    pipeline = [
-        ("agent_loop", agent_loop),
-        ("pre_recon", pre_recon),
-        ("headers_analyzer", headers_analyzer),
-        ("parser", parser_mod),
-        ("inject_finder", inject_finder),
-        ("fuzzer", fuzzer),
-        ("defense_detector", defense_detector),
-        ("memory_system", memory_system),
-        ("ai_interpreter", ai_interpreter),
-        ("estado_printer", estado_printer),
-        ("report_gen", report_gen),
-        ("reporter", reporter),
-    ]
+    def executar_etapa(etapa):
+        with metricas.span(etapa.nome) as span:
+            return _executar_etapa(etapa, span)
 
-    ok = 0
-    fail = []
-    for name, fn in pipeline:
+    def _executar_etapa(etapa, span):
+        print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] ➡️ Executando módulo: {etapa.nome}")
         start = time.time()
-        print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] ➡️ Executando módulo: {name}")
+        impressao = incremental.impressao(etapa)
+        if incremental.reutilizar(etapa, impressao):
+            artefatos.encerrar(etapa.produz)
+            span.atributos["reaproveitado"] = True
+            print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] ♻️ Módulo '{etapa.nome}' reaproveitado (entradas inalteradas)")
+            return None
         try:
-            call_module(fn, alvo, output_dir)
-            dur = time.time() - start
-            print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] ✅ Módulo '{name}' executado com sucesso ({dur:.2f}s)")
-            ok += 1
+            resultado = call_module(etapa.resolver(), alvo, output_dir, cliente=cliente, artefatos=artefatos)
         except Exception as e:
-            print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] ❌ Falha ao executar '{name}': {e}")
-            fail.append((name, str(e)))
+            span.atributos["erro"] = str(e)
+            print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] ❌ Falha ao executar '{etapa.nome}': {e}")
+            raise
+        finally:
+            # Com ou sem publicação, quem espera pelos artefatos desta etapa é liberado
+            artefatos.encerrar(etapa.produz)
+        incremental.registrar(etapa, impressao, resultado)
+        dur = time.time() - start
+        print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] ✅ Módulo '{etapa.nome}' executado com sucesso ({dur:.2f}s)")
+        return resultado
+
+    from aegis.http_client import HttpClient
+    from aegis.memory_writer import estatisticas_gravadores, sincronizar_gravadores
+
+    max_workers = get_config().get_scanning_config()["max_threads"]
+    etapas = [Etapa.de_modulo(caminho.split(".")[-1], caminho) for caminho in MODULES]
+    scheduler = PipelineScheduler(etapas, max_workers=max_workers)
+    metricas = ColetorMetricas(output_dir, perfil=perfil, memoria=memoria)
+    inicio_fluxo = time.time()
+    with metricas, HttpClient(transporte=transporte) as cliente, BarramentoArtefatos(output_dir) as artefatos:
+        # Mesmo com --force as impressões são calculadas e registradas para o próximo scan
+        with metricas.span("impressao_incremental"):
+            impressao_pagina = impressao_alvo(cliente, alvo)
+        incremental = CacheIncremental(artefatos, alvo, impressao_pagina, config=get_config().config, forcar=forcar)
+        registros = scheduler.executar(executar_etapa)
+        incremental.salvar()
+        # Barreira do escritor da memória: o scan só termina com seus eventos gravados
+        with metricas.span("gravacao_memoria"):
+            if not sincronizar_gravadores(get_config().get_memory_config()["writer"]["sync_timeout_s"]):
+                print("⚠️ Escritor da memória não concluiu a tempo; eventos pendentes são gravados na saída do processo")
+    duracao_fluxo = time.time() - inicio_fluxo
+    if transporte is not None:
+        transporte.salvar()
+    arquivo_metricas = metricas.salvar(alvo, extras={
+        "caminho_critico": scheduler.caminho_critico(registros)[0],
+        "cache_http": cliente.estatisticas_cache(),
+        "ritmo": cliente.controlador.estatisticas(),
+        "transporte": transporte.estatisticas() if transporte else None,
+        "escritor_memoria": estatisticas_gravadores()
+    })
+
+    ok = sum(1 for r in registros if r["sucesso"])
+    fail = [(r["nome"], r["erro"]) for r in registros if not r["sucesso"]]
+    caminho, duracao_caminho = scheduler.caminho_critico(registros)
 
     print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] 🏁 Fluxo de execução finalizado")
     print("============================================================\n")
     print("📊 RESUMO DA EXECUÇÃO:")
     print(f"✅ Módulos executados com sucesso: {ok}")
     print(f"❌ Módulos com erro: {len(fail)}")
+    print(f"⏱️ Tempo total: {duracao_fluxo:.2f}s (soma dos módulos: {sum(r['duracao'] for r in registros):.2f}s)")
+    print(f"🧭 Caminho crítico: {' → '.join(caminho)} ({duracao_caminho:.2f}s)")
+    if incremental.reaproveitadas:
+        print(f"♻️ Reaproveitados do scan anterior: {len(incremental.reaproveitadas)} ({', '.join(incremental.reaproveitadas)})")
+    elif forcar:
+        print("♻️ Reaproveitamento desativado (--force)")
+    cache = cliente.estatisticas_cache()
+    print(f"🌐 Requisições HTTP: {cliente.total_requisicoes} (cache: {cache['hits']} hits / {cache['misses']} misses, {cache['requisicoes_economizadas']} economizadas)")
+    if transporte is not None:
+        trafego = transporte.estatisticas()
+        if transporte.offline:
+            print(f"📼 Reprodução offline: {trafego['reproduzidas']} respostas gravadas, {trafego['nao_gravadas']} requisições sem gravação ({trafego['arquivo']})")
+        else:
+            print(f"📼 Tráfego gravado: {trafego['entradas']} requisições → {trafego['arquivo']}")
+    for host, taxa in cliente.controlador.estatisticas().items():
+        print(f"🚦 Ritmo {host}: {taxa['taxa']:.2f} req/s ao final, {taxa['bloqueios']} sinais de bloqueio, {taxa['tempo_espera']:.2f}s em espera")
+    totais = metricas.resumo()["totais"]
+    print(f"📈 Métricas: {totais['rede']:.2f}s em rede, {totais['espera']:.2f}s em espera, "
+          f"{sum(s.cpu for s in metricas.spans):.2f}s de CPU, {totais['bytes_recebidos'] / 1024:.0f} KB recebidos → {arquivo_metricas}")
     if fail:
         print("\n🔍 Módulos com erro:")
         for n, msg in fail:
@@ -125,5 +191,89 @@ def main():
     print(f"\n📁 Resultados salvos em: {output_dir}/")
     print("📋 Logs de execução salvos em: logs/execucao.log" if os.path.exists("logs/execucao.log") else "")
 
+    # Retenção do banco de memória (no máximo uma vez por intervalo, entre todos os processos)
+    from aegis.memory_retention import manutencao_automatica
+    manutencao_automatica()
+
+    return {
+        "alvo": alvo,
+        "status": "ok" if not fail else "parcial",
+        "modulos_ok": ok,
+        "modulos_erro": [n for n, _ in fail],
+        "modulos_reaproveitados": list(incremental.reaproveitadas),
+        "duracao": duracao_fluxo,
+        "output_dir": output_dir,
+    }
+
+def executar_alvo_lote(alvo, forcar=False, perfil=None, memoria=False, gravar=False, reproduzir=None):
+    """Worker do modo lote: executa um alvo com a saída redirecionada para o log do alvo"""
+    alvo = norm_target(alvo)
+    log_file = os.path.join(outdir_for(alvo), "execucao.log")
+    try:
+        with open(log_file, "w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+            return executar_alvo(alvo, forcar, perfil, memoria, gravar, reproduzir)
+    except Exception as e:
+        return {"alvo": alvo, "status": "erro", "erro": str(e), "modulos_erro": [], "output_dir": os.path.dirname(log_file)}
+
+def executar_modo_lote(origem, forcar=False, perfil=None, memoria=False, gravar=False, reproduzir=None):
+    """Varre uma lista de alvos (arquivo ou stdin) sem interação"""
+    alvos = ler_alvos(origem, normalizar=norm_target)
+    if not alvos:
+        print("Nenhum alvo informado. Saindo.")
+        return
+
+    scanning = get_config().get_scanning_config()
+    print(f"[batch] 🎯 {len(alvos)} alvos | {scanning['max_threads']} processos | máx. {scanning['max_per_host']} por host")
+    inicio = time.time()
+    resumos = executar_lote(
+        alvos,
+        functools.partial(executar_alvo_lote, forcar=forcar, perfil=perfil, memoria=memoria, gravar=gravar, reproduzir=reproduzir),
+        max_workers=scanning["max_threads"],
+        max_por_host=scanning["max_per_host"],
+    )
+
+    print("\n📊 RESUMO DO LOTE:")
+    print(formatar_tabela(resumos))
+    print(f"\n⏱️ Tempo total do lote: {time.time() - inicio:.2f}s")
+    print(f"💾 Resumo salvo em: {salvar_resumo(resumos)}")
+
+def main():
+    print(BANNER)
+    arg_parser = argparse.ArgumentParser(
+        description="AEGIS Bug Hunter",
+        usage="python run.py [--batch ARQUIVO|-] [--force] [--profile {cprofile,collapsed}] [--trace-memory] [--record | --replay [ARQUIVO]] [--profile-startup [ORCAMENTO_MS]]"
+    )
+    arg_parser.add_argument("--batch", metavar="ARQUIVO", help="arquivo com um alvo por linha ('-' para ler da entrada padrão)")
+    arg_parser.add_argument("--force", action="store_true", help="reexecuta todos os módulos, ignorando o reaproveitamento incremental")
+    arg_parser.add_argument("--profile", choices=PERFIS, help="grava perfil do scan junto do metrics.json (pstats ou pilhas colapsadas para flamegraph)")
+    arg_parser.add_argument("--trace-memory", action="store_true", help="mede alocações com tracemalloc nas métricas (mais lento)")
+    transporte = arg_parser.add_mutually_exclusive_group()
+    transporte.add_argument("--record", action="store_true", help="grava o tráfego do scan em output/<host>/trafego.har.gz")
+    transporte.add_argument("--replay", metavar="ARQUIVO", nargs="?", const=True,
+                            help="reproduz um scan gravado sem acessar a rede (padrão: a gravação do alvo)")
+    arg_parser.add_argument("--profile-startup", metavar="ORCAMENTO_MS", nargs="?", type=float, const=ORCAMENTO_INICIALIZACAO_MS,
+                            help=f"relatório de tempo de importação (padrão: orçamento de {ORCAMENTO_INICIALIZACAO_MS:.0f}ms)")
+    args = arg_parser.parse_args()
+
+    if args.profile_startup is not None:
+        sys.exit(0 if relatorio_inicializacao(MODULES, args.profile_startup) else 1)
+
+    if args.batch:
+        executar_modo_lote(args.batch, args.force, args.profile, args.trace_memory, args.record, args.replay)
+        return
+
+    alvo = input("🌐 Digite o alvo para iniciar (ex: https://exemplo.com): ").strip()
+    if not alvo:
+        print("Nada informado. Saindo.")
+        return
+    alvo = norm_target(alvo)
+    print(f"\n🎯 Alvo selecionado: {alvo}")
+    cont = input("Deseja continuar? (s/n): ").strip().lower()
+    if cont != "s":
+        print("Cancelado.")
+        return
+
+    executar_alvo(alvo, args.force, args.profile, args.trace_memory, args.record, args.replay)
+
 if __name__ == "__main__":
     main()